@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from .models import ClientProfile,FreelancerProfile,Feedback, Address, CompanyDetails,BankDetails,VerificationDocument
 from core.models import Connection
+from .services.user_card_service import UserCardService
 from django.contrib.auth import get_user_model
 import json
 from datetime import datetime
@@ -579,44 +580,51 @@ class ClientFeedbackSerializer(serializers.ModelSerializer):
         return ClientFeedbackSerializer(replies, many=True).data
 
 
+class UserCardListSerializer(serializers.ListSerializer):
+    """Loads the user cards for a whole page in one query before serializing each item"""
+    def to_representation(self, data):
+        items = data.all() if hasattr(data, 'all') else data
+        items = list(items)
+        user_ids = [self.child.card_user_id(item) for item in items]
+        self.child.cards = UserCardService.get_cards(user_ids)
+        return [self.child.to_representation(item) for item in items]
+
+
 class UserProfileSerializer(serializers.Serializer):
+    class Meta:
+        list_serializer_class = UserCardListSerializer
+
+    def card_user_id(self, instance):
+        return instance.id
+
     def to_representation(self, instance):
+        card = getattr(self, 'cards', {}).get(instance.id) or UserCardService.get_card(instance.id)
+        if card is None or card['role'] not in ['freelancer', 'client']:
+            # Default case if the user has no role or something unexpected
+            return {"message": "Profile data unavailable"}
+
         # Check if the user is a freelancer
-        if instance.role == 'freelancer':
-            try:
-                profile = FreelancerProfile.objects.get(user=instance)
-                user_name = instance.username
-                result = {
-                    'user_name': user_name,
-                    'id': instance.id,
-                    'bio': profile.bio,  # Get bio from FreelancerProfile
-                    'profile_picture': profile.profile_picture.url if profile.profile_picture else None,  # Get profile picture
-                    'rating': profile.average_rating,  # Freelancer rating
-                }
-                return result
-            except FreelancerProfile.DoesNotExist:
-                # Return an empty dictionary or a default profile if it does not exist
+        if card['role'] == 'freelancer':
+            if not card['has_profile']:
                 return {"message": "Freelancer profile not found"}
-        
-        # Check if the user is a client
-        elif instance.role == 'client':
-            try:
-                profile = ClientProfile.objects.get(user=instance)
-                user_name = instance.username
-                result = {
-                    'user_name': user_name,
-                    'id': instance.id,
-                    'bio': profile.bio,  # Get bio from ClientProfile
-                    'profile_picture': profile.profile_picture.url if profile.profile_picture else None,  # Get profile picture
-                    'company': profile.company_name,  # Client's company name
-                }
-                return result
-            except ClientProfile.DoesNotExist:
-                # Return an empty dictionary or a default profile if it does not exist
-                return {"message": "Client profile not found"}
-        
-        # Default case if the user has no role or something unexpected
-        return {"message": "Profile data unavailable"}
+            return {
+                'user_name': card['username'],
+                'id': card['id'],
+                'bio': card['bio'],  # Get bio from FreelancerProfile
+                'profile_picture': card['profile_picture'],  # Get profile picture
+                'rating': card['rating'],  # Freelancer rating
+            }
+
+        # Otherwise the user is a client
+        if not card['has_profile']:
+            return {"message": "Client profile not found"}
+        return {
+            'user_name': card['username'],
+            'id': card['id'],
+            'bio': card['bio'],  # Get bio from ClientProfile
+            'profile_picture': card['profile_picture'],  # Get profile picture
+            'company': card['company'],  # Client's company name
+        }
 
 
 
@@ -624,78 +632,30 @@ class ConnectionSendinSerializer(serializers.ModelSerializer):
     class Meta:
         model = Connection
         fields = ['from_user', 'to_user', 'status', 'created_at', 'updated_at']
+        list_serializer_class = UserCardListSerializer
+
+    def card_user_id(self, instance):
+        # The card shown is always the other side of the connection
+        current_user = self.context.get('request').user
+        return instance.to_user_id if current_user.id == instance.from_user_id else instance.from_user_id
 
     def to_representation(self, instance):
         # Get the original representation
         representation = super().to_representation(instance)
 
-        # Extract the 'from_user' and 'to_user'
-        from_user = instance.from_user
-        to_user = instance.to_user
-
-        # Helper function to get the profile data
-        def get_user_profile(user):
-            if user.role == 'client':
-                # Check if 'client_profile' exists
-                if hasattr(user, 'client_profile'):
-                    return {
-                        "user_name": user.username,
-                        "user_id": user.id,
-                        "bio": user.client_profile.bio,  # 'bio' from ClientProfile
-                        "company": user.client_profile.company_name,  # 'company_name' from ClientProfile
-                        "rating": user.client_profile.average_rating,  # 'average_rating' from ClientProfile
-                        "role": user.role
-                    }
-                else:
-                    return {
-                        "user_name": user.username,
-                        "user_id": user.id,
-                        "bio": "",  # Empty bio if client_profile does not exist
-                        "company": "",  # Empty company if client_profile does not exist
-                        "rating": 0,  # Default rating if client_profile does not exist
-                        "role": user.role
-                    }
-
-            elif user.role == 'freelancer':
-                # Check if 'freelancer_profile' exists
-                if hasattr(user, 'freelancer_profile'):
-                    return {
-                        "user_name": user.username,
-                        "user_id": user.id,
-                        "bio": user.freelancer_profile.bio,  # 'bio' from FreelancerProfile
-                        "company": user.freelancer_profile.company_name,  # 'company_name' from FreelancerProfile
-                        "rating": user.freelancer_profile.average_rating,  # 'average_rating' from FreelancerProfile
-                        "role": user.role
-                    }
-                else:
-                    return {
-                        "user_name": user.username,
-                        "user_id": user.id,
-                        "bio": "",  # Empty bio if freelancer_profile does not exist
-                        "company": "",  # Empty company if freelancer_profile does not exist
-                        "rating": 0,  # Default rating if freelancer_profile does not exist
-                        "role": user.role
-                    }
-
-        # Determine which user to return (opposite user based on who the current user is)
-        current_user = self.context.get('request').user
-        if current_user == from_user:
-            opposite_user = to_user
-        else:
-            opposite_user = from_user
-
-        # Get the profile of the opposite user
-        opposite_user_profile = get_user_profile(opposite_user)
+        # Get the profile card of the opposite user
+        opposite_user_id = self.card_user_id(instance)
+        card = getattr(self, 'cards', {}).get(opposite_user_id) or UserCardService.get_card(opposite_user_id)
 
         # Return the response with the opposite user's profile and connection details
         return {
             "id":instance.id,
-            "user_name": opposite_user_profile.get('user_name'),
-            "user_id": opposite_user_profile.get('user_id'),
-            "company": opposite_user_profile.get('company'),
-            "rating": opposite_user_profile.get('rating'),
-            "bio": opposite_user_profile.get('bio'),
-            "role": opposite_user_profile.get('role'),
+            "user_name": card['username'],
+            "user_id": card['id'],
+            "company": card['company'],
+            "rating": card['rating'],
+            "bio": card['bio'],
+            "role": card['role'],
             "status": representation.get('status'),
             "created_at": representation.get('created_at'),
             "updated_at": representation.get('updated_at')
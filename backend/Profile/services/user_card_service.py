@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+
+def pathrole_for(role):
+    """Frontend route prefix for a user role"""
+    return 'freelancer' if role in ['freelancer', 'student'] else 'client'
+
+
+class LRUCache:
+    """Small thread-safe LRU with a per-entry time to live"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for key in keys:
+                item = self._data.get(key)
+                if item is None:
+                    continue
+                expires_at, value = item
+                if expires_at < now:
+                    del self._data[key]
+                    continue
+                self._data.move_to_end(key)
+                found[key] = value
+        return found
+
+    def set_many(self, mapping):
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for key, value in mapping.items():
+                self._data[key] = (expires_at, value)
+                self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# Cards are cached per process; saves in this process invalidate immediately and
+# the TTL bounds how long another worker can serve a stale avatar or bio.
+_cards = LRUCache(
+    maxsize=getattr(settings, 'USER_CARD_CACHE_SIZE', 5000),
+    ttl=getattr(settings, 'USER_CARD_CACHE_TTL', 300),
+)
+
+
+class UserCardService:
+    @staticmethod
+    def _build_card(user):
+        profile = None
+        if user.role == 'client':
+            profile = getattr(user, 'client_profile', None)
+        elif user.role in ['freelancer', 'student']:
+            profile = getattr(user, 'freelancer_profile', None)
+
+        return {
+            'id': user.id,
+            'username': user.username,
+            'role': user.role,
+            'pathrole': pathrole_for(user.role),
+            'profile_picture': profile.profile_picture.url if profile and profile.profile_picture else None,
+            'bio': profile.bio if profile else "",
+            'rating': profile.average_rating if profile else 0,
+            'company': profile.company.name if profile and profile.company else "",
+            'has_profile': profile is not None,
+        }
+
+    @staticmethod
+    def get_cards(user_ids):
+        """Return {user_id: card} for the given ids in a single query for cache misses"""
+        user_ids = list(dict.fromkeys(int(pk) for pk in user_ids))
+        cards = _cards.get_many(user_ids)
+        missing = [pk for pk in user_ids if pk not in cards]
+        if missing:
+            users = User.objects.filter(pk__in=missing).select_related(
+                'client_profile__company', 'freelancer_profile__company'
+            )
+            loaded = {user.id: UserCardService._build_card(user) for user in users}
+            _cards.set_many(loaded)
+            cards.update(loaded)
+        return cards
+
+    @staticmethod
+    def get_card(user_id):
+        return UserCardService.get_cards([user_id]).get(int(user_id))
+
+    @staticmethod
+    def get_ordered_cards(user_ids):
+        """Cards in the order of ``user_ids``, skipping users that no longer exist"""
+        cards = UserCardService.get_cards(user_ids)
+        return [cards[pk] for pk in user_ids if pk in cards]
+
+    @staticmethod
+    def invalidate(user_ids):
+        _cards.delete_many(int(pk) for pk in user_ids)
+
+    @staticmethod
+    def clear():
+        _cards.clear()
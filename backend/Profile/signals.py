@@ -0,0 +1,31 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.contrib.auth import get_user_model
+from .models import ClientProfile, FreelancerProfile, CompanyDetails
+from .services.user_card_service import UserCardService
+
+User = get_user_model()
+
+
+# Keep cached user cards in step with the rows they are built from
+@receiver(post_save, sender=ClientProfile)
+@receiver(post_save, sender=FreelancerProfile)
+@receiver(post_delete, sender=ClientProfile)
+@receiver(post_delete, sender=FreelancerProfile)
+def invalidate_profile_card(sender, instance, **kwargs):
+    UserCardService.invalidate([instance.user_id])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_card(sender, instance, **kwargs):
+    UserCardService.invalidate([instance.pk])
+
+
+@receiver(post_save, sender=CompanyDetails)
+def invalidate_company_cards(sender, instance, created, **kwargs):
+    if created:
+        return
+    user_ids = list(ClientProfile.objects.filter(company=instance).values_list('user_id', flat=True))
+    user_ids += FreelancerProfile.objects.filter(company=instance).values_list('user_id', flat=True)
+    UserCardService.invalidate(user_ids)
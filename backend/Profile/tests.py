@@ -1,3 +1,56 @@
+from datetime import date
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
 
-# Create your tests here.
+from .models import ClientProfile, CompanyDetails
+from .services.user_card_service import UserCardService
+
+User = get_user_model()
+
+
+class UserCardServiceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = CompanyDetails.objects.create(
+            name='Acme', registration_number='R1', registration_date=date(2020, 1, 1),
+            company_type='private', industry='software', pan_number='ABCDE1234F',
+        )
+        cls.user = User.objects.create_user(username='client', password='pass', role='client')
+        cls.profile = ClientProfile.objects.create(user=cls.user, bio='Hello', company=cls.company)
+        cls.other = User.objects.create_user(username='freelancer', password='pass', role='freelancer')
+
+    def setUp(self):
+        UserCardService.clear()
+
+    def test_cards_are_loaded_once_and_served_from_cache(self):
+        with self.assertNumQueries(1):
+            cards = UserCardService.get_ordered_cards([self.other.id, self.user.id, self.other.id])
+        self.assertEqual([card['id'] for card in cards], [self.other.id, self.user.id, self.other.id])
+        self.assertEqual(cards[1]['company'], 'Acme')
+        self.assertFalse(cards[0]['has_profile'])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(UserCardService.get_ordered_cards([self.user.id, self.other.id]), cards[1:])
+
+    def test_missing_users_are_skipped(self):
+        cards = UserCardService.get_ordered_cards([self.user.id, 999999])
+        self.assertEqual([card['id'] for card in cards], [self.user.id])
+
+    def test_profile_save_invalidates_card(self):
+        UserCardService.get_card(self.user.id)
+        self.profile.bio = 'Updated'
+        self.profile.save()
+        self.assertEqual(UserCardService.get_card(self.user.id)['bio'], 'Updated')
+
+    def test_user_save_invalidates_card(self):
+        UserCardService.get_card(self.user.id)
+        self.user.username = 'renamed'
+        self.user.save()
+        self.assertEqual(UserCardService.get_card(self.user.id)['username'], 'renamed')
+
+    def test_company_edit_invalidates_member_cards(self):
+        UserCardService.get_card(self.user.id)
+        self.company.name = 'Acme Ltd'
+        self.company.save()
+        self.assertEqual(UserCardService.get_card(self.user.id)['company'], 'Acme Ltd')
@@ -3,6 +3,13 @@ from django.shortcuts import render,get_object_or_404
 from .serializers import EventSerializer,ActivitySerializer
 from core.serializers import ProjectSerializer,TaskSerializer,SpendingDistributionByProjectSerializer,ProjectResponseSerializer,TaskResponseSerializer
 from .models import Event,Activity
+from .services.dashboard_service import DashboardService
+from .services.spending_service import SpendingRollupService
+from .services.dashboard_cache_service import DashboardCacheService, cache_dashboard_response
+from .services.dashboard_compose_service import DashboardComposeService
+from .services.collaboration_service import CollaborationListService
+from django.http import JsonResponse
+from django.views import View
 from core.models import Project,Task,Payment
 from rest_framework.permissions import IsAuthenticated,AllowAny
 from rest_framework.response import Response
@@ -11,6 +18,8 @@ from rest_framework.authentication import TokenAuthentication
 from rest_framework.views import APIView
 from rest_framework import viewsets,status,generics
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.utils.urls import replace_query_param
+from core.pagination import KeysetPaginator
 from django.utils import timezone
 from django.db.models import Sum
 from django.db.models.functions import TruncMonth, TruncWeek, TruncYear,ExtractWeekDay
@@ -173,6 +182,7 @@ class EventViewSet(viewsets.ModelViewSet):
 class RecentActivityView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @cache_dashboard_response('recent_activity')
     def get(self, request):
         # Fetch the most recent activities for the authenticated user
         activities = Activity.objects.filter(user=request.user).all()[:5]
@@ -241,6 +251,45 @@ class SpecifiedActivityListView(generics.ListAPIView):
 
     
 
+class ActivityTimelineView(APIView):
+    """
+    The user's activity feed, newest first, paged with a keyset cursor.
+
+    ``related_model`` narrows the feed to one related model and ``exclude``
+    (comma separated) leaves some out.  The first page carries ``since``,
+    the cursor of its newest row; polling with ``?since=`` returns only the
+    rows added after it, with a new ``since`` and ``has_more`` when more
+    than a page arrived.
+    """
+    permission_classes = [IsAuthenticated]
+    paginator = KeysetPaginator(ordering=('-timestamp', '-id'), page_size=20, max_page_size=100)
+
+    def get(self, request):
+        queryset = Activity.objects.filter(user=request.user)
+        related_model = request.query_params.get('related_model')
+        if related_model:
+            queryset = queryset.filter(related_model=related_model)
+        exclude = [name for name in request.query_params.get('exclude', '').split(',') if name]
+        if exclude:
+            queryset = queryset.exclude(related_model__in=exclude)
+
+        if request.query_params.get('since'):
+            activities, since, has_more = self.paginator.paginate_since(request, queryset)
+            return Response({
+                "results": ActivitySerializer(activities, many=True).data,
+                "since": since,
+                "has_more": has_more,
+            })
+
+        activities, next_cursor = self.paginator.paginate(request, queryset)
+        first_page = not request.query_params.get('cursor')
+        return Response({
+            "next": replace_query_param(request.build_absolute_uri(), 'cursor', next_cursor) if next_cursor else None,
+            "since": self.paginator.encode_cursor(activities[0]) if first_page and activities else None,
+            "results": ActivitySerializer(activities, many=True).data,
+        })
+
+
 class PostedProjects(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -255,83 +304,71 @@ class PostedProjects(APIView):
 class DashBoard_Overview(APIView):
     permission_classes = [IsAuthenticated]
 
+    @cache_dashboard_response('dashboard_overview')
     def get(self, request):
         user = request.user
-        
-        # Fetch the projects related to the user (client)
-        projects = Project.objects.filter(client=user).order_by('-created_at')
-        
+        sections = {name: section() for name, section in overview_sections(user).items()}
+        # Return the response with the data
+        return Response(overview_response(user, sections))
+
+
+class AsyncDashBoard_Overview(View):
+    """
+    DashBoard_Overview for ASGI: the sections are computed concurrently,
+    and a section that is slow or fails is left out of a partial response.
+    """
+
+    async def get(self, request):
+        user = await DashboardComposeService.authenticate(request)
+        if user is None:
+            return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+
+        async def build():
+            sections, errors = await DashboardComposeService.gather(overview_sections(user))
+            data = overview_response(user, sections)
+            if errors:
+                data['partial'] = True
+                data['section_errors'] = errors
+            return data, not errors
+
+        return await DashboardCacheService.respond_async(request, user.pk, 'dashboard_overview', build)
+
+
+def overview_sections(user):
+    """Independent parts of the dashboard overview, keyed by section name"""
+    return {
         # Serialize project data
-        project_summary = ProjectSerializer(projects[:8], many=True).data 
-        
-        # Initialize counters
-        pending_tasks_count = 0
-        total_spent = 0
-        total_projects_last_month = 0
-        completed_ahead_of_deadline = 0
-        today = timezone.now()
-        
-        # Get the start of the week and the range for last month
-        start_of_week = today - timedelta(days=today.weekday())
-        start_of_last_month = (today.replace(day=1) - timedelta(days=1)).replace(day=1)
-        end_of_last_month = today.replace(day=1) - timedelta(days=1)
-        
-        for project in projects:
-            # Ensure that you're calling the methods, not passing the method reference
-            pending_tasks_count += project.get_pending_tasks()  # Call the method with ()
-            total_spent += project.total_spent        
-            
-            # Get tasks completed last month for each project
-            tasks_last_month = Task.objects.filter(
-                project=project, 
-                deadline__gte=start_of_last_month, 
-                deadline__lte=end_of_last_month,
-                status='completed'
-            )
-            
-            total_projects_last_month += 1
-            
-            for task in tasks_last_month:
-                # Check if task was completed ahead of the deadline
-                if task.completed_date and task.completed_date < task.deadline:
-                    completed_ahead_of_deadline += 1
-        
-        if total_projects_last_month > 0:
-            projects_ahead_percentage = (completed_ahead_of_deadline / total_projects_last_month) * 100
-        else:
-            projects_ahead_percentage = 0
-        
-        # Call the method correctly to get the count of active projects
-        active_projects_count = Project.objects.filter(status='ongoing', client=user).count()
+        'project_summary': lambda: ProjectSerializer(DashboardService.recent_projects(user), many=True).data,
+        # Counters for every project of the client, kept in one summary row
+        'summary': lambda: DashboardService.get_summary(user),
+        'nearest_deadlines': lambda: get_nearest_deadlines(user),
+        'recent_activities': lambda: get_recent_activities(user, 5),
+    }
 
-        
-        # Get other data as needed
-        nearest_deadlines = get_nearest_deadlines(user)
-        recent_activities = get_recent_activities(user, 5)
-        
-        client_username = {
-            'username': user.username,
-        }        
-        
-        # Prepare the response data
-        data = {
-            'active_projects': active_projects_count,  # Correct: Method called
-            'pending_tasks': pending_tasks_count,
-            'total_spent': total_spent,
-            'project_summary': project_summary,
-            'nearest_deadlines': nearest_deadlines,
-            'recent_activities': recent_activities,
-            'tasks_due_this_week': Task.objects.filter(
-                project__client=user, 
-                deadline__gte=start_of_week, 
-                deadline__lte=start_of_week + timedelta(days=7)
-            ).count(),
-            'projects_completed_ahead_last_month': projects_ahead_percentage,
-            'client_username': client_username,
-        }
-        
-        # Return the response with the data
-        return Response(data)
+
+def overview_response(user, sections):
+    """Overview payload from computed sections; missing sections come back as None"""
+    overview = sections.get('summary')
+
+    def counter(name):
+        return getattr(overview, name) if overview is not None else None
+
+    client_username = {
+        'username': user.username,
+    }
+
+    # Prepare the response data
+    return {
+        'active_projects': counter('active_projects'),
+        'pending_tasks': counter('pending_tasks'),
+        'total_spent': counter('total_spent'),
+        'project_summary': sections.get('project_summary'),
+        'nearest_deadlines': sections.get('nearest_deadlines'),
+        'recent_activities': sections.get('recent_activities'),
+        'tasks_due_this_week': counter('tasks_due_this_week'),
+        'projects_completed_ahead_last_month': counter('projects_completed_ahead_last_month'),
+        'client_username': client_username,
+    }
 
 # Get nearest deadlines function
 def get_nearest_deadlines(client):
@@ -387,10 +424,11 @@ def get_recent_activities(user, limit=None):
 class SpendingDataView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @cache_dashboard_response('spending_data')
     def get(self,request):
         user = request.user
         time_frame = request.GET.get('time_frame', 'monthly')
-        data = get_spending_data(user, time_frame)
+        data = get_spending_data(user, time_frame, request.GET)
         return Response(data)
     
 class SpendingDistributionByProject(generics.ListAPIView):
@@ -414,139 +452,50 @@ class SpendingDistributionByProject(generics.ListAPIView):
         return Response(serializer.data, status=200)
 
 class CollaborationView(APIView):
-    permission_classes = [IsAuthenticated]
-
-    def get(self, *args, **kwargs):
-        user = self.request.user
+    """
+    The user's collaborations by status, plus the ones they administer.
 
-        # Get all collaboration memberships for the user
-        user_collaborations = CollaborationMembership.objects.filter(user=user)
-
-        # Group collaborations by status
-        active_collaborations = [membership.collaboration for membership in user_collaborations if membership.collaboration.STATUS == 'active']
-        inactive_collaborations = [membership.collaboration for membership in user_collaborations if membership.collaboration.STATUS == 'inactive']
-        completed_collaborations = [membership.collaboration for membership in user_collaborations if membership.collaboration.STATUS == 'completed']
-        removed_collaborations = [membership.collaboration for membership in user_collaborations if membership.collaboration.STATUS == 'removed']
-
-        # Get collaborations where the user is an admin
-        admin_collaborations = Collaboration.objects.filter(admin=user)
-
-        serialized_active = CollaborationSerializer(active_collaborations, many=True)
-        serialized_inactive = CollaborationSerializer(inactive_collaborations, many=True)
-        serialized_completed = CollaborationSerializer(completed_collaborations, many=True)
-        serialized_removed = CollaborationSerializer(removed_collaborations, many=True)
-        serialized_admin = CollaborationSerializer(admin_collaborations, many=True)
-
-        # Return a structured response with different collaboration categories
-        return Response({
-            'active_collaborations': serialized_active.data,
-            'inactive_collaborations': serialized_inactive.data,
-            'completed_collaborations': serialized_completed.data,
-            'removed_collaborations': serialized_removed.data,
-            'admin_collaborations': serialized_admin.data,
-        })
-
-
-
-
-def get_spending_data(user, time_frame='monthly'):
-    if time_frame == 'weekly':
-        start_of_week = timezone.now() - timezone.timedelta(days=timezone.now().weekday())
-        payments = Payment.objects.filter(from_user=user, payment_date__gte=start_of_week)
-
-        spending_data = (
-            payments.annotate(weekday=ExtractWeekDay('payment_date'))
-                    .values('weekday')
-                    .annotate(total_spent=Sum('amount')) 
-                    .order_by('weekday')
-        )
+    Without ``bucket`` the first page of every bucket is returned with the
+    bucket sizes; ``bucket`` (a status or "admin") with ``cursor`` pages
+    through one bucket.
+    """
+    permission_classes = [IsAuthenticated]
 
-        labels = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+    def get(self, request, *args, **kwargs):
+        bucket = request.query_params.get('bucket')
+        if bucket:
+            collaborations, next_cursor = CollaborationListService.bucket_page(request, bucket)
+            return Response({
+                'bucket': bucket,
+                'next': self.next_url(request, bucket, next_cursor),
+                'results': CollaborationSerializer(collaborations, many=True).data,
+            })
 
-        chart_data = {
-            'labels': labels,
-            'datasets': [
-                {
-                    'label': 'Spend Over Time',
-                    'data': [0] * 7, 
-                    'borderColor': 'rgba(75,192,192,1)',
-                    'fill': False,
-                },
-            ],
+        pages = CollaborationListService.first_pages(request.user, CollaborationListService.paginator.get_page_size(request))
+        index = CollaborationListService.membership_index(request.user)
+        response_data = {
+            f'{bucket}_collaborations': CollaborationSerializer(collaborations, many=True).data
+            for bucket, (collaborations, _) in pages.items()
         }
-
-        for entry in spending_data:
-            day_index = entry['weekday'] - 1
-            chart_data['datasets'][0]['data'][day_index] = entry['total_spent'] or 0
-
-        weekly = chart_data
-
-        return weekly
-
-    elif time_frame == 'monthly':
-        payments = Payment.objects.filter(from_user=user)
-
-        spending_data = (
-            payments.annotate(month=TruncMonth('payment_date'))
-                    .values('month')
-                    .annotate(total_spent=Sum('amount'))
-                    .order_by('month')
-        )
-
-        months = [calendar.month_name[i] for i in range(1, 13)]
-
-        chart_data = {
-            'labels': months,
-            'datasets': [
-                {
-                    'label': 'Spend Over Time',
-                    'data': [0] * 12, 
-                    'borderColor': 'rgba(75,192,192,1)',
-                    'fill': False,
-                },
-            ],
+        response_data['counts'] = index['counts']
+        response_data['pending_invitations'] = index['pending_invitations']
+        response_data['next'] = {
+            bucket: self.next_url(request, bucket, next_cursor) for bucket, (_, next_cursor) in pages.items()
         }
+        return Response(response_data)
 
-        for entry in spending_data:
-            month_name = entry['month'].strftime('%B')
-            month_index = months.index(month_name)
-            chart_data['datasets'][0]['data'][month_index] = entry['total_spent'] or 0
-
-        monthly = chart_data
-
-        return monthly
-
+    @staticmethod
+    def next_url(request, bucket, cursor):
+        if not cursor:
+            return None
+        return replace_query_param(replace_query_param(request.build_absolute_uri(), 'bucket', bucket), 'cursor', cursor)
 
-    elif time_frame == 'yearly':
-        payments = Payment.objects.filter(from_user=user)
 
-        spending_data = (
-            payments.annotate(year=TruncYear('payment_date')) 
-                    .values('year')
-                    .annotate(total_spent=Sum('amount'))  # Sum the payment amounts for each year
-                    .order_by('year')
-        )
-        # Extract the starting year and the current year as integers
-        start_year = min([entry['year'].year for entry in spending_data])  # Extract year from datetime
-        current_year = timezone.now().year  # Get the current year
-        labels = [str(year) for year in range(start_year, current_year + 1)]  # Use year range
-
-    else:
-        return {'error': 'Invalid time frame. Choose from "weekly", "monthly", or "yearly."'}
 
-    chart_data = {
-        'labels': labels,
-        'datasets': [
-            {
-                'label': 'Spend Over Time',
-                'data': [entry['total_spent'] or 0 for entry in spending_data],
-                'borderColor': 'rgba(75,192,192,1)',
-                'fill': False,
-            },
-        ],
-    }
 
-    return chart_data
+def get_spending_data(user, time_frame='monthly', params=None):
+    """Spending chart for the user, summed from the daily spending rollups"""
+    return SpendingRollupService.chart(user, time_frame, params)
 
 
 
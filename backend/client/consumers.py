@@ -10,6 +10,7 @@ from django.core.paginator import Paginator
 from django.core.cache import cache
 from Profile.models import ClientProfile, FreelancerProfile  # Ensure correct import
 from core.serializers import ProjectSerializer, CategorySerializer
+from core.services.notification_counter_service import NotificationCounterService
 
 class NotificationConsumer(AsyncWebsocketConsumer):
     async def connect(self):
@@ -29,9 +30,10 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             await self.accept()
 
             # Send initial notification count
-            unread_count = await self.get_unread_notification_count(self.user)
+            unread_counts = await self.get_unread_notification_counts(self.user)
             await self.send(text_data=json.dumps({
-                "notifications_count": unread_count
+                "notifications_count": sum(unread_counts.values()),
+                "notifications_by_type": unread_counts,
             }))
         else:
             await self.close()
@@ -52,14 +54,15 @@ class NotificationConsumer(AsyncWebsocketConsumer):
         
         if 'notifications_count' in event:
             await self.send(text_data=json.dumps({
-                'notifications_count': event['notifications_count']
+                'notifications_count': event['notifications_count'],
+                'notifications_by_type': event.get('notifications_by_type', {}),
             }))
         elif 'message' in event:
             await self.send(text_data=json.dumps(event['message']))
 
     @database_sync_to_async
-    def get_unread_notification_count(self, user):
-        return Notification.objects.filter(user=user, is_read=False).count()
+    def get_unread_notification_counts(self, user):
+        return NotificationCounterService.get_counts(user.id)
 
     @database_sync_to_async
     def get_user_from_token(self, token):
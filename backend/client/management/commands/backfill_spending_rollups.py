@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from client.services.spending_service import SpendingRollupService
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily spending rollups from the payments table"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids', help="Only rebuild these users")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        written = SpendingRollupService.backfill(options['user_ids'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {written} spending buckets in {time.monotonic() - started:.2f}s"
+        ))
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from client.models import ClientDashboardSummary
+from client.services.dashboard_service import DashboardService
+
+
+class Command(BaseCommand):
+    help = "Rebuild every client's dashboard summary from projects, tasks and payments"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        summaries = DashboardService.compute_summaries()
+
+        with transaction.atomic():
+            ClientDashboardSummary.objects.all().delete()
+            ClientDashboardSummary.objects.bulk_create(summaries, batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {len(summaries)} dashboard summaries in {time.monotonic() - started:.2f}s"
+        ))
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.6 on 2026-10-18 15:24
+
+from django.conf import settings
+import datetime
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_notify_at(apps, schema_editor):
+    Event = apps.get_model('client', 'Event')
+    events = []
+    for event in Event.objects.filter(start__isnull=False).only('id', 'start', 'notification_time').iterator(chunk_size=1000):
+        start = timezone.make_aware(datetime.datetime.combine(event.start, datetime.time.min))
+        event.notify_at = start - datetime.timedelta(minutes=event.notification_time or 0)
+        events.append(event)
+    Event.objects.bulk_update(events, ['notify_at'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='notify_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['notification_sent', 'notify_at'], name='event_due_reminder_idx'),
+        ),
+        migrations.RunPython(backfill_notify_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.6 on 2026-10-18 15:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0003_event_notify_at'),
+        ('core', '0009_notification_dedup_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientDashboardSummary',
+            fields=[
+                ('client', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='dashboard_summary', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('active_projects', models.PositiveIntegerField(default=0)),
+                ('pending_tasks', models.PositiveIntegerField(default=0)),
+                ('total_spent', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('tasks_due_this_week', models.PositiveIntegerField(default=0)),
+                ('projects_completed_ahead_last_month', models.FloatField(default=0)),
+                ('computed_on', models.DateField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.1.6 on 2026-10-18 15:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_rollups(apps, schema_editor):
+    Payment = apps.get_model('core', 'Payment')
+    DailySpendingRollup = apps.get_model('client', 'DailySpendingRollup')
+    grouped = (
+        Payment.objects.annotate(day=TruncDate('payment_date'))
+        .order_by()
+        .values_list('from_user_id', 'project_id', 'currency', 'day')
+        .annotate(amount=Sum('amount'), payment_count=Count('id'))
+    )
+    DailySpendingRollup.objects.bulk_create(
+        [
+            DailySpendingRollup(
+                user_id=user_id, project_id=project_id, currency=currency, day=day,
+                amount=amount, payment_count=payment_count,
+            )
+            for user_id, project_id, currency, day, amount, payment_count in grouped
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0004_client_dashboard_summary'),
+        ('core', '0009_notification_dedup_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySpendingRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency', models.CharField(default='INR', max_length=10)),
+                ('day', models.DateField()),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('payment_count', models.IntegerField(default=0)),
+                ('project', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.project')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='spending_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'day'], name='spending_rollup_user_day_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-18 15:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0005_daily_spending_rollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['user', '-timestamp', '-id'], name='activity_user_timeline_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['user', 'related_model', '-timestamp', '-id'], name='activity_user_model_idx'),
+        ),
+    ]
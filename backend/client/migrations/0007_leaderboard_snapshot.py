@@ -0,0 +1,24 @@
+# Generated by Django 5.1.6 on 2026-10-18 16:35
+
+import rest_framework.utils.encoders
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0006_activity_timeline_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=50, unique=True)),
+                ('sections', models.JSONField(encoder=rest_framework.utils.encoders.JSONEncoder)),
+                ('digest', models.CharField(max_length=40)),
+                ('generated_at', models.DateTimeField()),
+            ],
+        ),
+    ]
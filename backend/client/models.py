@@ -1,4 +1,8 @@
+import datetime
+
 from django.db import models
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
 from core.models import User
 # Create your models here.
 
@@ -21,12 +25,40 @@ class Event(models.Model):
         help_text="Notification time in minutes before the event."
     )
     notification_sent = models.BooleanField(default=False)
+    # When the reminder is due: start of the event day minus notification_time
+    notify_at = models.DateTimeField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['notification_sent', 'notify_at'], name='event_due_reminder_idx'),
+        ]
+
     def __str__(self):
         return f"{self.title} - {self.user.username}"
 
+    def compute_notify_at(self):
+        start = self._meta.get_field('start').to_python(self.start)
+        if start is None:
+            return None
+        if not isinstance(start, datetime.datetime):
+            start = datetime.datetime.combine(start, datetime.time.min)
+        if timezone.is_naive(start):
+            start = timezone.make_aware(start)
+        return start - datetime.timedelta(minutes=self.notification_time or 0)
+
+    def save(self, *args, **kwargs):
+        notify_at = self.compute_notify_at()
+        if notify_at != self.notify_at:
+            self.notify_at = notify_at
+            # Moved back into the future: remind again at the new time
+            if self.notification_sent and notify_at is not None and notify_at > timezone.now():
+                self.notification_sent = False
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'notify_at', 'notification_sent'}
+        super().save(*args, **kwargs)
+
 
 class Activity(models.Model):
     ACTIVITY_TYPES = [
@@ -55,6 +87,11 @@ class Activity(models.Model):
     
     class Meta:
         ordering = ['-timestamp']  # Order by most recent activity
+        indexes = [
+            # Timeline seeks: a user's feed, and their feed for one related model
+            models.Index(fields=['user', '-timestamp', '-id'], name='activity_user_timeline_idx'),
+            models.Index(fields=['user', 'related_model', '-timestamp', '-id'], name='activity_user_model_idx'),
+        ]
 
     def __str__(self):
         return f'{self.user.username} - {self.activity_type} - {self.timestamp}'
@@ -67,3 +104,60 @@ class Activity(models.Model):
         return self.description
     
     
+
+
+class ClientDashboardSummary(models.Model):
+    """
+    Read model behind the client dashboards, one row per client.  Refreshed
+    after commit whenever one of the client's projects, tasks, milestones or
+    payments changes; the week and month windows roll over on ``computed_on``.
+    """
+    client = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='dashboard_summary')
+    active_projects = models.PositiveIntegerField(default=0)
+    pending_tasks = models.PositiveIntegerField(default=0)
+    total_spent = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    tasks_due_this_week = models.PositiveIntegerField(default=0)
+    projects_completed_ahead_last_month = models.FloatField(default=0)
+    computed_on = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Dashboard summary for {self.client_id}"
+
+
+class DailySpendingRollup(models.Model):
+    """
+    Payments sent by a user, summed per project, currency and local day.
+    Adjusted on every Payment write, so spending charts add up a few
+    buckets instead of scanning the payment history.  A (user, project,
+    currency, day) key may span several rows; readers always sum them.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='spending_rollups')
+    project = models.ForeignKey('core.Project', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    currency = models.CharField(max_length=10, default='INR')
+    day = models.DateField()
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    payment_count = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'day'], name='spending_rollup_user_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.day} {self.amount}{self.currency}"
+
+
+class LeaderboardSnapshot(models.Model):
+    """
+    Precomputed marketplace-wide sections, one row per key, written by the
+    ``refresh_homepage_leaderboards`` task and read by every web process.
+    """
+    key = models.CharField(max_length=50, unique=True)
+    # Stored as the API renders it, so every reader serves the same JSON
+    sections = models.JSONField(encoder=JSONEncoder)
+    digest = models.CharField(max_length=40)
+    generated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.key} leaderboards at {self.generated_at}"
@@ -0,0 +1,104 @@
+"""
+Collaboration listing for the client dashboard.
+
+A user's collaborations are listed in buckets: one per Collaboration
+``STATUS`` for the collaborations they are a member of, plus ``admin`` for
+the ones they administer.  The first page of every status bucket comes
+from one query that numbers the rows per STATUS with a window function,
+and each bucket then pages on its own keyset cursor.  The per-user index
+of bucket sizes is only reported, never used to decide what to query;
+it is cached under the user's shared ``CacheVersion``, which is bumped
+whenever their memberships, invitations or collaborations change.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Window, prefetch_related_objects
+from django.db.models.functions import RowNumber
+from rest_framework.exceptions import ValidationError
+
+from collaborations.models import Collaboration, CollaborationInvitation
+from core.pagination import KeysetPaginator
+from core.services.cache_version_service import CacheVersionService
+
+STATUSES = [status for status, _ in Collaboration.STATUS_CHOICES]
+ADMIN = 'admin'
+BUCKETS = [*STATUSES, ADMIN]
+
+INDEX_TIMEOUT = 60 * 60
+
+
+def _version_scope(user_id):
+    return f'collaborations:{user_id}'
+
+
+class CollaborationListService:
+    paginator = KeysetPaginator(ordering=('-created_at', '-id'), page_size=20, max_page_size=100)
+
+    @staticmethod
+    def bucket_queryset(user, bucket):
+        if bucket == ADMIN:
+            return Collaboration.objects.filter(admin=user)
+        if bucket not in STATUSES:
+            raise ValidationError({'bucket': f'Choose from {", ".join(BUCKETS)}'})
+        return Collaboration.objects.filter(memberships__user=user, STATUS=bucket)
+
+    @staticmethod
+    def membership_index(user):
+        """{'counts': {bucket: size}, 'pending_invitations': n}, cached per user"""
+        scope = _version_scope(user.pk)
+        key = f'collaborations:index:{user.pk}:{CacheVersionService.get_many([scope])[scope]}'
+        index = cache.get(key)
+        if index is None:
+            by_status = dict(
+                Collaboration.objects.filter(memberships__user=user)
+                .order_by().values_list('STATUS').annotate(Count('id'))
+            )
+            counts = {status: by_status.get(status, 0) for status in STATUSES}
+            counts[ADMIN] = Collaboration.objects.filter(admin=user).count()
+            index = {
+                'counts': counts,
+                'pending_invitations': CollaborationInvitation.objects.filter(receiver=user, status='pending').count(),
+            }
+            cache.set(key, index, INDEX_TIMEOUT)
+        return index
+
+    @staticmethod
+    def invalidate(user_ids):
+        """Move the users' index versions once the current transaction commits"""
+        scopes = [_version_scope(user_id) for user_id in set(user_ids) if user_id]
+        if scopes:
+            transaction.on_commit(lambda: CacheVersionService.bump(scopes))
+
+    @staticmethod
+    def first_pages(user, page_size):
+        """{bucket: (collaborations, next_cursor)} for every bucket"""
+        paginator = CollaborationListService.paginator
+        rows = {bucket: [] for bucket in BUCKETS}
+
+        ranked = (
+            Collaboration.objects.filter(memberships__user=user, STATUS__in=STATUSES)
+            .annotate(bucket_row=Window(
+                RowNumber(), partition_by=F('STATUS'), order_by=[F('created_at').desc(), F('id').desc()]
+            ))
+            .filter(bucket_row__lte=page_size + 1)
+            .order_by(*paginator.ordering)
+        )
+        for collaboration in ranked:
+            rows[collaboration.STATUS].append(collaboration)
+        rows[ADMIN] = list(
+            CollaborationListService.bucket_queryset(user, ADMIN).order_by(*paginator.ordering)[:page_size + 1]
+        )
+
+        pages = {}
+        for bucket, collaborations in rows.items():
+            has_more = len(collaborations) > page_size
+            collaborations = collaborations[:page_size]
+            pages[bucket] = (collaborations, paginator.encode_cursor(collaborations[-1]) if has_more else None)
+        prefetch_related_objects([c for collaborations, _ in pages.values() for c in collaborations], 'admin')
+        return pages
+
+    @staticmethod
+    def bucket_page(request, bucket):
+        """(collaborations, next_cursor) for the page of one bucket selected by the request's cursor"""
+        queryset = CollaborationListService.bucket_queryset(request.user, bucket).prefetch_related('admin')
+        return CollaborationListService.paginator.paginate(request, queryset)
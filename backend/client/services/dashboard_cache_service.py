@@ -0,0 +1,149 @@
+"""
+Conditional GET and response caching for the polled client dashboards.
+
+Each user has a version: the time, in microseconds, of the latest change
+to anything their dashboards are built from, bumped after commit by the
+receivers in ``client.signals``.  Versions are ``CacheVersion`` rows, so
+a change written by any web worker or Celery task is seen by every
+process with one indexed read per request.  Views answer ``If-None-Match`` and
+``If-Modified-Since`` from that version alone, and cache their response
+data per (user, view, query params, version), so a bump invalidates every
+cached body of that user at once.  Views showing marketplace-wide data
+also depend on a global version.  The current day is part of every
+validator because the week and month windows roll over at midnight.
+"""
+import hashlib
+import time
+from datetime import datetime, time as day_start
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponseNotModified, JsonResponse
+from django.utils import timezone
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from core.services.cache_version_service import CacheVersionService
+
+RESPONSE_TIMEOUT = getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 60 * 5)
+
+GLOBAL = 'global'
+
+
+def _version_scope(scope):
+    return f'dashboard:{scope}'
+
+
+class DashboardCacheService:
+    @staticmethod
+    def get_versions(scopes):
+        """{scope: version} for user ids and GLOBAL"""
+        versions = CacheVersionService.get_many(_version_scope(scope) for scope in scopes)
+        return {scope: versions[_version_scope(scope)] for scope in scopes}
+
+    @staticmethod
+    def touch(scopes):
+        """Mark the given user ids (or GLOBAL) as changed now"""
+        CacheVersionService.bump(_version_scope(scope) for scope in scopes if scope)
+
+    @staticmethod
+    def schedule_touch(scopes):
+        scopes = {scope for scope in scopes if scope}
+        if scopes:
+            transaction.on_commit(lambda: DashboardCacheService.touch(scopes))
+
+    @staticmethod
+    def validators(user_id, view_name, params, global_data=False):
+        """(etag, last_modified as a UNIX timestamp, cache key) for this user's view"""
+        scopes = [user_id, GLOBAL] if global_data else [user_id]
+        versions = DashboardCacheService.get_versions(scopes)
+        today = timezone.localdate()
+        params_hash = hashlib.sha1(
+            '&'.join(f'{key}={value}' for key, value in sorted(params.items())).encode('utf-8')
+        ).hexdigest()[:16]
+        tag = hashlib.sha1(
+            f'{view_name}:{user_id}:{today}:{params_hash}:{sorted(versions.items(), key=str)}'.encode('utf-8')
+        ).hexdigest()[:32]
+        midnight = timezone.make_aware(datetime.combine(today, day_start.min)).timestamp()
+        last_modified = max(max(versions.values()) / 1_000_000, midnight)
+        return f'"{tag}"', int(last_modified), f'dashboard:response:{user_id}:{view_name}:{tag}'
+
+    @staticmethod
+    def not_modified(request, etag, last_modified):
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            etags = parse_etags(if_none_match)
+            return '*' in etags or etag in etags or etag.strip('"') in etags
+        if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since') or '')
+        # Dates have one-second resolution: trust them only once that second is over
+        return (
+            if_modified_since is not None
+            and last_modified <= if_modified_since
+            and last_modified < int(time.time())
+        )
+
+    @staticmethod
+    async def respond_async(request, user_id, view_name, build, global_data=False):
+        """
+        Async counterpart of ``cache_dashboard_response`` for plain Django
+        views.  ``build`` is a coroutine function returning (data, complete);
+        partial payloads are served with ``no-store`` and no validators, so
+        they are neither cached here nor revalidated into a 304 later.
+        """
+        etag, last_modified, key = await sync_to_async(DashboardCacheService.validators)(
+            user_id, view_name, request.GET.dict(), global_data
+        )
+        complete = True
+        if DashboardCacheService.not_modified(request, etag, last_modified):
+            response = HttpResponseNotModified()
+        else:
+            data = await sync_to_async(cache.get)(key)
+            if data is None:
+                data, complete = await build()
+                if complete:
+                    await sync_to_async(cache.set)(key, data, RESPONSE_TIMEOUT)
+            response = JsonResponse(data, encoder=JSONEncoder, safe=False)
+
+        if complete:
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            response['Cache-Control'] = 'private, no-cache'
+        else:
+            response['Cache-Control'] = 'no-store'
+        return response
+
+
+def cache_dashboard_response(view_name, global_data=False, timeout=None):
+    """Decorator for an APIView ``get`` serving 304s and cached bodies per user and query params"""
+    def decorator(get):
+        @wraps(get)
+        def wrapper(self, request, *args, **kwargs):
+            user_id = request.user.pk
+            etag, last_modified, key = DashboardCacheService.validators(
+                user_id, view_name, request.query_params.dict(), global_data
+            )
+
+            if DashboardCacheService.not_modified(request, etag, last_modified):
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                data = cache.get(key)
+                if data is not None:
+                    response = Response(data)
+                else:
+                    response = get(self, request, *args, **kwargs)
+                    if response.status_code != status.HTTP_200_OK:
+                        return response
+                    cache.set(key, response.data, RESPONSE_TIMEOUT if timeout is None else timeout)
+
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            # Let browsers keep the body but always revalidate it
+            response['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,75 @@
+"""
+Concurrent composition of dashboard sections for the async views.
+
+Each section is an independent, synchronous callable (ORM queries plus
+serialization).  Sections run on a bounded thread pool, so a page never
+holds more than ``DASHBOARD_SECTION_WORKERS`` database connections for
+its sections, and each one gets its own timeout: a section that is slow
+or fails is reported in ``section_errors`` and left out, while the rest
+of the page is still returned.
+"""
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+logger = logging.getLogger(__name__)
+
+SECTION_TIMEOUT = getattr(settings, 'DASHBOARD_SECTION_TIMEOUT', 2.0)
+
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'DASHBOARD_SECTION_WORKERS', 8), thread_name_prefix='dashboard-section'
+)
+
+
+def _run_section(section):
+    try:
+        return section()
+    finally:
+        # Pool threads outlive the request; release their connections like request_finished would
+        close_old_connections()
+
+
+class DashboardComposeService:
+    @staticmethod
+    async def authenticate(request):
+        """The JWT-authenticated user of a plain Django request, or None"""
+        try:
+            result = await sync_to_async(JWTAuthentication().authenticate)(request)
+        except AuthenticationFailed:
+            return None
+        return result[0] if result else None
+
+    @staticmethod
+    async def gather(sections, timeout=None, timeouts=None):
+        """
+        Run {name: callable} concurrently and return (results, errors).
+        A section that times out or raises is missing from ``results`` and
+        listed in ``errors`` as "timeout" or "error".
+        """
+        loop = asyncio.get_running_loop()
+        timeouts = timeouts or {}
+
+        async def run(name, section):
+            limit = timeouts.get(name, SECTION_TIMEOUT if timeout is None else timeout)
+            return await asyncio.wait_for(loop.run_in_executor(_executor, _run_section, section), limit)
+
+        names = list(sections)
+        outcomes = await asyncio.gather(*(run(name, sections[name]) for name in names), return_exceptions=True)
+
+        results, errors = {}, {}
+        for name, outcome in zip(names, outcomes):
+            if isinstance(outcome, asyncio.TimeoutError):
+                logger.warning("Dashboard section %s timed out", name)
+                errors[name] = 'timeout'
+            elif isinstance(outcome, BaseException):
+                logger.error("Dashboard section %s failed", name, exc_info=outcome)
+                errors[name] = 'error'
+            else:
+                results[name] = outcome
+        return results, errors
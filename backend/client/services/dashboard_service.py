@@ -0,0 +1,155 @@
+import threading
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Prefetch, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from core.models import Project, Skill, Task, User
+from ..models import ClientDashboardSummary
+
+SUMMARY_FIELDS = [
+    'active_projects', 'pending_tasks', 'total_spent', 'tasks_due_this_week', 'projects_completed_ahead_last_month',
+]
+
+# Clients whose summary must be refreshed once the current transaction commits
+_pending = threading.local()
+
+
+def _project_aggregates():
+    return {
+        'active_projects': Count('id', filter=Q(status='ongoing')),
+        'total_spent': Coalesce(Sum('total_spent'), Value(Decimal('0')), output_field=DecimalField()),
+    }
+
+
+def _task_aggregates(today):
+    start_of_week = today - timedelta(days=today.weekday())
+    end_of_last_month = today.replace(day=1) - timedelta(days=1)
+    start_of_last_month = end_of_last_month.replace(day=1)
+
+    completed_last_month = Q(
+        status='completed', deadline__gte=start_of_last_month, deadline__lte=end_of_last_month
+    )
+    return {
+        'pending_tasks': Count('id', filter=Q(status='pending')),
+        'tasks_due_this_week': Count(
+            'id', filter=Q(deadline__gte=start_of_week, deadline__lte=start_of_week + timedelta(days=7))
+        ),
+        'completed_last_month': Count('id', filter=completed_last_month),
+        'completed_ahead_last_month': Count(
+            'id', filter=completed_last_month & Q(completed_at__date__lt=F('deadline'))
+        ),
+    }
+
+
+def _finish_task_stats(stats):
+    completed = stats.pop('completed_last_month')
+    ahead = stats.pop('completed_ahead_last_month')
+    stats['projects_completed_ahead_last_month'] = ahead / completed * 100 if completed else 0
+    return stats
+
+
+class DashboardService:
+    """Client dashboard figures computed with conditional aggregates, independent of project count"""
+
+    @staticmethod
+    def project_stats(user):
+        """Active projects and total spent in one query"""
+        return Project.objects.filter(client=user).aggregate(**_project_aggregates())
+
+    @staticmethod
+    def task_stats(user, today=None):
+        """Pending, due-this-week and last month's completion figures in one query"""
+        today = today or timezone.localdate()
+        return _finish_task_stats(Task.objects.filter(project__client=user).aggregate(**_task_aggregates(today)))
+
+    @staticmethod
+    def recent_projects(user, limit=8):
+        """Latest projects with everything ProjectSerializer reads prefetched"""
+        skills = Skill.objects.select_related('category')
+        return (
+            Project.objects.filter(client=user)
+            .select_related('domain')
+            .prefetch_related(
+                # Skill.__str__ reads the category
+                Prefetch('skills_required', queryset=skills),
+                'milestones',
+                Prefetch('tasks', queryset=Task.objects.prefetch_related(
+                    Prefetch('skills_required_for_task', queryset=skills), 'assigned_to'
+                )),
+            )
+            .order_by('-created_at')[:limit]
+        )
+
+    @staticmethod
+    def overview(user):
+        return {
+            **DashboardService.project_stats(user),
+            **DashboardService.task_stats(user),
+        }
+
+    @staticmethod
+    def compute_summaries(client_ids=None, today=None):
+        """
+        Unsaved ClientDashboardSummary rows for ``client_ids`` (every client
+        with a project when None), two grouped queries for the whole batch.
+        """
+        today = today or timezone.localdate()
+        projects = Project.objects.all()
+        tasks = Task.objects.all()
+        if client_ids is not None:
+            projects = projects.filter(client_id__in=client_ids)
+            tasks = tasks.filter(project__client_id__in=client_ids)
+
+        stats = {client_id: {} for client_id in (client_ids or [])}
+        for row in projects.order_by().values('client_id').annotate(**_project_aggregates()):
+            stats.setdefault(row.pop('client_id'), {}).update(row)
+        for row in tasks.order_by().values('project__client_id').annotate(**_task_aggregates(today)):
+            stats.setdefault(row.pop('project__client_id'), {}).update(_finish_task_stats(row))
+
+        return [
+            ClientDashboardSummary(client_id=client_id, computed_on=today, **values)
+            for client_id, values in stats.items()
+        ]
+
+    @staticmethod
+    def refresh_summaries(client_ids, batch_size=500):
+        client_ids = list(client_ids)
+        for start in range(0, len(client_ids), batch_size):
+            # Skip clients deleted in the transaction that scheduled the refresh
+            chunk = list(User.objects.filter(id__in=client_ids[start:start + batch_size]).values_list('id', flat=True))
+            ClientDashboardSummary.objects.bulk_create(
+                DashboardService.compute_summaries(chunk),
+                update_conflicts=True,
+                unique_fields=['client'],
+                update_fields=[*SUMMARY_FIELDS, 'computed_on', 'updated_at'],
+            )
+
+    @staticmethod
+    def schedule_refresh(client_ids):
+        """Refresh these clients' summaries after commit, once per transaction however many rows changed"""
+        client_ids = {client_id for client_id in client_ids if client_id}
+        if not client_ids:
+            return
+        if not hasattr(_pending, 'client_ids'):
+            _pending.client_ids = set()
+        _pending.client_ids.update(client_ids)
+
+        def flush():
+            pending, _pending.client_ids = _pending.client_ids, set()
+            if pending:
+                DashboardService.refresh_summaries(pending)
+
+        transaction.on_commit(flush)
+
+    @staticmethod
+    def get_summary(user):
+        """The client's summary row, recomputed when missing or from an earlier day"""
+        summary = ClientDashboardSummary.objects.filter(client=user).first()
+        if summary is None or summary.computed_on != timezone.localdate():
+            DashboardService.refresh_summaries([user.pk])
+            summary = ClientDashboardSummary.objects.get(client=user)
+        return summary
@@ -0,0 +1,112 @@
+"""
+Marketplace-wide homepage sections, precomputed.
+
+``refresh_homepage_leaderboards`` (Celery beat) recomputes trending skills,
+top freelancers and success stories and stores them as one
+``LeaderboardSnapshot`` row, so the homepage reads these sections with a
+single primary-key lookup in whichever process serves it.  When the
+snapshot's content changes, the global dashboard version is bumped so
+homepage ETags and cached bodies change with it.  A snapshot older than
+``SNAPSHOT_MAX_AGE`` (e.g. while beat is down) is recomputed on read.
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.db.models import Count, F
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
+
+from core.models import Project, Skill, User
+from ..models import LeaderboardSnapshot
+from .dashboard_cache_service import GLOBAL, DashboardCacheService
+
+HOMEPAGE = 'homepage'
+SNAPSHOT_MAX_AGE = timedelta(hours=1)
+LIMIT = 5
+
+
+class LeaderboardService:
+    @staticmethod
+    def trending_skills(limit=LIMIT):
+        skills = (
+            Skill.objects.annotate(
+                # Distinct, so a skill's project and task rows do not multiply each other
+                demand=Count('projects', distinct=True) + Count('tasks', distinct=True)
+            )
+            .order_by('-demand', 'name')
+            .values('name', 'demand')[:limit]
+        )
+        return list(skills)
+
+    @staticmethod
+    def top_freelancers(limit=LIMIT):
+        rows = (
+            User.objects.filter(role='freelancer', freelancer_profile__isnull=False)
+            .order_by(F('freelancer_profile__average_rating').desc(nulls_last=True), 'id')
+            .values('id', 'username', 'freelancer_profile__average_rating', 'freelancer_profile__profile_picture')[:limit]
+        )
+        return [
+            {
+                'id': row['id'],
+                'name': row['username'],
+                'rating': row['freelancer_profile__average_rating'],
+                'avatar': (
+                    default_storage.url(row['freelancer_profile__profile_picture'])
+                    if row['freelancer_profile__profile_picture'] else None
+                ),
+            }
+            for row in rows
+        ]
+
+    @staticmethod
+    def success_stories(limit=LIMIT):
+        projects = list(
+            Project.objects.filter(status='completed')
+            .order_by('-created_at')
+            .values('id', 'title', 'description', 'budget')[:limit]
+        )
+        freelancers = {}
+        assignments = (
+            Project.assigned_to.through.objects.filter(project_id__in=[project['id'] for project in projects])
+            .order_by('id')
+            .values_list('project_id', 'user_id', 'user__username')
+        )
+        for project_id, user_id, username in assignments:
+            freelancers.setdefault(project_id, []).append({'id': user_id, 'username': username})
+        return [
+            {
+                'title': project['title'],
+                'description': project['description'],
+                'budget': project['budget'],
+                'freelancers': freelancers.get(project['id'], []),
+            }
+            for project in projects
+        ]
+
+    @staticmethod
+    def rebuild():
+        """Recompute and store the snapshot; returns it"""
+        payload = json.dumps({
+            'trending_skills': LeaderboardService.trending_skills(),
+            'top_freelancers': LeaderboardService.top_freelancers(),
+            'success_stories': LeaderboardService.success_stories(),
+        }, cls=JSONEncoder, sort_keys=True)
+        digest = hashlib.sha1(payload.encode('utf-8')).hexdigest()
+        previous = LeaderboardSnapshot.objects.filter(key=HOMEPAGE).values_list('digest', flat=True).first()
+
+        snapshot, _ = LeaderboardSnapshot.objects.update_or_create(key=HOMEPAGE, defaults={
+            'sections': json.loads(payload), 'digest': digest, 'generated_at': timezone.now(),
+        })
+        if previous != digest:
+            DashboardCacheService.touch([GLOBAL])
+        return snapshot
+
+    @staticmethod
+    def get_snapshot():
+        """The homepage sections from the stored snapshot, computed when it is missing or too old"""
+        snapshot = LeaderboardSnapshot.objects.filter(key=HOMEPAGE).first()
+        if snapshot is None or timezone.now() - snapshot.generated_at > SNAPSHOT_MAX_AGE:
+            snapshot = LeaderboardService.rebuild()
+        return snapshot.sections
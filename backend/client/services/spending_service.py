@@ -0,0 +1,217 @@
+"""
+Spending charts served from ``DailySpendingRollup`` buckets.
+
+Every Payment write moves its amount between (user, project, currency,
+day) buckets with ``F()`` updates; charts read the buckets for the range
+they show, already summed per day by the database, and a NumPy resampler
+folds the days into the chart's labels.
+"""
+import calendar
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from core.models import Payment
+from ..models import DailySpendingRollup
+
+WEEKDAY_LABELS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+MONTH_LABELS = [calendar.month_name[i] for i in range(1, 13)]
+
+# Custom ranges longer than this are charted per month instead of per day
+MAX_DAILY_POINTS = 92
+
+
+def _rollup_key(user_id, project_id, currency, payment_date):
+    return user_id, project_id, currency, timezone.localdate(payment_date)
+
+
+def resample(days, amounts, keys, size):
+    """
+    Sum ``amounts`` into ``size`` bins.  ``days`` is a datetime64[D] array and
+    ``keys`` maps it to bin indexes; days mapped outside [0, size) are dropped.
+    """
+    if not len(days):
+        return np.zeros(size)
+    index = keys(days)
+    inside = (index >= 0) & (index < size)
+    return np.bincount(index[inside], weights=amounts[inside], minlength=size)
+
+
+def weekday_keys(days):
+    # 1970-01-01 was a Thursday
+    return (days.astype(np.int64) + 3) % 7
+
+
+def month_of_year_keys(days):
+    return days.astype('datetime64[M]').astype(np.int64) % 12
+
+
+def year_keys(first_year):
+    return lambda days: days.astype('datetime64[Y]').astype(np.int64) + 1970 - first_year
+
+
+def month_keys(first_month):
+    return lambda days: days.astype('datetime64[M]').astype(np.int64) - np.datetime64(first_month, 'M').astype(np.int64)
+
+
+def day_keys(first_day):
+    return lambda days: (days - np.datetime64(first_day, 'D')).astype(np.int64)
+
+
+def _chart(labels, data):
+    return {
+        'labels': labels,
+        'datasets': [
+            {
+                'label': 'Spend Over Time',
+                'data': [round(float(value), 2) for value in data],
+                'borderColor': 'rgba(75,192,192,1)',
+                'fill': False,
+            },
+        ],
+    }
+
+
+def _parse_date(params, name):
+    raw = params.get(name)
+    if not raw:
+        raise ValidationError({name: 'Required for a custom time frame'})
+    try:
+        return date.fromisoformat(raw)
+    except ValueError:
+        raise ValidationError({name: 'Expected a date in YYYY-MM-DD format'})
+
+
+class SpendingRollupService:
+    @staticmethod
+    def apply_deltas(deltas):
+        """Move {(user_id, project_id, currency, day): (amount, count)} into the buckets"""
+        for (user_id, project_id, currency, day), (amount, count) in deltas.items():
+            if not amount and not count:
+                continue
+            buckets = DailySpendingRollup.objects.filter(
+                user_id=user_id, project_id=project_id, currency=currency, day=day
+            )
+            # Several rows may share a key; adjusting any one of them keeps the sum right
+            bucket_id = buckets.values_list('id', flat=True).first()
+            if bucket_id is not None:
+                DailySpendingRollup.objects.filter(id=bucket_id).update(
+                    amount=F('amount') + amount, payment_count=F('payment_count') + count
+                )
+            else:
+                DailySpendingRollup.objects.create(
+                    user_id=user_id, project_id=project_id, currency=currency, day=day,
+                    amount=amount, payment_count=count,
+                )
+
+    @staticmethod
+    def record_save(payment):
+        deltas = defaultdict(lambda: (Decimal('0'), 0))
+
+        def add(key, amount, count):
+            old_amount, old_count = deltas[key]
+            deltas[key] = (old_amount + amount, old_count + count)
+
+        loaded = getattr(payment, '_loaded_spending', None)
+        if loaded is not None and loaded[3] is not None:
+            *key, amount = loaded
+            add(_rollup_key(*key), -amount, -1)
+        add(_rollup_key(payment.from_user_id, payment.project_id, payment.currency, payment.payment_date),
+            Decimal(payment.amount), 1)
+        SpendingRollupService.apply_deltas(deltas)
+        payment._loaded_spending = (
+            payment.from_user_id, payment.project_id, payment.currency, payment.payment_date, Decimal(payment.amount)
+        )
+
+    @staticmethod
+    def record_delete(payment):
+        loaded = getattr(payment, '_loaded_spending', None)
+        if loaded is None:
+            loaded = (payment.from_user_id, payment.project_id, payment.currency, payment.payment_date, payment.amount)
+        *key, amount = loaded
+        SpendingRollupService.apply_deltas({_rollup_key(*key): (-Decimal(amount), -1)})
+
+    @staticmethod
+    def backfill(user_ids=None, batch_size=1000):
+        """Rebuild the buckets from the payments table; returns the number of buckets written"""
+        payments = Payment.objects.all()
+        rollups = DailySpendingRollup.objects.all()
+        if user_ids is not None:
+            payments = payments.filter(from_user_id__in=user_ids)
+            rollups = rollups.filter(user_id__in=user_ids)
+
+        grouped = (
+            payments.annotate(day=TruncDate('payment_date'))
+            .order_by()
+            .values_list('from_user_id', 'project_id', 'currency', 'day')
+            .annotate(amount=Sum('amount'), payment_count=Count('id'))
+        )
+        buckets = [
+            DailySpendingRollup(
+                user_id=user_id, project_id=project_id, currency=currency, day=day,
+                amount=amount, payment_count=payment_count,
+            )
+            for user_id, project_id, currency, day, amount, payment_count in grouped.iterator(chunk_size=batch_size)
+        ]
+        with transaction.atomic():
+            rollups.delete()
+            DailySpendingRollup.objects.bulk_create(buckets, batch_size=batch_size)
+        return len(buckets)
+
+    @staticmethod
+    def daily_totals(user, start=None, end=None, currency=None):
+        """(days as datetime64[D], amounts as float64) for the user's spending, one entry per day"""
+        rollups = DailySpendingRollup.objects.filter(user=user)
+        if start is not None:
+            rollups = rollups.filter(day__gte=start)
+        if end is not None:
+            rollups = rollups.filter(day__lte=end)
+        if currency:
+            rollups = rollups.filter(currency=currency)
+        rows = list(rollups.order_by('day').values_list('day').annotate(total=Sum('amount')))
+        days = np.array([day for day, _ in rows], dtype='datetime64[D]')
+        amounts = np.array([float(total) for _, total in rows], dtype=np.float64)
+        return days, amounts
+
+    @staticmethod
+    def chart(user, time_frame='monthly', params=None, today=None):
+        params = params or {}
+        today = today or timezone.localdate()
+        currency = params.get('currency')
+
+        if time_frame == 'weekly':
+            start_of_week = today - timedelta(days=today.weekday())
+            days, amounts = SpendingRollupService.daily_totals(user, start_of_week, currency=currency)
+            return _chart(WEEKDAY_LABELS, resample(days, amounts, weekday_keys, 7))
+
+        if time_frame == 'monthly':
+            # Month of the year, across every year of history
+            days, amounts = SpendingRollupService.daily_totals(user, currency=currency)
+            return _chart(MONTH_LABELS, resample(days, amounts, month_of_year_keys, 12))
+
+        if time_frame == 'yearly':
+            days, amounts = SpendingRollupService.daily_totals(user, currency=currency)
+            first_year = int(str(days[0].astype('datetime64[Y]'))) if len(days) else today.year
+            labels = [str(year) for year in range(first_year, today.year + 1)]
+            return _chart(labels, resample(days, amounts, year_keys(first_year), len(labels)))
+
+        if time_frame == 'custom':
+            start, end = _parse_date(params, 'start'), _parse_date(params, 'end')
+            if start > end:
+                raise ValidationError({'start': 'Must not be after end'})
+            days, amounts = SpendingRollupService.daily_totals(user, start, end, currency=currency)
+            if (end - start).days < MAX_DAILY_POINTS:
+                labels = [(start + timedelta(days=offset)).isoformat() for offset in range((end - start).days + 1)]
+                return _chart(labels, resample(days, amounts, day_keys(start), len(labels)))
+            months = np.arange(np.datetime64(start, 'M'), np.datetime64(end, 'M') + 1)
+            labels = [str(month) for month in months]
+            return _chart(labels, resample(days, amounts, month_keys(start), len(labels)))
+
+        return {'error': 'Invalid time frame. Choose from "weekly", "monthly", "yearly" or "custom".'}
@@ -43,23 +43,23 @@ def notify_task_deadline(sender, instance, created, **kwargs):
             if days_left in [4, 3, 2, 1, 0]:  # Notify when deadline is in 4, 3, 2, 1, or 0 days
                 notification_text = f"Your task '{instance.title}' deadline is approaching! Only {days_left} day(s) left!"
                 
-                # Check if assigned_to field has users
-                if instance.assigned_to.exists():
-                    for user in instance.assigned_to.all():
-                        print(f"Notifying user {user.username} about task deadline.")  # Debugging output
-                        Notification.objects.create(
-                            user=user,
-                            type="Projects & Tasks",
-                            related_model_id=instance.id,
-                            notification_text=notification_text
-                        )
-                
-                Notification.objects.create(
-                        user=instance.project.client,
-                        type="Projects",
+                # Notify every assigned user and the client in one batch
+                notifications = [
+                    Notification(
+                        user=user,
+                        type="Projects & Tasks",
                         related_model_id=instance.id,
                         notification_text=notification_text
-                )  # Debugging output
+                    )
+                    for user in instance.assigned_to.all()
+                ]
+                notifications.append(Notification(
+                    user=instance.project.client,
+                    type="Projects",
+                    related_model_id=instance.id,
+                    notification_text=notification_text
+                ))
+                NotificationService.bulk_send(notifications)
 
 
 
@@ -71,53 +71,46 @@ from channels.layers import get_channel_layer
 from core.models import Notification
 from asgiref.sync import async_to_sync
 
-def update_unread_notification_count(user):
-    """Helper function to get the unread notification count."""
-    return Notification.objects.filter(user=user, is_read=False).count()
-
-# Triggered when a Notification is created or updated (post_save)
-@receiver(post_save, sender=Notification)
-def notify_count_user_on_new_notification(sender, instance, created, **kwargs):
-    """Send real-time notification when a new Notification object is created."""
-    user = instance.user
-    channel_layer = get_channel_layer()
+from django.db import transaction
+from core.services.notification_counter_service import NotificationCounterService
+from core.services.notification_service import NotificationService, notification_payload
 
-    # Get unread notification count
-    unread_count = update_unread_notification_count(user)
 
-    group_name = f"user_{user.id}"
+def broadcast_unread_notification_count(user_id):
+    """Push the user's unread badge, read from the counters rather than the table"""
+    counts = NotificationCounterService.get_counts(user_id)
+    channel_layer = get_channel_layer()
 
     # Send the message to the group
     async_to_sync(channel_layer.group_send)(
-        group_name, 
+        f"user_{user_id}",
         {
             "type": "send_notification_count",
-            "notifications_count": unread_count
+            "notifications_count": sum(counts.values()),
+            "notifications_by_type": counts,
         }
     )
 
+# Triggered when a Notification is created or updated (post_save)
+@receiver(post_save, sender=Notification)
+def notify_count_user_on_new_notification(sender, instance, created, **kwargs):
+    """Adjust the unread counters and send the new count once the write commits."""
+    was_read = getattr(instance, '_loaded_is_read', None)
+    was_type = getattr(instance, '_loaded_type', instance.type)
+    NotificationCounterService.record_save(instance, created)
+
+    # Saves that do not change the unread state leave the badge alone
+    if created or was_read != instance.is_read or was_type != instance.type:
+        user_id = instance.user_id
+        transaction.on_commit(lambda: broadcast_unread_notification_count(user_id))
+
 # Triggered when a Notification is deleted (post_delete)
 @receiver(post_delete, sender=Notification)
 def notify_count_user_on_deleted_notification(sender, instance, **kwargs):
-    """Send real-time notification when a Notification object is deleted."""
-    user = instance.user
-    channel_layer = get_channel_layer()
-
-    # Get unread notification count
-    unread_count = update_unread_notification_count(user)
-
-    group_name = f"user_{user.id}"
-
-    print(unread_count)
-
-    # Send the updated unread count to the group
-    async_to_sync(channel_layer.group_send)(
-        group_name, 
-        {
-            "type": "send_notification_count",
-            "notifications_count": unread_count
-        }
-    )
+    """Adjust the unread counters and send the new count once the delete commits."""
+    NotificationCounterService.record_delete(instance)
+    user_id = instance.user_id
+    transaction.on_commit(lambda: broadcast_unread_notification_count(user_id))
 
 
 
@@ -129,23 +122,146 @@ def send_notification_to_user(sender, instance, created, **kwargs):
         channel_layer = get_channel_layer()
         group_name = f"user_notification_{user.id}"
 
-        # Prepare a serializable data dictionary
-        notification_data = {
-            'id': instance.id,
-            'title': instance.title,
-            'notification_text': instance.notification_text,
-            'created_at': instance.created_at.isoformat(),  # Format the date as string
-            'related_model_id': instance.related_model_id,
-            'type': instance.type,
-        }
-
         # Send the notification data to the group
         async_to_sync(channel_layer.group_send)(
     group_name,
     {
         "type": "send_notification",  # This must match the method name in the consumer
-        "notification": notification_data  # Send the notification data
+        "notification": notification_payload(instance)  # Send the notification data
     }
 )
 
 
+from core.models import Milestone, Payment
+from .services.dashboard_service import DashboardService
+from .services.spending_service import SpendingRollupService
+from .services.dashboard_cache_service import DashboardCacheService
+from .models import Activity
+from django.db.models.signals import m2m_changed
+
+
+def _project_client_ids(project_ids):
+    return set(Project.objects.filter(id__in=[pk for pk in project_ids if pk]).values_list('client_id', flat=True))
+
+
+def _dashboards_changed(client_ids):
+    """Refresh the clients' summary rows and invalidate their cached dashboard responses"""
+    client_ids = set(client_ids)
+    DashboardService.schedule_refresh(client_ids)
+    DashboardCacheService.schedule_touch(client_ids)
+
+
+# Keep ClientDashboardSummary rows and cached dashboards in step with the rows they are computed from
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def refresh_summary_for_project(sender, instance, **kwargs):
+    _dashboards_changed([instance.client_id])
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def refresh_summary_for_task(sender, instance, **kwargs):
+    if Task.project.is_cached(instance):
+        _dashboards_changed([instance.project.client_id])
+    else:
+        _dashboards_changed(_project_client_ids([instance.project_id]))
+
+
+@receiver(post_save, sender=Milestone)
+@receiver(post_delete, sender=Milestone)
+def refresh_summary_for_milestone(sender, instance, **kwargs):
+    project_id = instance.project_id
+    if project_id is None and instance.task_id:
+        project_id = Task.objects.filter(id=instance.task_id).values_list('project_id', flat=True).first()
+    _dashboards_changed(_project_client_ids([project_id]))
+
+
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def refresh_summary_for_payment(sender, instance, **kwargs):
+    _dashboards_changed({instance.from_user_id, *_project_client_ids([instance.project_id])})
+
+
+@receiver(post_save, sender=Payment)
+def update_spending_rollup(sender, instance, **kwargs):
+    SpendingRollupService.record_save(instance)
+
+
+@receiver(post_delete, sender=Payment)
+def remove_from_spending_rollup(sender, instance, **kwargs):
+    SpendingRollupService.record_delete(instance)
+
+
+@receiver(post_save, sender=Activity)
+@receiver(post_delete, sender=Activity)
+def invalidate_activity_dashboards(sender, instance, **kwargs):
+    DashboardCacheService.schedule_touch([instance.user_id])
+
+
+@receiver(m2m_changed, sender=Project.assigned_to.through)
+@receiver(m2m_changed, sender=Project.skills_required.through)
+def invalidate_project_dashboards(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        client_ids = _project_client_ids(pk_set or [])
+    else:
+        client_ids = [instance.client_id]
+    DashboardCacheService.schedule_touch(client_ids)
+
+
+@receiver(m2m_changed, sender=Task.assigned_to.through)
+@receiver(m2m_changed, sender=Task.skills_required_for_task.through)
+def invalidate_task_dashboards(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        project_ids = Task.objects.filter(id__in=pk_set or []).values_list('project_id', flat=True)
+    else:
+        project_ids = [instance.project_id]
+    DashboardCacheService.schedule_touch(_project_client_ids(project_ids))
+
+
+
+from django.db.models.signals import pre_delete
+from collaborations.models import Collaboration, CollaborationInvitation, CollaborationMembership
+from .services.collaboration_service import CollaborationListService
+
+
+def _collaboration_user_ids(collaboration_ids):
+    members = CollaborationMembership.objects.filter(collaboration_id__in=collaboration_ids).values_list('user_id', flat=True)
+    admins = Collaboration.admin.through.objects.filter(collaboration_id__in=collaboration_ids).values_list('user_id', flat=True)
+    return {*members, *admins}
+
+
+# Drop cached collaboration indexes of everyone a change is visible to
+@receiver(post_save, sender=CollaborationMembership)
+@receiver(post_delete, sender=CollaborationMembership)
+def invalidate_membership_index(sender, instance, **kwargs):
+    CollaborationListService.invalidate([instance.user_id])
+
+
+@receiver(post_save, sender=CollaborationInvitation)
+@receiver(post_delete, sender=CollaborationInvitation)
+def invalidate_invitation_index(sender, instance, **kwargs):
+    CollaborationListService.invalidate([instance.sender_id, instance.receiver_id])
+
+
+@receiver(post_save, sender=Collaboration)
+@receiver(pre_delete, sender=Collaboration)
+def invalidate_collaboration_index(sender, instance, **kwargs):
+    # pre_delete: the memberships and admin rows are gone by post_delete
+    CollaborationListService.invalidate(_collaboration_user_ids([instance.pk]))
+
+
+@receiver(m2m_changed, sender=Collaboration.admin.through)
+def invalidate_admin_index(sender, instance, action, reverse, pk_set, **kwargs):
+    # A clear does not report pk_set, so collect the admins before they are removed
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        CollaborationListService.invalidate([instance.pk])
+    elif action == 'pre_clear':
+        CollaborationListService.invalidate(_collaboration_user_ids([instance.pk]))
+    else:
+        CollaborationListService.invalidate(pk_set or [])
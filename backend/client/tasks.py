@@ -1,9 +1,17 @@
 from celery import shared_task
 from django.utils.timezone import now
 from datetime import timedelta,datetime
+import time
+from django.db import transaction
+from django.db.models import Prefetch, Q
 from .models import Event
-from core.models import Project,Notification,Task
+from core.models import Project,Notification,Task,User
+from core.services.notification_service import NotificationService
+from .services.leaderboard_service import LeaderboardService
 from django.utils import timezone
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 @shared_task
@@ -11,78 +19,71 @@ def check_deadlines():
     """
     Celery task to check for approaching deadlines (within 2 days) for projects and tasks
     and send notifications to clients and assigned users.
+
+    Set-based and idempotent: the existing reminders are loaded in one query,
+    only the missing ones are inserted, and the unique ``dedup_key`` keeps
+    overlapping runs from notifying anyone twice.
     """
+    started = time.monotonic()
     today = now().date()
+    upcoming = {'deadline__gte': today, 'deadline__lte': today + timedelta(days=2), 'status': "pending"}
+
+    projects = list(Project.objects.filter(**upcoming).only('id', 'title', 'deadline', 'client_id'))
+    tasks = list(
+        Task.objects.filter(**upcoming)
+        .select_related('project')
+        .only('id', 'title', 'deadline', 'project__client_id')
+        .prefetch_related(Prefetch('assigned_to', queryset=User.objects.only('id')))
+    )
 
-    # Get projects with deadlines within the next 2 days
-    projects = Project.objects.filter(
-        deadline__gte=today,  # Deadline is today or in the future
-        deadline__lte=today + timedelta(days=2),  # Deadline within 2 days
-        status="pending"
+    # Every (user, type, related_model_id) already notified, in one query
+    existing = set(
+        Notification.objects.filter(
+            Q(type="Projects", related_model_id__in=[project.id for project in projects])
+            | Q(type="Projects & Tasks", related_model_id__in=[task.id for task in tasks])
+        ).values_list('user_id', 'type', 'related_model_id')
     )
 
+    notifications = []
+
+    def remind(user_id, type, related_model_id, kind, notification_text):
+        if (user_id, type, related_model_id) in existing:
+            return
+        existing.add((user_id, type, related_model_id))
+        notifications.append(Notification(
+            user_id=user_id,
+            type=type,
+            related_model_id=related_model_id,
+            notification_text=notification_text,
+            dedup_key=f"deadline:{kind}:{related_model_id}:{user_id}",
+        ))
+
     # Notify project clients about the upcoming project deadlines
     for project in projects:
         days_left = (project.deadline - today).days
         notification_text = f"Your project '{project.title}' deadline is near! Due in {days_left} day(s)."
-        
-        # Avoid duplicate notifications for the same project client
-        if not Notification.objects.filter(
-            user=project.client,
-            type="Projects",
-            related_model_id=project.id
-        ).exists():
-            Notification.objects.create(
-                user=project.client,
-                type="Projects",
-                related_model_id=project.id,
-                notification_text=notification_text
-            )
-
-    # Get tasks with deadlines within the next 2 days
-    tasks = Task.objects.filter(
-        deadline__gte=today,  # Task deadline is today or in the future
-        deadline__lte=today + timedelta(days=2),  # Deadline within 2 days
-        status="pending"
-    )
+        remind(project.client_id, "Projects", project.id, 'project', notification_text)
 
-    # Notify assigned users about the upcoming task deadlines
+    # Notify assigned users and the project client about the upcoming task deadlines
     for task in tasks:
         days_left = (task.deadline - today).days
         notification_text = f"Your task '{task.title}' deadline is near! Due in {days_left} day(s)."
-        
-        # Create notifications for each assigned user (avoid duplicates)
         for user in task.assigned_to.all():
-            if not Notification.objects.filter(
-                user=user,
-                type="Projects & Tasks",
-                related_model_id=task.id
-            ).exists():
-                Notification.objects.create(
-                    user=user,
-                    type="Projects & Tasks",
-                    related_model_id=task.id,
-                    notification_text=notification_text
-                )
-
-        # Also notify the project client about the task deadline
-        if not Notification.objects.filter(
-            user=task.project.client,
-            type="Projects & Tasks",
-            related_model_id=task.id
-        ).exists():
-            Notification.objects.create(
-                user=task.project.client,
-                type="Projects & Tasks",
-                related_model_id=task.id,
-                notification_text=notification_text
-            )
-
-    # Return a log of how many projects and tasks were processed
-    return f"Checked deadlines for {projects.count()} projects and {tasks.count()} tasks."
-
-import logging
-logger = logging.getLogger(__name__)
+            remind(user.id, "Projects & Tasks", task.id, 'task', notification_text)
+        remind(task.project.client_id, "Projects & Tasks", task.id, 'task', notification_text)
+
+    # Insert and push every missing reminder in one batch
+    created = NotificationService.bulk_send(notifications, ignore_conflicts=True)
+
+    stats = {
+        'projects': len(projects),
+        'tasks': len(tasks),
+        'notifications_created': len(created),
+        'duplicates_skipped': len(notifications) - len(created),
+        'duration_ms': round((time.monotonic() - started) * 1000, 1),
+    }
+    logger.info("check_deadlines: %s", stats)
+    return stats
 
 import datetime
 
@@ -105,55 +106,61 @@ def format_notification_time(notification_time):
         return f"{notification_time} minutes"
 
 @shared_task
-def send_event_approaching_notification():
-    try:
-        events = Event.objects.filter(notification_sent=False)
-        logger.info(f"Found {events.count()} events to check.")
-        for event in events:
-            logger.info(f"Processing event {event.id}...")
-
-            # Handle DateField and convert to timezone-aware datetime if needed
-            if isinstance(event.start, datetime.date) and not isinstance(event.start, datetime.datetime):
-                # Combine the date with a default time (e.g., midnight) and make it timezone-aware
-                event.start = timezone.make_aware(datetime.datetime.combine(event.start, datetime.time.min))
-
-            notification_time = event.notification_time
-            event_time = event.start
-            notification_time_delta = timedelta(minutes=notification_time)
-
-            notification_send_time = event_time - notification_time_delta
-
-            logger.info(f"Notification should be sent at: {notification_send_time}")
-            logger.info(f"Current time is: {timezone.now()}")
-            
-            if timezone.now() >= notification_send_time and not event.notification_sent:
-                # Format the notification time
-                formatted_notification_time = format_notification_time(notification_time)
+def send_event_approaching_notification(batch_size=500):
+    """
+    Send the reminders whose ``notify_at`` has passed.
+
+    Only due, unsent events are read (through the notify_at index), each
+    batch is claimed with SELECT ... FOR UPDATE SKIP LOCKED so overlapping
+    runs never pick the same event, and the batch is marked sent with one
+    UPDATE in the same transaction that creates its notifications.
+    """
+    started = time.monotonic()
+    sent = 0
+    while True:
+        with transaction.atomic():
+            events = list(
+                Event.objects.select_for_update(skip_locked=True)
+                .filter(notification_sent=False, notify_at__lte=timezone.now())
+                .only('id', 'user_id', 'title', 'start', 'notification_time')
+                .order_by('notify_at')[:batch_size]
+            )
+            if not events:
+                break
 
-                # Format the event start date as yyyy-mm-dd
-                formatted_event_start = event.start.strftime('%Y-%m-%d')
+            notifications = []
+            for event in events:
+                if event.user_id is None:
+                    continue
+                # Format the notification time
+                formatted_notification_time = format_notification_time(event.notification_time)
 
                 # Create notification with HTML and CSS
                 notification_text = f"""
                 <span class="event-title" style="font-weight: bold; text-decoration: none;" onmouseover="this.style.textDecoration='underline'" onmouseout="this.style.textDecoration='none'">
                     {event.title}
-                </span> is scheduled for <span>{formatted_event_start}</span>. This is a reminder {formatted_notification_time} before the event.
+                </span> is scheduled for <span>{event.start:%Y-%m-%d}</span>. This is a reminder {formatted_notification_time} before the event.
                 """
-
-                Notification.objects.create(
-                    user=event.user,  # Use the correct user field if necessary
+                notifications.append(Notification(
+                    user_id=event.user_id,
                     type="Events",
                     related_model_id=event.id,
                     notification_text=notification_text
-                )
-
-                event.notification_sent = True
-                event.save()
-
-                logger.info(f"Notification sent for event {event.id}.")
-            else:
-                logger.info(f"Event {event.id} notification is not ready yet.")
-        return 'Checked and scheduled notifications for future events.'
-    except Exception as e:
-        logger.error(f"Error occurred: {e}")
-        raise e
+                ))
+
+            Event.objects.filter(id__in=[event.id for event in events]).update(notification_sent=True)
+            NotificationService.bulk_send(notifications)
+            sent += len(notifications)
+        if len(events) < batch_size:
+            break
+
+    if sent:
+        logger.info("Sent %s event reminders in %.1f ms", sent, (time.monotonic() - started) * 1000)
+    return sent
+
+
+@shared_task
+def refresh_homepage_leaderboards():
+    """Recompute the marketplace-wide homepage sections every web process serves"""
+    snapshot = LeaderboardService.rebuild()
+    return {name: len(rows) for name, rows in snapshot.sections.items()}
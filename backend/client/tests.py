@@ -1,3 +1,596 @@
-from django.test import TestCase
+import json
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import F, Sum
+from django.db.models.functions import TruncDate
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from collaborations.models import Collaboration, CollaborationMembership
+from core.models import (
+    CacheVersion, Category, Milestone, Notification, NotificationCounter, Payment, Project, Skill, Task, User,
+)
+from core.services import notification_service
+from core.services.notification_counter_service import NotificationCounterService
+from core.services.notification_service import NotificationService
+from .models import Activity, DailySpendingRollup, Event, LeaderboardSnapshot
+from .services.dashboard_service import DashboardService
+from .services.leaderboard_service import LeaderboardService
+from .services.spending_service import SpendingRollupService
+from .tasks import check_deadlines, refresh_homepage_leaderboards, send_event_approaching_notification
+
+
+# In-memory channel layer and no Redis mirror for the unread counters, so the
+# tests never touch whatever Redis happens to listen on localhost
+hermetic_settings = override_settings(
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    NOTIFICATION_COUNTER_REDIS_URL=None,
+)
+
+
+@hermetic_settings
+class DashBoardOverviewQueryBudgetTests(TestCase):
+    # Cache version, summary row, the prefetched project summary, deadlines and activities
+    QUERY_BUDGET = 11
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user(username='client', password='pass', role='client')
+        cls.freelancer = User.objects.create_user(username='freelancer', password='pass', role='freelancer')
+        cls.domain = Category.objects.create(name='Web')
+        cls.skill = Skill.objects.create(name='Django', category=cls.domain)
+
+    def setUp(self):
+        cache.clear()
+        self.api = APIClient()
+        self.api.force_authenticate(self.client_user)
+        self.url = reverse('dashboard_overview')
+
+    def add_projects(self, count):
+        # The dashboard summary refreshes on commit; skill matching is queued to Celery
+        with mock.patch('core.tasks.notify_skill_matches.delay'), self.captureOnCommitCallbacks(execute=True):
+            self._add_projects(count)
+
+    def _add_projects(self, count):
+        today = timezone.localdate()
+        for index in range(count):
+            project = Project.objects.create(
+                title=f'Project {index}', description='-', budget=1000, deadline=today + timedelta(days=5),
+                client=self.client_user, domain=self.domain, status='ongoing', total_spent=100,
+            )
+            project.skills_required.add(self.skill)
+            project.assigned_to.add(self.freelancer)
+            Milestone.objects.create(title='M', project=project, milestone_type='progress', amount=0, due_date=today)
+            for status in ('pending', 'completed'):
+                task = Task.objects.create(
+                    project=project, title=f'Task {index}', description='-', budget=100,
+                    deadline=today + timedelta(days=2),
+                )
+                Task.objects.filter(pk=task.pk).update(status=status)
+                task.skills_required_for_task.add(self.skill)
+                task.assigned_to.add(self.freelancer)
+            Activity.objects.create(
+                user=self.client_user, activity_type='project_created', description='-',
+                related_model='project', related_object_id=project.id,
+            )
+
+    def test_query_count_does_not_grow_with_projects(self):
+        self.add_projects(2)
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            response = self.api.get(self.url)
+        self.assertEqual(response.data['active_projects'], 2)
+        self.assertEqual(response.data['pending_tasks'], 2)
+
+        self.add_projects(10)
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            response = self.api.get(self.url)
+        self.assertEqual(response.data['active_projects'], 12)
+        self.assertEqual(response.data['pending_tasks'], 12)
+        self.assertEqual(response.data['total_spent'], 1200)
+        self.assertEqual(len(response.data['project_summary']), 8)
+
+
+@hermetic_settings
+class DashboardConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user(username='client', password='pass', role='client')
+
+    def setUp(self):
+        cache.clear()
+        self.api = APIClient()
+        self.api.force_authenticate(self.client_user)
+        self.url = reverse('recent_activity')
+
+    def test_unchanged_dashboard_is_not_modified(self):
+        etag = self.api.get(self.url)['ETag']
+        # Only the version row is read
+        with self.assertNumQueries(1):
+            response = self.api.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_change_made_by_another_process_invalidates(self):
+        etag = self.api.get(self.url)['ETag']
+        # e.g. a Celery worker: it bumps the shared row and never touches this process's cache
+        Activity.objects.create(user=self.client_user, activity_type='login', description='Logged in')
+        CacheVersion.objects.filter(scope=f'dashboard:{self.client_user.pk}').update(version=F('version') + 1)
+
+        response = self.api.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+
+    def test_change_invalidates_cached_response(self):
+        etag = self.api.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Activity.objects.create(user=self.client_user, activity_type='login', description='Logged in')
+
+        response = self.api.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.data), 1)
+
+
+@hermetic_settings
+class CollaborationViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='client', password='pass', role='client')
+
+    def setUp(self):
+        cache.clear()
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        self.url = reverse('get_collaborations')
+
+    def join(self, status, count):
+        with self.captureOnCommitCallbacks(execute=True):
+            for index in range(count):
+                collaboration = Collaboration.objects.create(collaboration_name=f'{status} {index}', STATUS=status)
+                collaboration.admin.add(self.user)
+                CollaborationMembership.objects.create(collaboration=collaboration, user=self.user, role='admin')
+
+    def test_buckets_page_independently(self):
+        self.join('active', 3)
+        self.join('completed', 1)
+
+        response = self.api.get(self.url, {'page_size': 2})
+        self.assertEqual(len(response.data['active_collaborations']), 2)
+        self.assertEqual(len(response.data['completed_collaborations']), 1)
+        self.assertEqual(response.data['inactive_collaborations'], [])
+        self.assertEqual(response.data['counts']['admin'], 4)
+        self.assertIsNone(response.data['next']['completed'])
+
+        response = self.api.get(response.data['next']['active'])
+        self.assertEqual([c['collaboration_name'] for c in response.data['results']], ['active 0'])
+        self.assertIsNone(response.data['next'])
+
+    def test_query_count_does_not_grow_with_collaborations(self):
+        self.join('active', 2)
+        self.api.get(self.url)
+        # Window-ranked status buckets, the admin bucket, one admin prefetch and the index version
+        with self.assertNumQueries(4):
+            self.api.get(self.url)
+
+        self.join('inactive', 5)
+        self.api.get(self.url)
+        with self.assertNumQueries(4):
+            response = self.api.get(self.url)
+        self.assertEqual(response.data['counts']['inactive'], 5)
+        self.assertEqual(len(response.data['inactive_collaborations']), 5)
+
+    def test_listing_does_not_trust_a_stale_index(self):
+        self.api.get(self.url)
+        # Joined in another process: this process's cached index still says zero
+        collaboration = Collaboration.objects.create(collaboration_name='Elsewhere', STATUS='active')
+        CollaborationMembership.objects.create(collaboration=collaboration, user=self.user, role='member')
+
+        response = self.api.get(self.url)
+        self.assertEqual([c['collaboration_name'] for c in response.data['active_collaborations']], ['Elsewhere'])
+
+        CacheVersion.objects.filter(scope=f'collaborations:{self.user.pk}').update(version=F('version') + 1)
+        self.assertEqual(self.api.get(self.url).data['counts']['active'], 1)
+
+
+@hermetic_settings
+class ActivityTimelineTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='client', password='pass', role='client')
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        self.url = reverse('activity_timeline')
+
+    def log(self, count, related_model='project'):
+        for index in range(count):
+            Activity.objects.create(
+                user=self.user, activity_type='project_updated', description=f'{related_model} {index}',
+                related_model=related_model,
+            )
+
+    def test_cursor_walks_the_feed_without_gaps(self):
+        self.log(5)
+        seen, url = [], self.url + '?page_size=2'
+        while url:
+            response = self.api.get(url)
+            seen += [activity['id'] for activity in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(seen, list(Activity.objects.order_by('-timestamp', '-id').values_list('id', flat=True)))
+
+    def test_since_returns_only_new_rows(self):
+        self.log(3)
+        since = self.api.get(self.url).data['since']
+        with self.assertNumQueries(1):
+            response = self.api.get(self.url, {'since': since})
+        self.assertEqual(response.data['results'], [])
+        self.assertEqual(response.data['since'], since)
+
+        self.log(3, related_model='payment')
+        response = self.api.get(self.url, {'since': since, 'page_size': 2})
+        self.assertEqual([a['description'] for a in response.data['results']], ['payment 1', 'payment 0'])
+        self.assertTrue(response.data['has_more'])
+        response = self.api.get(self.url, {'since': response.data['since'], 'page_size': 2})
+        self.assertEqual([a['description'] for a in response.data['results']], ['payment 2'])
+        self.assertFalse(response.data['has_more'])
+
+        response = self.api.get(self.url, {'exclude': 'payment'})
+        self.assertEqual(len(response.data['results']), 3)
+
+
+@hermetic_settings
+class DeadlineReminderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user(username='client', password='pass', role='client')
+        cls.freelancer = User.objects.create_user(username='freelancer', password='pass', role='freelancer')
+        domain = Category.objects.create(name='Web')
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        with mock.patch('core.tasks.notify_skill_matches.delay'):
+            project = Project.objects.create(
+                title='Shop', description='-', budget=1000, deadline=tomorrow,
+                client=cls.client_user, domain=domain, status='pending',
+            )
+            task = Task.objects.create(project=project, title='Cart', description='-', budget=100, deadline=tomorrow)
+            task.assigned_to.add(cls.freelancer)
+        Notification.objects.all().delete()
+        NotificationCounter.objects.all().delete()
+
+    def run_job(self):
+        with mock.patch.object(NotificationService, 'fan_out') as fan_out, \
+                self.captureOnCommitCallbacks(execute=True):
+            stats = check_deadlines()
+        pushed = [notification.dedup_key for call in fan_out.call_args_list for notification in call.args[0]]
+        return stats, pushed
+
+    def unread(self):
+        counts = NotificationCounterService.get_counts_many([self.client_user.id, self.freelancer.id])
+        return {user_id: sum(types.values()) for user_id, types in counts.items()}
+
+    def test_rerun_notifies_nobody_twice(self):
+        stats, pushed = self.run_job()
+        self.assertEqual(stats['notifications_created'], 3)
+        self.assertEqual(len(pushed), 3)
+
+        stats, pushed = self.run_job()
+        self.assertEqual(stats['notifications_created'], 0)
+        self.assertEqual(pushed, [])
+        self.assertEqual(self.unread(), {self.client_user.id: 2, self.freelancer.id: 1})
+
+    def test_backends_without_insert_returning_fall_back_to_savepoints(self):
+        with mock.patch.object(notification_service, '_supports_insert_returning_new_ids', return_value=False):
+            first, _ = self.run_job()
+            second, pushed = self.run_job()
+        self.assertEqual((first['notifications_created'], second['notifications_created'], pushed), (3, 0, []))
+        self.assertEqual(self.unread(), {self.client_user.id: 2, self.freelancer.id: 1})
+
+    def test_overlapping_runs_count_and_push_each_reminder_once(self):
+        # The second run finishes after the first one has checked for existing
+        # reminders but before it inserts, so both try to insert every key
+        real_insert = notification_service._insert_returning_new_ids
+        racing = {}
+
+        def insert(*args, **kwargs):
+            if not racing:
+                racing['stats'] = None
+                racing['stats'] = check_deadlines()
+            return real_insert(*args, **kwargs)
+
+        with mock.patch.object(notification_service, '_insert_returning_new_ids', side_effect=insert):
+            stats, pushed = self.run_job()
+
+        self.assertEqual(racing['stats']['notifications_created'], 3)
+        self.assertEqual(stats['notifications_created'], 0)
+        self.assertEqual(sorted(pushed), sorted(Notification.objects.values_list('dedup_key', flat=True)))
+        self.assertEqual(Notification.objects.count(), 3)
+        self.assertEqual(self.unread(), {self.client_user.id: 2, self.freelancer.id: 1})
+
+
+def _slow_section():
+    time.sleep(0.5)
+
+
+@hermetic_settings
+@mock.patch('client.services.dashboard_compose_service.SECTION_TIMEOUT', 0.05)
+class AsyncDashboardViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user(username='client', password='pass', role='client')
+        cls.token = str(RefreshToken.for_user(cls.client_user).access_token)
+
+    def setUp(self):
+        cache.clear()
+
+    async def get(self, name, **headers):
+        return await self.async_client.get(reverse(name), headers={'Authorization': f'Bearer {self.token}', **headers})
+
+    async def sections(self, slow=None):
+        # Computed here: the section pool's threads cannot see the test transaction
+        summary = await sync_to_async(DashboardService.get_summary)(self.client_user)
+        values = {
+            'summary': summary, 'project_summary': [], 'nearest_deadlines': [], 'recent_activities': [],
+            'leaderboards': {'trending_skills': [], 'top_freelancers': [], 'success_stories': []},
+        }
+        return lambda user: {
+            name: _slow_section if name == slow else (lambda value=value: value)
+            for name, value in values.items()
+        }
+
+    async def assert_partial_then_complete(self, url_name, sections_path, slow):
+        with mock.patch(sections_path, await self.sections(slow)):
+            response = await self.get(url_name)
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertTrue(data['partial'])
+        self.assertEqual(data['section_errors'], {slow: 'timeout'})
+        self.assertEqual(data['active_projects'], 0)
+        # A partial body must never be revalidated into a 304
+        self.assertNotIn('ETag', response)
+        self.assertNotIn('Last-Modified', response)
+        self.assertEqual(response['Cache-Control'], 'no-store')
+
+        with mock.patch(sections_path, await self.sections()):
+            response = await self.get(url_name)
+        self.assertNotIn('partial', json.loads(response.content))
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        response = await self.get(url_name, **{'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    async def test_overview_serves_a_partial_payload_when_a_section_times_out(self):
+        await self.assert_partial_then_complete(
+            'dashboard_overview_async', 'client.DashBoardViews.overview_sections', 'nearest_deadlines'
+        )
+
+    async def test_homepage_serves_a_partial_payload_when_a_section_times_out(self):
+        await self.assert_partial_then_complete('homepage_async', 'client.views.homepage_sections', 'leaderboards')
+
+    async def test_requires_a_token(self):
+        response = await self.async_client.get(reverse('homepage_async'))
+        self.assertEqual(response.status_code, 401)
+
+
+@hermetic_settings
+class HomepageLeaderboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user(username='client', password='pass', role='client')
+        cls.domain = Category.objects.create(name='Web')
+        cls.django = Skill.objects.create(name='Django', category=cls.domain)
+        cls.react = Skill.objects.create(name='React', category=cls.domain)
+
+    def setUp(self):
+        cache.clear()
+        self.api = APIClient()
+        self.api.force_authenticate(self.client_user)
+
+    def add_project(self, skill, tasks=0, status='ongoing'):
+        with mock.patch('core.tasks.notify_skill_matches.delay'):
+            project = Project.objects.create(
+                title=f'{skill.name} project', description='-', budget=1000, client=self.client_user,
+                domain=self.domain, status=status, deadline=timezone.localdate() + timedelta(days=30),
+            )
+            project.skills_required.add(skill)
+            for index in range(tasks):
+                task = Task.objects.create(
+                    project=project, title=f'Task {index}', description='-', budget=100,
+                    deadline=timezone.localdate() + timedelta(days=10),
+                )
+                task.skills_required_for_task.add(skill)
+        return project
+
+    def test_trending_skills_count_projects_and_tasks_once_each(self):
+        self.add_project(self.django, tasks=3)
+        self.add_project(self.django)
+        self.add_project(self.react, tasks=1)
+        self.assertEqual(
+            LeaderboardService.trending_skills(),
+            [{'name': 'Django', 'demand': 5}, {'name': 'React', 'demand': 2}],
+        )
+
+    def test_homepage_serves_what_the_task_computed(self):
+        self.add_project(self.django, status='completed')
+        stats = refresh_homepage_leaderboards()
+        self.assertEqual(stats, {'trending_skills': 2, 'top_freelancers': 0, 'success_stories': 1})
+
+        response = self.api.get(reverse('homepage'))
+        snapshot = LeaderboardSnapshot.objects.get()
+        self.assertEqual(response.data['trending_skills'], snapshot.sections['trending_skills'])
+        self.assertEqual(response.data['success_stories'], [
+            {'title': 'Django project', 'description': '-', 'budget': 1000.0, 'freelancers': []},
+        ])
+
+        # The task may run in any process; homepages everywhere follow the stored row
+        self.add_project(self.react, tasks=2)
+        refresh_homepage_leaderboards()
+        fresh = self.api.get(reverse('homepage'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(fresh.status_code, 200)
+        self.assertEqual(fresh.data['trending_skills'][0], {'name': 'React', 'demand': 3})
+
+        # Nothing changed: the ETag stays put
+        refresh_homepage_leaderboards()
+        self.assertEqual(self.api.get(reverse('homepage'), HTTP_IF_NONE_MATCH=fresh['ETag']).status_code, 304)
+
+
+@hermetic_settings
+class EventReminderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='client', password='pass', role='client')
+        today = timezone.localdate()
+        cls.due = [
+            Event.objects.create(user=cls.user, title=f'Due {index}', start=today + timedelta(days=index))
+            for index in range(3)
+        ]
+        cls.due[2].notification_time = 3 * 1440
+        cls.due[2].save()
+        cls.later = Event.objects.create(user=cls.user, title='Later', start=today + timedelta(days=10))
+        Notification.objects.all().delete()
+        NotificationCounter.objects.all().delete()
+
+    def reminded(self):
+        return sorted(Notification.objects.filter(type='Events').values_list('related_model_id', flat=True))
+
+    def test_notify_at_follows_start_and_lead_time(self):
+        self.assertEqual(self.later.notify_at, self.later.compute_notify_at())
+        self.assertLess(self.due[2].notify_at, timezone.now())
+
+    def test_due_events_are_sent_once_in_batches(self):
+        with mock.patch.object(NotificationService, 'fan_out'):
+            self.assertEqual(send_event_approaching_notification(batch_size=2), 3)
+            self.assertEqual(send_event_approaching_notification(batch_size=2), 0)
+        self.assertEqual(self.reminded(), sorted(event.id for event in self.due))
+        self.assertEqual(NotificationCounterService.get_counts(self.user.id), {'Events': 3})
+        self.assertFalse(Event.objects.get(pk=self.later.pk).notification_sent)
+
+    def test_overlapping_runs_never_claim_the_same_event(self):
+        real_bulk_send = NotificationService.bulk_send
+        nested = {}
+
+        def bulk_send(notifications, **kwargs):
+            created = real_bulk_send(notifications, **kwargs)
+            if not nested:
+                # Another run starts after this batch was claimed and marked sent
+                nested['sent'] = None
+                nested['sent'] = send_event_approaching_notification()
+            return created
+
+        with mock.patch.object(NotificationService, 'bulk_send', side_effect=bulk_send), \
+                mock.patch.object(NotificationService, 'fan_out'):
+            sent = send_event_approaching_notification(batch_size=2)
+        self.assertEqual((sent, nested['sent']), (2, 1))
+        self.assertEqual(self.reminded(), sorted(event.id for event in self.due))
+
+    def test_moving_a_sent_event_later_reminds_again(self):
+        with mock.patch.object(NotificationService, 'fan_out'):
+            send_event_approaching_notification()
+        event = Event.objects.get(pk=self.due[0].pk)
+        event.start = timezone.localdate() + timedelta(days=5)
+        event.save()
+        self.assertFalse(event.notification_sent)
+        event.notification_time = 10 * 1440
+        event.save(update_fields=['notification_time'])
+        with mock.patch.object(NotificationService, 'fan_out'):
+            self.assertEqual(send_event_approaching_notification(), 1)
+
+
+@hermetic_settings
+class SpendingRollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user(username='client', password='pass', role='client')
+        cls.freelancer = User.objects.create_user(username='freelancer', password='pass', role='freelancer')
+        with mock.patch('core.tasks.notify_skill_matches.delay'):
+            cls.project = Project.objects.create(
+                title='Shop', description='-', budget=1000, client=cls.client_user,
+                domain=Category.objects.create(name='Web'), deadline=timezone.localdate() + timedelta(days=30),
+            )
+
+    def pay(self, amount, currency='INR', project=None):
+        return Payment.objects.create(
+            from_user=self.client_user, to_user=self.freelancer, payment_for='project', project=project,
+            amount=amount, payment_method='GPAY', currency=currency,
+        )
+
+    def move(self, payment, day):
+        Payment.objects.filter(pk=payment.pk).update(
+            payment_date=timezone.make_aware(datetime.combine(day, datetime.min.time()) + timedelta(hours=12))
+        )
+
+    def raw(self):
+        rows = (
+            Payment.objects.annotate(day=TruncDate('payment_date')).order_by()
+            .values_list('from_user_id', 'project_id', 'currency', 'day').annotate(total=Sum('amount'))
+        )
+        return {row[:4]: row[4] for row in rows}
+
+    def rolled(self):
+        rows = (
+            DailySpendingRollup.objects.order_by()
+            .values_list('user_id', 'project_id', 'currency', 'day').annotate(total=Sum('amount'))
+        )
+        return {row[:4]: row[4] for row in rows if row[4]}
+
+    def test_payment_writes_keep_buckets_equal_to_the_raw_aggregate(self):
+        first = self.pay('100.00', project=self.project)
+        second = self.pay('50.25')
+        self.pay('10.00', currency='USD')
+        self.assertEqual(self.rolled(), self.raw())
+
+        first.amount = Decimal('80.00')
+        first.save()
+        second.currency = 'USD'
+        second.project = self.project
+        second.save()
+        self.assertEqual(self.rolled(), self.raw())
+
+        first.delete()
+        self.assertEqual(self.rolled(), self.raw())
+        self.assertEqual(DailySpendingRollup.objects.aggregate(count=Sum('payment_count'))['count'], 2)
+
+    def test_backfill_command_rebuilds_from_payments(self):
+        payments = [self.pay(amount) for amount in ('10.00', '20.00', '5.50')]
+        # Writes that bypass the signals leave the buckets behind
+        self.move(payments[0], date(2024, 3, 4))
+        Payment.objects.filter(pk=payments[1].pk).update(amount=Decimal('25.00'))
+        self.assertNotEqual(self.rolled(), self.raw())
+
+        out = StringIO()
+        call_command('backfill_spending_rollups', '--batch-size', '2', stdout=out)
+        self.assertIn('Wrote 2 spending buckets', out.getvalue())
+        self.assertEqual(self.rolled(), self.raw())
+
+    def test_charts_resample_daily_buckets(self):
+        today = date(2024, 3, 7)  # Thursday
+        for amount, day in (('10.00', date(2024, 3, 4)), ('5.00', date(2024, 3, 4)), ('7.50', date(2024, 3, 7)),
+                            ('20.00', date(2023, 3, 1)), ('1.00', date(2024, 2, 29))):
+            self.move(self.pay(amount), day)
+        SpendingRollupService.backfill()
+
+        weekly = SpendingRollupService.chart(self.client_user, 'weekly', today=today)['datasets'][0]['data']
+        self.assertEqual(weekly, [15.0, 0, 0, 7.5, 0, 0, 0])
+        monthly = SpendingRollupService.chart(self.client_user, 'monthly', today=today)['datasets'][0]['data']
+        self.assertEqual((monthly[1], monthly[2], sum(monthly)), (1.0, 42.5, 43.5))
+        yearly = SpendingRollupService.chart(self.client_user, 'yearly', today=today)
+        self.assertEqual((yearly['labels'], yearly['datasets'][0]['data']), (['2023', '2024'], [20.0, 23.5]))
+
+        custom = SpendingRollupService.chart(
+            self.client_user, 'custom', {'start': '2024-02-28', 'end': '2024-03-04'}, today=today
+        )
+        self.assertEqual(custom['labels'][1:3], ['2024-02-29', '2024-03-01'])
+        self.assertEqual(custom['datasets'][0]['data'], [0, 1.0, 0, 0, 0, 15.0])
+        long_range = SpendingRollupService.chart(
+            self.client_user, 'custom', {'start': '2023-01-01', 'end': '2024-03-31'}, today=today
+        )
+        self.assertEqual(long_range['labels'][-1], '2024-03')
+        self.assertEqual(long_range['datasets'][0]['data'][2], 20.0)
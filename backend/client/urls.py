@@ -1,12 +1,12 @@
 # client/urls.py
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .DashBoardViews import EventViewSet,RecentActivityView,PostedProjects,DashBoard_Overview,ActivityListView,SpecifiedActivityListView,SpendingDistributionByProject,CollaborationView,ProjectDetailsAPIView,BidsAPIView
+from .DashBoardViews import EventViewSet,RecentActivityView,PostedProjects,DashBoard_Overview,ActivityListView,SpecifiedActivityListView,ActivityTimelineView,SpendingDistributionByProject,CollaborationView,ProjectDetailsAPIView,BidsAPIView
 from core.views import *
-from .DashBoardViews import SpendingDataView
+from .DashBoardViews import SpendingDataView, AsyncDashBoard_Overview
 from .profileViews import UnAuthClientViews,ClientViews,update_profile,ClientReviewsandRatings,post_reply,ConnectionView,ConnectionManageViewSet,ConnectionRequestView, update_terms_acceptance
 # from .profileViews import ClientViews,ClientProfileUpdateView,update_profile
-from .views import CHomePageView
+from .views import CHomePageView, AsyncCHomePageView
 from django.urls import re_path
 from .consumers import NotificationConsumer
 
@@ -29,11 +29,14 @@ router.register(r'connections', ConnectionManageViewSet, basename='connection')
 urlpatterns = [
     path('', include(router.urls)),
     path('homepage/', CHomePageView.as_view(), name='homepage'),
+    path('homepage/async/', AsyncCHomePageView.as_view(), name='homepage_async'),
     path('recent_activity/', RecentActivityView.as_view(), name='recent_activity'),
     path('specified_recent_activity/', SpecifiedActivityListView.as_view(), name='specified_recent_activity'),
     path('other_recent_activity/', ActivityListView.as_view(), name='other_recent_activity'),
+    path('activity_timeline/', ActivityTimelineView.as_view(), name='activity_timeline'),
     path('posted_projects/', PostedProjects.as_view(), name='posted_projects'),
     path('dashboard_overview/', DashBoard_Overview.as_view(), name='dashboard_overview'),
+    path('dashboard_overview/async/', AsyncDashBoard_Overview.as_view(), name='dashboard_overview_async'),
     path('spending_data/', SpendingDataView.as_view(), name='spending_data'),
     path('spending_distribution_by_project/', SpendingDistributionByProject.as_view(), name='spending_distribution_by_project'),
 
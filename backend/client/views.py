@@ -4,6 +4,12 @@ from rest_framework.permissions import IsAuthenticated
 from core.models import Project, User
 from core.models import Skill
 from .models import Event
+from .services.dashboard_service import DashboardService
+from .services.dashboard_cache_service import DashboardCacheService, cache_dashboard_response
+from .services.dashboard_compose_service import DashboardComposeService
+from .services.leaderboard_service import LeaderboardService
+from django.http import JsonResponse
+from django.views import View
 from django.db.models import Count, Avg
 import json
 from rest_framework.decorators import api_view, permission_classes
@@ -16,43 +22,48 @@ from Profile.serializers import ClientProfilePartialUpdateSerializer
 class CHomePageView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @cache_dashboard_response('homepage', global_data=True)
     def get(self, request):
-        user = request.user
-        active_projects = Project.objects.filter(client=user, status='ongoing').count()
-        total_spent = sum(project.total_spent for project in Project.objects.filter(client=user))
-        pending_tasks = sum(project.get_pending_tasks() for project in Project.objects.filter(client=user))
-
-        # Fetch trending skills
-        trending_skills = Skill.objects.annotate(
-            demand=Count('projects') + Count('tasks')  # Count projects and tasks associated with each skill
-        ).order_by('-demand')[:5]
-        # Fetch top freelancers
-        top_freelancers = User.objects.filter(role='freelancer').annotate(avg_rating=Avg('freelancer_profile__average_rating')).order_by('-avg_rating')[:5]
-
-        # Fetch recent success stories
-        success_stories = Project.objects.filter(status='completed').order_by('-created_at')[:5]
-        
-        response_data = {
-            'active_projects': active_projects,
-            'total_spent': total_spent,
-            'pending_tasks': pending_tasks,
-            'trending_skills': [{'name': skill.name, 'demand': skill.demand} for skill in trending_skills],
-            'top_freelancers': [
-                {
-                    'id': freelancer.id,
-                    'name': freelancer.username,
-                    'rating': freelancer.freelancer_profile.average_rating,
-                    'avatar': freelancer.freelancer_profile.profile_picture.url if freelancer.freelancer_profile.profile_picture else None
-                } for freelancer in top_freelancers
-            ],
-            'success_stories': [
-                {
-                    'title': project.title,
-                    'description': project.description,
-                    'budget': project.budget,
-                    'freelancers': [{'id': freelancer.id, 'username': freelancer.username} for freelancer in project.assigned_to.all()]
-                } for project in success_stories
-            ],
-        }
-
-        return Response(response_data)
+        sections = {name: section() for name, section in homepage_sections(request.user).items()}
+        return Response(homepage_response(sections))
+
+
+class AsyncCHomePageView(View):
+    """CHomePageView for ASGI, with its sections computed concurrently"""
+
+    async def get(self, request):
+        user = await DashboardComposeService.authenticate(request)
+        if user is None:
+            return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+
+        async def build():
+            sections, errors = await DashboardComposeService.gather(homepage_sections(user))
+            data = homepage_response(sections)
+            if errors:
+                data['partial'] = True
+                data['section_errors'] = errors
+            return data, not errors
+
+        return await DashboardCacheService.respond_async(request, user.pk, 'homepage', build, global_data=True)
+
+
+def homepage_sections(user):
+    """Independent parts of the client homepage, keyed by section name"""
+    return {
+        'summary': lambda: DashboardService.get_summary(user),
+        # Trending skills, top freelancers and success stories, precomputed for everyone
+        'leaderboards': LeaderboardService.get_snapshot,
+    }
+
+
+def homepage_response(sections):
+    summary = sections.get('summary')
+    leaderboards = sections.get('leaderboards') or {}
+    return {
+        'active_projects': summary.active_projects if summary is not None else None,
+        'total_spent': summary.total_spent if summary is not None else None,
+        'pending_tasks': summary.pending_tasks if summary is not None else None,
+        'trending_skills': leaderboards.get('trending_skills'),
+        'top_freelancers': leaderboards.get('top_freelancers'),
+        'success_stories': leaderboards.get('success_stories'),
+    }
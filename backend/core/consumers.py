@@ -10,17 +10,32 @@ from core.models import User, Project, Category
 from Profile.models import ClientProfile,FreelancerProfile
 from core.serializers import ProjectSerializer, CategorySerializer
 from django.core.serializers import serialize
+from core import search
+from core.search.typeahead import get_typeahead_index
+from Profile.services.user_card_service import UserCardService
+import asyncio
 
 
 User = get_user_model()
 
+# Keystrokes arriving within this window collapse into one typeahead lookup
+TYPEAHEAD_DEBOUNCE = getattr(settings, 'TYPEAHEAD_DEBOUNCE', 0.1)
+
 class SearchConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.user = None
+        self.search_task = None
         await self.accept()
 
     async def disconnect(self, close_code):
-        pass
+        if self.search_task:
+            self.search_task.cancel()
+
+    def schedule_search(self, coro):
+        """Run a search in the background, cancelling the one it supersedes"""
+        if self.search_task and not self.search_task.done():
+            self.search_task.cancel()
+        self.search_task = asyncio.ensure_future(coro)
 
     async def receive(self, text_data):
         try:
@@ -45,17 +60,59 @@ class SearchConsumer(AsyncWebsocketConsumer):
                     return
 
             query = data.get("query", "").strip()
+            typeahead = data.get("mode") == "typeahead"
             if len(query) < 2:
-                await self.send(json.dumps({"users": [], "projects": [], "categories": []}))
+                if self.search_task:
+                    self.search_task.cancel()
+                response = {"users": [], "projects": [], "categories": []}
+                if typeahead:
+                    response.update({"mode": "typeahead", "query": query})
+                await self.send(json.dumps(response))
                 return
 
+            if typeahead:
+                self.schedule_search(self.send_typeahead(query))
+            else:
+                self.schedule_search(self.send_search(query))
+
+        except Exception as e:
+            print(f"Error in SearchConsumer: {str(e)}")
+            await self.send(json.dumps({"error": "An error occurred during search"}))
+
+    async def send_search(self, query):
+        try:
             users, projects, categories = await self.perform_search(query)
             await self.send(json.dumps({
                 "users": users,
                 "projects": projects,
                 "categories": categories
             }))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error in SearchConsumer: {str(e)}")
+            await self.send(json.dumps({"error": "An error occurred during search"}))
 
+    async def send_typeahead(self, query):
+        """Answer a prefix query from the in-memory index after the debounce window"""
+        try:
+            await asyncio.sleep(TYPEAHEAD_DEBOUNCE)
+            index = get_typeahead_index()
+            if not index.ready:
+                await sync_to_async(index.sync)()
+            results = index.lookup(query, self.user)
+            await self.send(json.dumps({
+                "mode": "typeahead",
+                "query": query,
+                "users": [entry.payload for entry in results[search.USER]],
+                "projects": [
+                    {"id": entry.object_id, "title": entry.label}
+                    for entry in results[search.PROJECT]
+                ],
+                "categories": [entry.payload for entry in results[search.CATEGORY]],
+            }))
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             print(f"Error in SearchConsumer: {str(e)}")
             await self.send(json.dumps({"error": "An error occurred during search"}))
@@ -81,64 +138,35 @@ class SearchConsumer(AsyncWebsocketConsumer):
             return [], [], []  # Return empty results if not authenticated
 
         user = self.user
-        projects = []
-        seen_project_ids = set()
-        
-        # Query to get users
-        users = User.objects.filter(
-            Q(username__icontains=query) | Q(role__icontains=query)
-        ).values("id", "username", "role")[:10]  # No need to use list()
-
-        # Prepare users data
-        user_data_list = []
-        for fuser in users:
-            
-            # Fetch the User instance using fuser['id']
-            user_instance = User.objects.get(id=fuser['id'])
-            
-            # Determine pathrole
-            pathrole = 'freelancer' if fuser['role'] in ['freelancer', 'student'] else 'client'
-            
-            user_data = {
-                'id': fuser['id'],
-                'username': fuser['username'],
-                'role': fuser['role'],  # Keep original role
-                'pathrole': pathrole,   # Add pathrole for routing
-                'profile_picture': None,  # Default value for profile_picture
-            }
-        
-            if fuser["role"] == "client":
-                try:
-                    # Fetch the ClientProfile using the actual user_instance
-                    client_profile = ClientProfile.objects.get(user=user_instance)
-                    user_data['profile_picture'] = client_profile.profile_picture.url if client_profile.profile_picture else None
-                except ClientProfile.DoesNotExist:
-                    user_data['profile_picture'] = None  # Handle the case where the ClientProfile doesn't exist
-            else:
-                try:
-                    # Fetch the FreelancerProfile using the actual user_instance
-                    freelancer_profile = FreelancerProfile.objects.get(user=user_instance)
-                    user_data['profile_picture'] = freelancer_profile.profile_picture.url if freelancer_profile.profile_picture else None
-                except FreelancerProfile.DoesNotExist:
-                    user_data['profile_picture'] = None  # Handle the case where the FreelancerProfile doesn't exist
-            
-            user_data_list.append(user_data)
+        # Query to get users, resolving their cards in one batch
+        user_ids = search.search_ids(query, search.USER, limit=10)
+        user_data_list = [
+            {key: card[key] for key in ('id', 'username', 'role', 'pathrole', 'profile_picture')}
+            for card in UserCardService.get_ordered_cards(user_ids)
+        ]
 
         # 🔹 Search Projects (Filter based on user role)
         
         if user.role == "client":
-            # For clients, search projects where the client is the user and match the query in the title or description
-            projects = Project.objects.filter(client=user).filter(
-                Q(title__icontains=query) | Q(description__icontains=query)
-            ).values("id", "title", "description")
+            # For clients, search projects where the client is the user
+            scope = Project.objects.filter(client=user)
         else:
-            # For freelancers, search projects where the user is assigned and match the query in the title or description
-            projects = Project.objects.filter(assigned_to=user).filter(
-                Q(title__icontains=query) | Q(description__icontains=query)
-            ).values("id", "title", "description")
-        
+            # For freelancers, search projects where the user is assigned
+            scope = Project.objects.filter(assigned_to=user)
+        project_ids = search.search_ids(query, search.PROJECT, limit=10, within=scope)
+        matched_projects = Project.objects.in_bulk(project_ids)
+        projects = [
+            {"id": pk, "title": matched_projects[pk].title, "description": matched_projects[pk].description}
+            for pk in project_ids if pk in matched_projects
+        ]
+
         # 🔹 Search Categories
-        categories = Category.objects.filter(Q(name__icontains=query)).values("id", "name")
+        category_ids = search.search_ids(query, search.CATEGORY, limit=10)
+        matched_categories = Category.objects.in_bulk(category_ids)
+        categories = [
+            {"id": pk, "name": matched_categories[pk].name}
+            for pk in category_ids if pk in matched_categories
+        ]
 
         # Return the results as lists (serialization)
         return list(user_data_list), list(projects), list(categories)
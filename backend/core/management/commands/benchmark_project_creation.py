@@ -0,0 +1,112 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from client.models import Activity, Event
+from core.models import Category, Milestone, Project, Skill, Task, User
+from core.serializers import ProjectResponseSerializer, TaskResponseSerializer
+from core.services.project_creation_service import MAX_TASKS, ProjectCreationService
+
+
+class Rollback(Exception):
+    pass
+
+
+def create_row_by_row(client, data):
+    """The posting path CreateProjectView used before ProjectCreationService, kept for comparison"""
+    deadline = timezone.localdate() + timezone.timedelta(days=30)
+    project = Project.objects.create(
+        title=data['title'], description=data['description'], budget=data['budget'], deadline=deadline,
+        is_collaborative=True, domain=Category.objects.get(id=data['domain']), client=client, status='pending',
+    )
+    for milestone in data['milestones']:
+        Milestone.objects.create(project=project, due_date=deadline, **milestone)
+    project.update_payment_strategy()
+
+    tasks = []
+    for task_data in data['tasks']:
+        task = Task.objects.create(
+            title=task_data['title'], description=task_data['description'], deadline=deadline,
+            project=project, budget=task_data['budget'],
+        )
+        for milestone in task_data['milestones']:
+            Milestone.objects.create(task=task, due_date=deadline, **milestone)
+        tasks.append(task)
+
+    project.skills_required.set(Skill.objects.filter(id__in=data['skills_required']))
+    Event.objects.create(user=client, title=f"{project.title} - Deadline", type='Deadline', start=project.deadline)
+    for task, task_data in zip(tasks, data['tasks']):
+        task.skills_required_for_task.set(Skill.objects.filter(id__in=task_data['skills_required_for_task']))
+        Event.objects.create(user=client, title=f"{task.title} - Deadline", start=task.deadline)
+        Activity.objects.create(
+            user=client, activity_type='task_created', description=f'Created Task: {task.title}',
+            related_model='task', related_object_id=task.id,
+        )
+
+    ProjectResponseSerializer(project).data
+    TaskResponseSerializer(Task.objects.filter(project=project), many=True).data
+
+
+def create_in_bulk(client, data):
+    project = ProjectCreationService.create(client, data)
+    ProjectResponseSerializer(ProjectCreationService.for_response(project)).data
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare posting a project row by row with ProjectCreationService's bulk path. "
+        "Everything runs in a transaction that is rolled back, so no data is kept"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=5)
+        parser.add_argument('--iterations', type=int, default=50)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options['tasks'], options['iterations'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, task_count, iterations):
+        if task_count > MAX_TASKS['platinum']:
+            raise CommandError(f"At most {MAX_TASKS['platinum']} tasks can be posted with one project")
+        client = User.objects.create_user(
+            username='benchmark-client', password=None, role='client', membership='platinum'
+        )
+        category = Category.objects.create(name='Benchmark')
+        skill_ids = [Skill.objects.create(name=f'Benchmark {index}', category=category).id for index in range(3)]
+
+        milestone = {'title': 'Delivery', 'amount': 100, 'milestone_type': 'payment'}
+        data = {
+            'title': 'Benchmark project', 'description': '-', 'budget': 5000, 'domain': category.id,
+            'deadline': (timezone.localdate() + timezone.timedelta(days=30)).isoformat(),
+            'is_collaborative': True, 'skills_required': skill_ids, 'milestones': [milestone],
+            'tasks': [
+                {
+                    'title': f'Task {index}', 'description': '-', 'budget': 500,
+                    'skills_required_for_task': skill_ids[:2], 'milestones': [milestone],
+                }
+                for index in range(task_count)
+            ],
+        }
+
+        for name, create in (('row by row', create_row_by_row), ('bulk', create_in_bulk)):
+            timings, queries = [], 0
+            for _ in range(iterations):
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    create(client, data)
+                    timings.append((time.perf_counter() - started) * 1000)
+                queries = len(captured)
+            timings.sort()
+            self.stdout.write(
+                f"{name:>10}: median {statistics.median(timings):.2f} ms, "
+                f"p95 {timings[int(len(timings) * 0.95) - 1]:.2f} ms, {queries} queries"
+            )
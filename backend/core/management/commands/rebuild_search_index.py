@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index for users, projects, categories and skills"
+
+    def handle(self, *args, **kwargs):
+        backend = get_search_backend()
+        started = time.monotonic()
+
+        with transaction.atomic():
+            backend.rebuild()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Search index rebuilt with {backend.__class__.__name__} in {time.monotonic() - started:.2f}s"
+        ))
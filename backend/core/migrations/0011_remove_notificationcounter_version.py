@@ -0,0 +1,17 @@
+# Generated by Django 5.1.6 on 2026-10-18 16:55
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_cache_version'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='notificationcounter',
+            name='version',
+        ),
+    ]
@@ -151,6 +151,12 @@ class Project(models.Model):
         indexes = [
             models.Index(fields=['title']),
             models.Index(fields=['description']),
+            # Marketplace browse: open projects newest first, optionally narrowed by one facet
+            models.Index(fields=['status', '-created_at', '-id'], name='project_browse_recent_idx'),
+            models.Index(fields=['status', 'domain', '-created_at'], name='project_browse_domain_idx'),
+            models.Index(fields=['status', 'complexity_level', '-created_at'], name='project_browse_level_idx'),
+            models.Index(fields=['status', 'deadline'], name='project_browse_deadline_idx'),
+            models.Index(fields=['status', 'budget'], name='project_browse_budget_idx'),
         ]
 
     def get_pending_tasks(self):
@@ -647,6 +653,15 @@ class Payment(models.Model):
     discount_promo = models.CharField(max_length=50, blank=True, null=True)
     notes = models.TextField(blank=True, null=True)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what the spending rollups counted, so updates can move the amount
+        instance._loaded_spending = tuple(
+            instance.__dict__.get(field) for field in ('from_user_id', 'project_id', 'currency', 'payment_date', 'amount')
+        )
+        return instance
+
     def save(self, *args, **kwargs):
         # Ensure atomicity of the payment process
         with transaction.atomic():
@@ -723,6 +738,16 @@ class Notification(models.Model):
     notification_text = models.TextField()
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Set by jobs that must notify at most once per event, e.g. "deadline:task:12:7"
+    dedup_key = models.CharField(max_length=100, unique=True, null=True, blank=True)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored state so saves can adjust the unread counters by the right delta
+        instance._loaded_is_read = instance.__dict__.get('is_read')
+        instance._loaded_type = instance.__dict__.get('type')
+        return instance
 
     def __str__(self):
         return f"Notification for {self.user.username}: {self.notification_text}"
@@ -731,6 +756,20 @@ class Notification(models.Model):
         self.is_read = True
         self.save()
 
+
+class NotificationCounter(models.Model):
+    """Unread notification count per user and type, kept in step with Notification writes"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notification_counters')
+    type = models.CharField(max_length=20, choices=Notification.TYPE_CHOICES)
+    unread = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'type')
+
+    def __str__(self):
+        return f"{self.user_id} {self.type}: {self.unread} unread"
+
 class Milestone(models.Model):
     MILESTONE_TYPE_CHOICES = [
         ('payment', 'Payment Only'),
@@ -805,3 +844,27 @@ class Milestone(models.Model):
         elif self.project:
             self.project.update_payment_strategy()
 
+
+
+class SearchIndexChange(models.Model):
+    """Append-only feed of search document changes, replayed by per-process typeahead indexes"""
+    OP_CHOICES = [
+        ('upsert', 'Upsert'),
+        ('delete', 'Delete'),
+    ]
+    kind = models.CharField(max_length=20)
+    object_id = models.PositiveBigIntegerField()
+    op = models.CharField(max_length=10, choices=OP_CHOICES, default='upsert')
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.op} {self.kind} #{self.object_id}"
+
+
+class CacheVersion(models.Model):
+    """Version number of a cache scope, kept in the database so every process reads the same one"""
+    scope = models.CharField(max_length=100, unique=True)
+    version = models.BigIntegerField()
+
+    def __str__(self):
+        return f"{self.scope}: {self.version}"
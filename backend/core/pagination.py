@@ -0,0 +1,105 @@
+"""
+Keyset (seek) pagination.
+
+Rows are ordered by a fixed tuple of fields that ends in a unique column,
+and the cursor carries the ordering values of the last row served.  The
+next page is fetched with a ``WHERE (a, b, id) < (...)`` style predicate,
+so page 500 costs the same index seek as page 1, unlike OFFSET.  The
+same cursor read the other way round (``since``) fetches only the rows
+added in front of it, for polling feeds.
+"""
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder keeps datetimes to milliseconds; a cursor needs the exact value it seeks from"""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPaginator:
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def __init__(self, ordering, page_size=20, max_page_size=100):
+        # e.g. ('-created_at', '-id'); the last field must be unique
+        self.ordering = tuple(ordering)
+        self.page_size = page_size
+        self.max_page_size = max_page_size
+
+    @property
+    def fields(self):
+        return [field.lstrip('-') for field in self.ordering]
+
+    def encode_cursor(self, row):
+        values = [row[field] if isinstance(row, dict) else getattr(row, field) for field in self.fields]
+        payload = json.dumps({'o': self.ordering, 'v': values}, cls=CursorEncoder)
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, cursor):
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            values = payload['v']
+            ordering = tuple(payload['o'])
+        except (ValueError, KeyError, TypeError, binascii.Error):
+            raise ValidationError({self.cursor_query_param: 'Invalid cursor'})
+        if ordering != self.ordering or len(values) != len(self.ordering):
+            raise ValidationError({self.cursor_query_param: 'Cursor does not match this listing'})
+        return values
+
+    def seek_filter(self, values, before=False):
+        """Q selecting the rows that come strictly after (or ``before``) ``values`` in this ordering"""
+        condition = Q()
+        for position in range(len(self.ordering) - 1, -1, -1):
+            field = self.fields[position]
+            lookup = 'lt' if self.ordering[position].startswith('-') != before else 'gt'
+            step = Q(**{f'{field}__{lookup}': values[position]})
+            if position < len(self.ordering) - 1:
+                step |= Q(**{field: values[position]}) & condition
+            condition = step
+        return condition
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            page_size = self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def paginate(self, request, queryset):
+        """Return (rows, next_cursor) for the page selected by the request's cursor"""
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self.seek_filter(self.decode_cursor(cursor)))
+        page_size = self.get_page_size(request)
+        rows = list(queryset.order_by(*self.ordering)[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        return rows, self.encode_cursor(rows[-1]) if has_more else None
+
+    def paginate_since(self, request, queryset, since_query_param='since'):
+        """
+        Return (rows, since_cursor, has_more) for the rows that come before the
+        request's ``since`` cursor (newer rows, for a newest-first listing).
+        They are read from the cursor outwards, one page at a time, and returned
+        in this ordering; ``since_cursor`` marks the last row delivered.
+        """
+        since = request.query_params.get(since_query_param)
+        values = self.decode_cursor(since)
+        reverse = [field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering]
+        page_size = self.get_page_size(request)
+        rows = list(queryset.filter(self.seek_filter(values, before=True)).order_by(*reverse)[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        since_cursor = self.encode_cursor(rows[-1]) if rows else since
+        return rows[::-1], since_cursor, has_more
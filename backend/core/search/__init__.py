@@ -0,0 +1,78 @@
+"""
+Full-text search over users, projects, categories and skills.
+
+The backend is chosen by the ``SEARCH_BACKEND`` setting (a dotted path,
+SQLite FTS5 by default).  When the configured backend is not usable on the
+current database the pure-Python in-memory index is used instead.
+"""
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .backends import BaseSearchBackend, InMemorySearchBackend, SQLiteFTS5Backend
+from .documents import CATEGORY, DOCUMENT_BUILDERS, KINDS, PROJECT, SKILL, USER, SearchDocument
+
+DEFAULT_SEARCH_BACKEND = 'core.search.backends.SQLiteFTS5Backend'
+
+_backend = None
+_fallback = None
+_backend_lock = threading.Lock()
+
+
+def get_search_backend():
+    """Return the configured search backend, or the in-memory fallback"""
+    global _backend, _fallback
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                backend_class = import_string(getattr(settings, 'SEARCH_BACKEND', DEFAULT_SEARCH_BACKEND))
+                _backend = backend_class()
+    if _backend.is_available():
+        return _backend
+    if _fallback is None:
+        with _backend_lock:
+            if _fallback is None:
+                _fallback = InMemorySearchBackend()
+    return _fallback
+
+
+def search_ids(query, kind, limit=10, offset=0, within=None):
+    """Ranked ids of ``kind`` objects matching ``query``, optionally restricted to ``within``"""
+    return get_search_backend().search(query, kind, limit=limit, offset=offset, within=within)
+
+
+def count(query, kind, within=None):
+    return get_search_backend().count(query, kind, within=within)
+
+
+def index_objects(kind, queryset):
+    """(Re)index every object of ``kind`` in ``queryset``"""
+    get_search_backend().index(DOCUMENT_BUILDERS[kind](queryset))
+
+
+def remove_objects(kind, object_ids):
+    get_search_backend().remove(kind, object_ids)
+
+
+def rebuild_index():
+    get_search_backend().rebuild()
+
+
+__all__ = [
+    'BaseSearchBackend',
+    'SQLiteFTS5Backend',
+    'InMemorySearchBackend',
+    'SearchDocument',
+    'USER',
+    'PROJECT',
+    'CATEGORY',
+    'SKILL',
+    'KINDS',
+    'get_search_backend',
+    'search_ids',
+    'count',
+    'index_objects',
+    'remove_objects',
+    'rebuild_index',
+]
@@ -0,0 +1,301 @@
+"""
+Search backends for the core inverted index.
+
+``SQLiteFTS5Backend`` keeps the index in an FTS5 virtual table inside the
+default database (created by ``core.0005_search_index``), so index writes
+share the surrounding ORM transaction.  ``InMemorySearchBackend`` is a
+pure-Python inverted index used when FTS5 is not available, e.g. on a
+non-SQLite database.
+"""
+import threading
+import uuid
+from bisect import bisect_left, insort
+from collections import defaultdict
+from itertools import islice
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .documents import KINDS, iter_all_documents, tokenize
+
+# Each document is stored under rowid = (object_id << 3) | kind code, so a
+# document can be replaced or deleted by rowid without scanning the table.
+KIND_CODES = {kind: code for code, kind in enumerate(KINDS, start=1)}
+KIND_BITS = 3
+KIND_MASK = (1 << KIND_BITS) - 1
+
+TITLE_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+
+
+def _chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class BaseSearchBackend:
+    """Interface every search backend implements"""
+
+    def is_available(self):
+        return True
+
+    def index(self, documents):
+        """Insert or replace documents in the index"""
+        raise NotImplementedError
+
+    def remove(self, kind, object_ids):
+        """Remove documents of one kind from the index"""
+        raise NotImplementedError
+
+    def clear(self):
+        """Drop every document from the index"""
+        raise NotImplementedError
+
+    def search(self, query, kind, limit=10, offset=0, within=None):
+        """Return ranked object ids of ``kind`` matching ``query``"""
+        raise NotImplementedError
+
+    def count(self, query, kind, within=None):
+        """Return the number of ``kind`` documents matching ``query``"""
+        raise NotImplementedError
+
+    def rebuild(self, documents=None):
+        """Replace the whole index with ``documents`` (defaults to every indexed object)"""
+        self.clear()
+        self.index(iter_all_documents() if documents is None else documents)
+
+
+class SQLiteFTS5Backend(BaseSearchBackend):
+    table = 'core_search_index'
+    batch_size = 1000
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.using = using
+        self._available = None
+
+    @property
+    def connection(self):
+        return connections[self.using]
+
+    def is_available(self):
+        if self._available is None:
+            connection = self.connection
+            self._available = (
+                connection.vendor == 'sqlite'
+                and self.table in connection.introspection.table_names()
+            )
+        return self._available
+
+    @staticmethod
+    def _rowid(kind, object_id):
+        return (int(object_id) << KIND_BITS) | KIND_CODES[kind]
+
+    @staticmethod
+    def _match_expression(query):
+        tokens = tokenize(query)
+        if not tokens:
+            return None
+        # Prefix-match every token and require all of them (implicit AND)
+        return ' '.join(f'"{token}"*' for token in tokens)
+
+    def _within_clause(self, within):
+        if within is None:
+            return '', []
+        if hasattr(within, 'query'):
+            try:
+                sql, params = within.values_list('pk', flat=True).query.sql_with_params()
+            except EmptyResultSet:
+                return ' AND 0', []
+            return f' AND (rowid >> {KIND_BITS}) IN ({sql})', list(params)
+        ids = [int(pk) for pk in within]
+        if not ids:
+            return ' AND 0', []
+        placeholders = ', '.join(['%s'] * len(ids))
+        return f' AND (rowid >> {KIND_BITS}) IN ({placeholders})', ids
+
+    def index(self, documents):
+        with self.connection.cursor() as cursor:
+            for chunk in _chunked(documents, self.batch_size):
+                rows = [(self._rowid(doc.kind, doc.object_id), doc.title or '', doc.body or '') for doc in chunk]
+                cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(row[0],) for row in rows])
+                cursor.executemany(f'INSERT INTO {self.table} (rowid, title, body) VALUES (%s, %s, %s)', rows)
+
+    def remove(self, kind, object_ids):
+        rowids = [(self._rowid(kind, pk),) for pk in object_ids]
+        if rowids:
+            with self.connection.cursor() as cursor:
+                cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', rowids)
+
+    def clear(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+
+    def search(self, query, kind, limit=10, offset=0, within=None):
+        match = self._match_expression(query)
+        if match is None:
+            return []
+        within_sql, within_params = self._within_clause(within)
+        sql = (
+            f'SELECT rowid FROM {self.table} '
+            f'WHERE {self.table} MATCH %s AND (rowid & {KIND_MASK}) = %s{within_sql} '
+            f'ORDER BY bm25({self.table}, {TITLE_WEIGHT}, {BODY_WEIGHT}), rowid '
+            f'LIMIT %s OFFSET %s'
+        )
+        params = [match, KIND_CODES[kind], *within_params, limit, offset]
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [rowid >> KIND_BITS for (rowid,) in cursor.fetchall()]
+
+    def count(self, query, kind, within=None):
+        match = self._match_expression(query)
+        if match is None:
+            return 0
+        within_sql, within_params = self._within_clause(within)
+        sql = (
+            f'SELECT COUNT(*) FROM {self.table} '
+            f'WHERE {self.table} MATCH %s AND (rowid & {KIND_MASK}) = %s{within_sql}'
+        )
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql, [match, KIND_CODES[kind], *within_params])
+            return cursor.fetchone()[0]
+
+
+class InMemorySearchBackend(BaseSearchBackend):
+    """
+    Process-local inverted index.
+
+    The index is built lazily from the database on first use.  Every write
+    publishes a new stamp in the shared cache; a process that sees a stamp
+    it did not produce rebuilds before answering, so writes made by other
+    workers are picked up as well.
+    """
+    stamp_key = 'search:inmemory:stamp'
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+        self._loaded = False
+        self._stamp = None
+
+    def _reset(self):
+        self._postings = defaultdict(set)   # token -> {(kind, object_id)}
+        self._documents = {}                # (kind, object_id) -> (title tokens, all tokens)
+        self._vocabulary = []               # sorted list of tokens for prefix scans
+
+    def _publish_stamp(self):
+        self._stamp = uuid.uuid4().hex
+        cache.set(self.stamp_key, self._stamp, None)
+
+    def _ensure_loaded(self):
+        shared_stamp = cache.get(self.stamp_key)
+        if self._loaded and shared_stamp in (None, self._stamp):
+            return
+        with self._lock:
+            self._reset()
+            for document in iter_all_documents():
+                self._add(document)
+            self._loaded = True
+            self._stamp = shared_stamp
+            if shared_stamp is None:
+                self._publish_stamp()
+
+    def _add(self, document):
+        key = (document.kind, int(document.object_id))
+        self._discard(key)
+        title_tokens = frozenset(tokenize(document.title))
+        all_tokens = title_tokens | frozenset(tokenize(document.body))
+        self._documents[key] = (title_tokens, all_tokens)
+        for token in all_tokens:
+            if token not in self._postings:
+                insort(self._vocabulary, token)
+            self._postings[token].add(key)
+
+    def _discard(self, key):
+        existing = self._documents.pop(key, None)
+        if existing is None:
+            return
+        for token in existing[1]:
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.discard(key)
+            if not postings:
+                del self._postings[token]
+                position = bisect_left(self._vocabulary, token)
+                if position < len(self._vocabulary) and self._vocabulary[position] == token:
+                    self._vocabulary.pop(position)
+
+    def _prefix_tokens(self, prefix):
+        position = bisect_left(self._vocabulary, prefix)
+        while position < len(self._vocabulary) and self._vocabulary[position].startswith(prefix):
+            yield self._vocabulary[position]
+            position += 1
+
+    def index(self, documents):
+        with self._lock:
+            if self._loaded:
+                for document in documents:
+                    self._add(document)
+            self._publish_stamp()
+
+    def remove(self, kind, object_ids):
+        with self._lock:
+            if self._loaded:
+                for pk in object_ids:
+                    self._discard((kind, int(pk)))
+            self._publish_stamp()
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+            self._loaded = False
+            cache.delete(self.stamp_key)
+
+    def rebuild(self, documents=None):
+        with self._lock:
+            self._reset()
+            for document in (iter_all_documents() if documents is None else documents):
+                self._add(document)
+            self._loaded = True
+            self._publish_stamp()
+
+    def _ranked(self, query, kind, within):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        self._ensure_loaded()
+        with self._lock:
+            matches = None
+            for token in tokens:
+                token_matches = set()
+                for candidate in self._prefix_tokens(token):
+                    token_matches.update(key for key in self._postings[candidate] if key[0] == kind)
+                matches = token_matches if matches is None else matches & token_matches
+                if not matches:
+                    return []
+            if within is not None:
+                if hasattr(within, 'query'):
+                    within = within.values_list('pk', flat=True)
+                allowed = {int(pk) for pk in within}
+                matches = {key for key in matches if key[1] in allowed}
+
+            def score(key):
+                title_tokens = self._documents[key][0]
+                total = 0.0
+                for token in tokens:
+                    in_title = any(word.startswith(token) for word in title_tokens)
+                    total += TITLE_WEIGHT if in_title else BODY_WEIGHT
+                return total
+
+            return sorted(matches, key=lambda key: (-score(key), key[1]))
+
+    def search(self, query, kind, limit=10, offset=0, within=None):
+        return [key[1] for key in self._ranked(query, kind, within)[offset:offset + limit]]
+
+    def count(self, query, kind, within=None):
+        return len(self._ranked(query, kind, within))
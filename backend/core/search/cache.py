@@ -0,0 +1,108 @@
+"""
+Result cache for ``search_partial``.
+
+Keys combine the query, the caller's role scope, page and page size with
+the current version of every entity the results are built from.  Versions
+are ``CacheVersion`` rows, read in one query per search, so saving or
+deleting one of those entities in any process invalidates the pages every
+process cached; stale pages are never served again and simply age out.
+Identical concurrent misses within a process are coalesced: one thread
+computes while the others wait for its result.  Results and hit/miss
+metrics live in the default cache, so both are per process unless a
+shared cache backend is configured.
+"""
+import hashlib
+import json
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+
+from ..services.cache_version_service import CacheVersionService
+from .documents import CATEGORY, PROJECT, SKILL, USER
+
+VERSIONED_ENTITIES = (USER, PROJECT, CATEGORY, SKILL)
+
+RESULT_TIMEOUT = getattr(settings, 'SEARCH_CACHE_TIMEOUT', 60 * 15)
+
+METRIC_KEYS = {
+    'hits': 'search:metrics:hits',
+    'misses': 'search:metrics:misses',
+    'coalesced': 'search:metrics:coalesced',
+}
+
+_local_locks = {}
+_local_locks_guard = threading.Lock()
+
+
+def _version_scope(entity):
+    return f'search:{entity}'
+
+
+def get_versions():
+    versions = CacheVersionService.get_many(_version_scope(entity) for entity in VERSIONED_ENTITIES)
+    return {entity: versions[_version_scope(entity)] for entity in VERSIONED_ENTITIES}
+
+
+def bump_version(*entities):
+    """Invalidate every cached result built from ``entities``"""
+    CacheVersionService.bump(_version_scope(entity) for entity in entities)
+
+
+def _incr_metric(name):
+    key = METRIC_KEYS[name]
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def get_metrics():
+    values = cache.get_many(METRIC_KEYS.values())
+    metrics = {name: values.get(key, 0) for name, key in METRIC_KEYS.items()}
+    lookups = metrics['hits'] + metrics['misses']
+    metrics['hit_ratio'] = round(metrics['hits'] / lookups, 4) if lookups else None
+    return metrics
+
+
+def reset_metrics():
+    cache.delete_many(METRIC_KEYS.values())
+
+
+def result_key(query, scope, page, page_size):
+    payload = json.dumps([query, scope, page, page_size, get_versions()], sort_keys=True)
+    return 'search:results:' + hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def _local_lock(key):
+    with _local_locks_guard:
+        lock = _local_locks.get(key)
+        if lock is None:
+            lock = _local_locks[key] = threading.Lock()
+        return lock
+
+
+def get_or_compute(key, compute):
+    """Return the cached value for ``key``, computing it at most once across this process's threads"""
+    result = cache.get(key)
+    if result is not None:
+        _incr_metric('hits')
+        return result
+
+    local_lock = _local_lock(key)
+    try:
+        with local_lock:
+            result = cache.get(key)
+            if result is not None:
+                _incr_metric('coalesced')
+                _incr_metric('hits')
+                return result
+            _incr_metric('misses')
+            result = compute()
+            cache.set(key, result, RESULT_TIMEOUT)
+            return result
+    finally:
+        with _local_locks_guard:
+            if _local_locks.get(key) is local_lock:
+                del _local_locks[key]
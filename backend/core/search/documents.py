@@ -0,0 +1,76 @@
+"""
+Builders that turn core models into flat search documents.
+
+Every indexed object becomes a ``SearchDocument`` with a ``title`` (the
+heavily weighted field) and a free-text ``body``.  The builders work on
+``values_list`` rows so bulk rebuilds never instantiate model objects.
+"""
+import re
+from collections import namedtuple
+
+SearchDocument = namedtuple('SearchDocument', ['kind', 'object_id', 'title', 'body'])
+
+USER = 'user'
+PROJECT = 'project'
+CATEGORY = 'category'
+SKILL = 'skill'
+
+KINDS = (USER, PROJECT, CATEGORY, SKILL)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    """Split text into lowercase word tokens"""
+    return TOKEN_RE.findall((text or '').lower())
+
+
+def _join(*parts):
+    return ' '.join(part for part in parts if part)
+
+
+def user_documents(queryset=None):
+    from core.models import User
+
+    queryset = User.objects.all() if queryset is None else queryset
+    for pk, username, role in queryset.values_list('id', 'username', 'role').iterator(chunk_size=2000):
+        yield SearchDocument(USER, pk, username, role)
+
+
+def project_documents(queryset=None):
+    from core.models import Project
+
+    queryset = Project.objects.all() if queryset is None else queryset
+    rows = queryset.values_list('id', 'title', 'description', 'domain__name')
+    for pk, title, description, domain_name in rows.iterator(chunk_size=2000):
+        yield SearchDocument(PROJECT, pk, title, _join(description, domain_name))
+
+
+def category_documents(queryset=None):
+    from core.models import Category
+
+    queryset = Category.objects.all() if queryset is None else queryset
+    for pk, name in queryset.values_list('id', 'name').iterator(chunk_size=2000):
+        yield SearchDocument(CATEGORY, pk, name, '')
+
+
+def skill_documents(queryset=None):
+    from core.models import Skill
+
+    queryset = Skill.objects.all() if queryset is None else queryset
+    for pk, name, category_name in queryset.values_list('id', 'name', 'category__name').iterator(chunk_size=2000):
+        yield SearchDocument(SKILL, pk, name, category_name)
+
+
+DOCUMENT_BUILDERS = {
+    USER: user_documents,
+    PROJECT: project_documents,
+    CATEGORY: category_documents,
+    SKILL: skill_documents,
+}
+
+
+def iter_all_documents():
+    """Yield documents for every indexed object"""
+    for kind in KINDS:
+        yield from DOCUMENT_BUILDERS[kind]()
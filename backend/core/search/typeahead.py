@@ -0,0 +1,246 @@
+"""
+Per-process typeahead index for the global search bar.
+
+Usernames, project titles and category names are kept in memory as a
+sorted token vocabulary (a flattened prefix trie) with postings per token,
+so prefix lookups never touch the database.  The index is warmed once per
+worker and then kept current by replaying ``SearchIndexChange`` rows, which
+the search signals append in the same transaction as the model write.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import defaultdict, namedtuple
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .documents import CATEGORY, PROJECT, USER, tokenize
+
+logger = logging.getLogger(__name__)
+
+TYPEAHEAD_KINDS = (USER, PROJECT, CATEGORY)
+
+POLL_INTERVAL = getattr(settings, 'TYPEAHEAD_POLL_INTERVAL', 1.0)
+REPLAY_BATCH_SIZE = 5000
+REPLAY_OVERLAP = 200
+
+TypeaheadEntry = namedtuple('TypeaheadEntry', ['kind', 'object_id', 'label', 'payload'])
+
+
+def record_change(kind, object_id, op='upsert'):
+    """Append a typeahead change to the feed; a no-op for kinds the typeahead does not index"""
+    from core.models import SearchIndexChange
+
+    if kind in TYPEAHEAD_KINDS:
+        SearchIndexChange.objects.create(kind=kind, object_id=object_id, op=op)
+
+
+def _load_users(ids=None):
+    from core.models import User
+
+    queryset = User.objects.all() if ids is None else User.objects.filter(pk__in=ids)
+    for pk, username, role in queryset.values_list('id', 'username', 'role').iterator(chunk_size=2000):
+        pathrole = 'freelancer' if role in ['freelancer', 'student'] else 'client'
+        yield TypeaheadEntry(USER, pk, username, {'id': pk, 'username': username, 'role': role, 'pathrole': pathrole})
+
+
+def _load_projects(ids=None):
+    from core.models import Project
+
+    queryset = Project.objects.all() if ids is None else Project.objects.filter(pk__in=ids)
+    assignees = defaultdict(set)
+    through = Project.assigned_to.through.objects.all()
+    if ids is not None:
+        through = through.filter(project_id__in=ids)
+    for project_id, user_id in through.values_list('project_id', 'user_id').iterator(chunk_size=2000):
+        assignees[project_id].add(user_id)
+    for pk, title, client_id in queryset.values_list('id', 'title', 'client_id').iterator(chunk_size=2000):
+        payload = {'id': pk, 'title': title, 'client_id': client_id, 'assigned_to': frozenset(assignees.get(pk, ()))}
+        yield TypeaheadEntry(PROJECT, pk, title, payload)
+
+
+def _load_categories(ids=None):
+    from core.models import Category
+
+    queryset = Category.objects.all() if ids is None else Category.objects.filter(pk__in=ids)
+    for pk, name in queryset.values_list('id', 'name').iterator(chunk_size=2000):
+        yield TypeaheadEntry(CATEGORY, pk, name, {'id': pk, 'name': name})
+
+
+LOADERS = {
+    USER: _load_users,
+    PROJECT: _load_projects,
+    CATEGORY: _load_categories,
+}
+
+
+class TypeaheadIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+        self.ready = False
+        self.last_change_id = 0
+        self._applied = set()               # change ids already replayed inside the overlap window
+        self._last_poll = 0.0
+
+    def _reset(self):
+        self._entries = {}                  # (kind, object_id) -> TypeaheadEntry
+        self._postings = defaultdict(set)   # token -> {(kind, object_id)}
+        self._vocabulary = []               # sorted tokens, bisected for prefix scans
+
+    def _add(self, entry):
+        key = (entry.kind, entry.object_id)
+        self._discard(key)
+        self._entries[key] = entry
+        for token in set(tokenize(entry.label)):
+            if token not in self._postings:
+                insort(self._vocabulary, token)
+            self._postings[token].add(key)
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for token in set(tokenize(entry.label)):
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.discard(key)
+            if not postings:
+                del self._postings[token]
+                position = bisect_left(self._vocabulary, token)
+                if position < len(self._vocabulary) and self._vocabulary[position] == token:
+                    self._vocabulary.pop(position)
+
+    def warm(self):
+        """Load every entry from the database, replacing the current contents"""
+        from core.models import SearchIndexChange
+
+        # Take the feed position first so writes racing the load are replayed afterwards
+        last_change_id = SearchIndexChange.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        entries = [entry for kind in TYPEAHEAD_KINDS for entry in LOADERS[kind]()]
+        with self._lock:
+            self._reset()
+            for entry in entries:
+                self._add(entry)
+            self.last_change_id = last_change_id
+            self._applied = set()
+            self._last_poll = time.monotonic()
+            self.ready = True
+
+    def sync(self, force=False):
+        """Warm on first use, then replay the change feed at most once per poll interval"""
+        from core.models import SearchIndexChange
+
+        if not self.ready:
+            self.warm()
+            return
+        if not force and time.monotonic() - self._last_poll < POLL_INTERVAL:
+            return
+        self._last_poll = time.monotonic()
+
+        # Re-read a window below our position: ids are assigned at insert time but
+        # become visible at commit, so concurrent writers can commit out of order.
+        floor = max(self.last_change_id - REPLAY_OVERLAP, 0)
+        rows = list(
+            SearchIndexChange.objects.filter(id__gt=floor)
+            .order_by('id')
+            .values_list('id', 'kind', 'object_id', 'op')[:REPLAY_BATCH_SIZE]
+        )
+        changes = [row for row in rows if row[0] not in self._applied]
+        if not changes:
+            return
+
+        # Only the latest operation per object matters
+        latest = {}
+        for _, kind, object_id, op in changes:
+            latest[(kind, object_id)] = op
+        upserts = defaultdict(list)
+        for (kind, object_id), op in latest.items():
+            if op == 'upsert' and kind in LOADERS:
+                upserts[kind].append(object_id)
+        loaded = [entry for kind, ids in upserts.items() for entry in LOADERS[kind](ids)]
+
+        with self._lock:
+            for key, op in latest.items():
+                self._discard(key)
+            for entry in loaded:
+                self._add(entry)
+            self._applied.update(row[0] for row in changes)
+            self.last_change_id = max(self.last_change_id, rows[-1][0])
+            floor = self.last_change_id - REPLAY_OVERLAP
+            self._applied = {change_id for change_id in self._applied if change_id > floor}
+
+    def _visible(self, entry, user):
+        if entry.kind != PROJECT:
+            return True
+        # Same scoping as the full search: a client's own projects, or projects the user works on
+        if user.role == 'client':
+            return entry.payload['client_id'] == user.id
+        return user.id in entry.payload['assigned_to']
+
+    def lookup(self, query, user, limit=8):
+        """Prefix-match ``query`` against every token and return the best entries per kind"""
+        tokens = tokenize(query)
+        results = {USER: [], PROJECT: [], CATEGORY: []}
+        if not tokens:
+            return results
+        lowered = query.strip().lower()
+        with self._lock:
+            matches = None
+            for token in tokens:
+                position = bisect_left(self._vocabulary, token)
+                token_matches = set()
+                while position < len(self._vocabulary) and self._vocabulary[position].startswith(token):
+                    token_matches |= self._postings[self._vocabulary[position]]
+                    position += 1
+                matches = token_matches if matches is None else matches & token_matches
+                if not matches:
+                    return results
+            entries = [self._entries[key] for key in matches]
+
+        # Whole-label prefix matches first, then shorter labels
+        entries.sort(key=lambda entry: (not entry.label.lower().startswith(lowered), len(entry.label), entry.object_id))
+        for entry in entries:
+            bucket = results[entry.kind]
+            if len(bucket) < limit and self._visible(entry, user):
+                bucket.append(entry)
+        return results
+
+
+_index = None
+_index_lock = threading.Lock()
+_poller = None
+
+
+def get_typeahead_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = TypeaheadIndex()
+    return _index
+
+
+def _poll_forever(index):
+    while True:
+        try:
+            index.sync()
+        except Exception:
+            logger.exception("Typeahead index sync failed")
+        finally:
+            close_old_connections()
+        time.sleep(POLL_INTERVAL)
+
+
+def start_background_sync():
+    """Warm this process's index and keep replaying the change feed in a daemon thread"""
+    global _poller
+    index = get_typeahead_index()
+    with _index_lock:
+        if _poller is None:
+            _poller = threading.Thread(target=_poll_forever, args=(index,),
+                                       name='typeahead-sync', daemon=True)
+            _poller.start()
@@ -250,3 +250,16 @@ class ProjectResponseSerializer(serializers.ModelSerializer):
             'status', 'created_at'
         ]
 
+
+class ProjectBrowseSerializer(serializers.ModelSerializer):
+    domain = CategorySerializer(read_only=True)
+    skills_required = SimpleSkillSerializer(many=True, read_only=True)
+    relevance = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Project
+        fields = [
+            'id', 'title', 'description', 'budget', 'deadline',
+            'domain', 'skills_required', 'complexity_level',
+            'is_collaborative', 'is_talentrise_friendly', 'created_at', 'relevance'
+        ]
@@ -0,0 +1,47 @@
+"""
+Cache versions shared by every process.
+
+Cached bodies may live in a process-local cache, but the version they are
+keyed by is a ``CacheVersion`` row, so a write handled by any web worker,
+Celery task or shell invalidates them everywhere.  A bump moves a version
+to the current time in microseconds, or one past its old value when that
+is larger, so versions never go backwards even with skewed clocks.
+"""
+import time
+
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+from ..models import CacheVersion
+
+
+def _now_version():
+    return time.time_ns() // 1000
+
+
+class CacheVersionService:
+    @staticmethod
+    def get_many(scopes):
+        """{scope: version} in one query; scopes never bumped get the current time"""
+        names = {scope: str(scope) for scope in scopes}
+        stored = dict(CacheVersion.objects.filter(scope__in=names.values()).values_list('scope', 'version'))
+        missing = [name for name in names.values() if name not in stored]
+        if missing:
+            CacheVersion.objects.bulk_create(
+                [CacheVersion(scope=name, version=_now_version()) for name in missing], ignore_conflicts=True
+            )
+            stored.update(CacheVersion.objects.filter(scope__in=missing).values_list('scope', 'version'))
+        return {scope: stored[name] for scope, name in names.items()}
+
+    @staticmethod
+    def bump(scopes):
+        """Move every scope to a new version"""
+        names = {str(scope) for scope in scopes}
+        if not names:
+            return
+        now = _now_version()
+        updated = CacheVersion.objects.filter(scope__in=names).update(version=Greatest(F('version') + 1, Value(now)))
+        if updated < len(names):
+            CacheVersion.objects.bulk_create(
+                [CacheVersion(scope=name, version=now) for name in names], ignore_conflicts=True
+            )
@@ -0,0 +1,254 @@
+"""
+Per-user unread notification counters, broken down by type.
+
+``NotificationCounter`` rows are the durable copy and are adjusted with
+atomic ``F()`` updates inside the same transaction as the notification
+write.  When ``NOTIFICATION_COUNTER_REDIS_URL`` is configured, a hash per
+user holds a snapshot of the rows, refreshed after each commit and used
+for reads; if Redis is missing or unreachable everything falls back to the
+rows.  Snapshots carry the user's counter generation, a ``CacheVersion``
+bumped with every counter change that never goes backwards (not even when
+counter rows are deleted), so a slower writer can never replace a newer
+snapshot with an older one.  ``reconcile`` repairs drift from writes that
+bypass the model (``QuerySet.update`` and friends).
+"""
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from ..models import Notification, NotificationCounter
+from .cache_version_service import CacheVersionService
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - redis is optional
+    redis = None
+
+REDIS_KEY = 'notifications:unread:{user_id}'
+GENERATION_SCOPE = 'notifications:{user_id}'
+REDIS_KEY_TTL = 60 * 60 * 24
+# After a Redis failure, stay on the database for this many seconds
+REDIS_RETRY_AFTER = 30
+
+VERSION_FIELD = '_version'
+
+# Replace the hash only with a snapshot newer than the stored one
+STORE_IF_NEWER = """
+local current = tonumber(redis.call('HGET', KEYS[1], ARGV[1]) or '-1')
+if tonumber(ARGV[2]) > current then
+    redis.call('DEL', KEYS[1])
+    redis.call('HSET', KEYS[1], ARGV[1], ARGV[2], unpack(ARGV, 4))
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+end
+return 0
+"""
+
+_redis_client = None
+_redis_down_until = 0.0
+
+
+def _get_redis():
+    global _redis_client
+    url = getattr(settings, 'NOTIFICATION_COUNTER_REDIS_URL', None)
+    if not url or redis is None or time.monotonic() < _redis_down_until:
+        return None
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(
+            url, socket_timeout=0.25, socket_connect_timeout=0.25, decode_responses=True
+        )
+    return _redis_client
+
+
+def _redis_failed():
+    global _redis_down_until
+    _redis_down_until = time.monotonic() + REDIS_RETRY_AFTER
+
+
+def _generation_scopes(user_ids):
+    return {user_id: GENERATION_SCOPE.format(user_id=user_id) for user_id in user_ids}
+
+
+class NotificationCounterService:
+    @staticmethod
+    def apply_deltas(deltas):
+        """
+        Adjust counters by {(user_id, type): delta}.  The rows change in the
+        caller's transaction; the Redis snapshot is refreshed once it commits.
+        """
+        deltas = {key: delta for key, delta in deltas.items() if delta}
+        if len(deltas) == 1:
+            (user_id, type), delta = next(iter(deltas.items()))
+            NotificationCounterService._apply_db_delta(user_id, type, delta)
+        elif deltas:
+            NotificationCounterService._apply_db_deltas_grouped(deltas)
+        user_ids = {user_id for user_id, _ in deltas}
+        if not user_ids:
+            return
+        CacheVersionService.bump(_generation_scopes(user_ids).values())
+        if _get_redis() is not None:
+            transaction.on_commit(lambda: NotificationCounterService.refresh_mirror(user_ids))
+
+    @staticmethod
+    def _apply_db_deltas_grouped(deltas, chunk_size=500):
+        """One UPDATE per (type, delta) group and chunk instead of one per user"""
+        groups = defaultdict(list)
+        for (user_id, type), delta in deltas.items():
+            groups[(type, delta)].append(user_id)
+
+        for (type, delta), user_ids in groups.items():
+            for start in range(0, len(user_ids), chunk_size):
+                chunk = user_ids[start:start + chunk_size]
+                counters = NotificationCounter.objects.filter(type=type, user_id__in=chunk)
+                existing = set(counters.values_list('user_id', flat=True))
+                if existing:
+                    NotificationCounter.objects.filter(type=type, user_id__in=existing).update(
+                        unread=Greatest(F('unread') + delta, 0)
+                    )
+                missing = [
+                    NotificationCounter(user_id=user_id, type=type, unread=max(delta, 0))
+                    for user_id in chunk if user_id not in existing
+                ]
+                # A row created concurrently keeps its value; reconcile() picks up the difference
+                NotificationCounter.objects.bulk_create(missing, ignore_conflicts=True)
+
+    @staticmethod
+    def _apply_db_delta(user_id, type, delta):
+        counters = NotificationCounter.objects.filter(user_id=user_id, type=type)
+        unread = Greatest(F('unread') + delta, 0)
+        if counters.update(unread=unread):
+            return
+        try:
+            with transaction.atomic():
+                NotificationCounter.objects.create(user_id=user_id, type=type, unread=max(delta, 0))
+        except IntegrityError:
+            # Created concurrently; the row exists now
+            counters.update(unread=unread)
+
+    @staticmethod
+    def _load_snapshots(user_ids):
+        """{user_id: (generation, {type: unread})} read from the counter rows"""
+        # Generations are read before the rows: a write landing in between
+        # leaves a snapshot labelled older than its data, never newer
+        scopes = _generation_scopes(user_ids)
+        generations = CacheVersionService.get_many(scopes.values())
+        snapshots = {user_id: (generations[scope], {}) for user_id, scope in scopes.items()}
+        rows = NotificationCounter.objects.filter(user_id__in=user_ids).values_list('user_id', 'type', 'unread')
+        for user_id, type, unread in rows:
+            if unread:
+                snapshots[user_id][1][type] = unread
+        return snapshots
+
+    @staticmethod
+    def _store_snapshots(client, snapshots):
+        pipe = client.pipeline(transaction=False)
+        for user_id, (version, counts) in snapshots.items():
+            fields = [item for pair in counts.items() for item in pair]
+            pipe.eval(STORE_IF_NEWER, 1, REDIS_KEY.format(user_id=user_id), VERSION_FIELD, version, REDIS_KEY_TTL, *fields)
+        pipe.execute()
+
+    @staticmethod
+    def refresh_mirror(user_ids):
+        client = _get_redis()
+        if client is None:
+            return
+        try:
+            NotificationCounterService._store_snapshots(client, NotificationCounterService._load_snapshots(user_ids))
+        except redis.RedisError:
+            _redis_failed()
+
+    @staticmethod
+    def record_save(notification, created):
+        """Counter delta for a saved Notification"""
+        was_unread = created is False and getattr(notification, '_loaded_is_read', None) is False
+        old_type = getattr(notification, '_loaded_type', notification.type)
+        deltas = defaultdict(int)
+        if was_unread:
+            deltas[(notification.user_id, old_type)] -= 1
+        if not notification.is_read:
+            deltas[(notification.user_id, notification.type)] += 1
+        NotificationCounterService.apply_deltas(deltas)
+        notification._loaded_is_read = notification.is_read
+        notification._loaded_type = notification.type
+
+    @staticmethod
+    def record_delete(notification):
+        if getattr(notification, '_loaded_is_read', notification.is_read) is False:
+            type = getattr(notification, '_loaded_type', notification.type)
+            NotificationCounterService.apply_deltas({(notification.user_id, type): -1})
+
+    @staticmethod
+    def get_counts_many(user_ids, chunk_size=500):
+        """{user_id: {type: unread}} read from the rows in chunks; refreshes the Redis snapshots"""
+        user_ids = list(user_ids)
+        client = _get_redis()
+        counts = {}
+        for start in range(0, len(user_ids), chunk_size):
+            snapshots = NotificationCounterService._load_snapshots(user_ids[start:start + chunk_size])
+            if client is not None:
+                try:
+                    NotificationCounterService._store_snapshots(client, snapshots)
+                except redis.RedisError:
+                    _redis_failed()
+                    client = None
+            counts.update({user_id: snapshot[1] for user_id, snapshot in snapshots.items()})
+        return counts
+
+    @staticmethod
+    def get_counts(user_id):
+        """{type: unread} for one user, from Redis when available"""
+        client = _get_redis()
+        if client is None:
+            return NotificationCounterService._load_snapshots([user_id])[user_id][1]
+        try:
+            cached = client.hgetall(REDIS_KEY.format(user_id=user_id))
+            if cached:
+                return {type: int(count) for type, count in cached.items() if type != VERSION_FIELD}
+            snapshots = NotificationCounterService._load_snapshots([user_id])
+            NotificationCounterService._store_snapshots(client, snapshots)
+            return snapshots[user_id][1]
+        except redis.RedisError:
+            _redis_failed()
+            return NotificationCounterService._load_snapshots([user_id])[user_id][1]
+
+    @staticmethod
+    def get_total(user_id):
+        return sum(NotificationCounterService.get_counts(user_id).values())
+
+    @staticmethod
+    def reconcile():
+        """Rebuild counters from the notifications table; returns how many counters were wrong"""
+        truth = {
+            (user_id, type): count
+            for user_id, type, count in Notification.objects.filter(is_read=False)
+            .order_by()
+            .values_list('user_id', 'type')
+            .annotate(count=Count('id'))
+        }
+        stored = {
+            (user_id, type): (pk, unread)
+            for pk, user_id, type, unread in NotificationCounter.objects.values_list('id', 'user_id', 'type', 'unread')
+        }
+
+        to_update, to_create, drifted_users = [], [], set()
+        for key, (pk, unread) in stored.items():
+            expected = truth.get(key, 0)
+            if unread != expected:
+                to_update.append(NotificationCounter(id=pk, unread=expected))
+                drifted_users.add(key[0])
+        for (user_id, type), count in truth.items():
+            if (user_id, type) not in stored:
+                to_create.append(NotificationCounter(user_id=user_id, type=type, unread=count))
+                drifted_users.add(user_id)
+
+        with transaction.atomic():
+            NotificationCounter.objects.bulk_update(to_update, ['unread'], batch_size=1000)
+            NotificationCounter.objects.bulk_create(to_create, batch_size=1000, ignore_conflicts=True)
+            CacheVersionService.bump(_generation_scopes(drifted_users).values())
+
+        if drifted_users:
+            NotificationCounterService.refresh_mirror(drifted_users)
+        return len(to_update) + len(to_create)
@@ -0,0 +1,154 @@
+import asyncio
+from collections import Counter
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import IntegrityError, connections, router, transaction
+
+from ..models import Notification
+from .notification_counter_service import NotificationCounterService
+
+
+def notification_payload(notification):
+    """Serializable body of the ``send_notification`` event for NotificationShowConsumer"""
+    return {
+        'id': notification.id,
+        'title': notification.title,
+        'notification_text': notification.notification_text,
+        'created_at': notification.created_at.isoformat(),  # Format the date as string
+        'related_model_id': notification.related_model_id,
+        'type': notification.type,
+    }
+
+
+def _supports_insert_returning_new_ids(connection):
+    """Whether ``_insert_returning_new_ids`` can run on this connection"""
+    # ON CONFLICT DO NOTHING ... RETURNING: PostgreSQL, and SQLite from 3.35
+    return connection.vendor in ('postgresql', 'sqlite') and connection.features.can_return_rows_from_bulk_insert
+
+
+def _insert_returning_new_ids(model, objs, using):
+    """
+    ``INSERT ... ON CONFLICT DO NOTHING RETURNING id`` for ``objs``; returns
+    the ids of the rows it wrote.  ``bulk_create(ignore_conflicts=True)``
+    cannot tell which rows were skipped, so the statement is written out
+    here with the public field API only.  Callers must check
+    ``_supports_insert_returning_new_ids`` first.
+    """
+    connection = connections[using]
+    opts = model._meta
+    fields = [field for field in opts.concrete_fields if not field.primary_key]
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(field.column) for field in fields)
+    row = '(%s)' % ', '.join(['%s'] * len(fields))
+    batch_size = connection.ops.bulk_batch_size(fields, objs) or len(objs)
+
+    inserted = []
+    with connection.cursor() as cursor:
+        for start in range(0, len(objs), batch_size):
+            batch = objs[start:start + batch_size]
+            cursor.execute(
+                f"INSERT INTO {quote(opts.db_table)} ({columns}) VALUES {', '.join([row] * len(batch))} "
+                f"ON CONFLICT DO NOTHING RETURNING {quote(opts.pk.column)}",
+                [field.get_db_prep_save(field.pre_save(obj, True), connection) for obj in batch for field in fields],
+            )
+            inserted.extend(row[0] for row in cursor.fetchall())
+    return inserted
+
+
+class NotificationService:
+    @staticmethod
+    def bulk_send(notifications, chunk_size=500, fanout_batch_size=200, ignore_conflicts=False):
+        """
+        Create many notifications at once and push them to their recipients.
+
+        Rows are inserted with bulk_create (so the per-row post_save receivers
+        do not fire), unread counters are adjusted from deltas computed in
+        memory, and after commit every message is sent to the channel layer
+        in concurrent batches from a single event loop.  Returns the created
+        notifications.
+
+        With ``ignore_conflicts`` every notification must carry a
+        ``dedup_key``; rows whose key already exists are skipped, so callers
+        racing each other cannot notify anyone twice.
+        """
+        notifications = list(notifications)
+        if not notifications:
+            return []
+
+        with transaction.atomic():
+            created = []
+            for start in range(0, len(notifications), chunk_size):
+                chunk = notifications[start:start + chunk_size]
+                if ignore_conflicts:
+                    created.extend(NotificationService._bulk_create_missing(chunk))
+                else:
+                    created.extend(Notification.objects.bulk_create(chunk))
+
+            deltas = Counter(
+                (notification.user_id, notification.type) for notification in created if not notification.is_read
+            )
+            NotificationCounterService.apply_deltas(deltas)
+
+            if created:
+                transaction.on_commit(lambda: NotificationService.fan_out(created, fanout_batch_size))
+        return created
+
+    @staticmethod
+    def _bulk_create_missing(notifications):
+        """
+        Insert the notifications whose dedup_key is new and return only the
+        rows this call inserted.  A concurrent caller inserting the same keys
+        gets none of them back, so counters and pushes happen once per key.
+        """
+        keys = [notification.dedup_key for notification in notifications]
+        existing = set(Notification.objects.filter(dedup_key__in=keys).values_list('dedup_key', flat=True))
+        missing = [notification for notification in notifications if notification.dedup_key not in existing]
+        if not missing:
+            return []
+
+        using = router.db_for_write(Notification)
+        if not _supports_insert_returning_new_ids(connections[using]):
+            # One savepoint per row; a key another caller already took raises
+            created = []
+            for notification in missing:
+                try:
+                    with transaction.atomic(using=using):
+                        Notification.objects.using(using).bulk_create([notification])
+                except IntegrityError:
+                    continue
+                created.append(notification)
+            return created
+
+        inserted = _insert_returning_new_ids(Notification, missing, using)
+        return list(Notification.objects.using(using).filter(id__in=inserted))
+
+    @staticmethod
+    def fan_out(notifications, batch_size=200):
+        """Send each notification and each recipient's new unread count to the channel layer"""
+        user_ids = list(dict.fromkeys(notification.user_id for notification in notifications))
+        counts = NotificationCounterService.get_counts_many(user_ids)
+
+        messages = [
+            (f"user_notification_{notification.user_id}", {
+                "type": "send_notification",  # This must match the method name in the consumer
+                "notification": notification_payload(notification),
+            })
+            for notification in notifications
+        ]
+        messages += [
+            (f"user_{user_id}", {
+                "type": "send_notification_count",
+                "notifications_count": sum(counts.get(user_id, {}).values()),
+                "notifications_by_type": counts.get(user_id, {}),
+            })
+            for user_id in user_ids
+        ]
+        async_to_sync(NotificationService._group_send_batched)(messages, batch_size)
+
+    @staticmethod
+    async def _group_send_batched(messages, batch_size):
+        channel_layer = get_channel_layer()
+        for start in range(0, len(messages), batch_size):
+            batch = messages[start:start + batch_size]
+            await asyncio.gather(*[channel_layer.group_send(group, message) for group, message in batch])
@@ -0,0 +1,226 @@
+from datetime import date, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Case, Count, Exists, IntegerField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from ..models import Category, Project, Skill, Task
+
+COMPLEXITY_LEVELS = ['entry', 'intermediate', 'advanced']
+
+# Ranking cost grows with every skill, so only this many are scored
+MAX_RANKING_SKILLS = 20
+
+# Upper bounds of the budget facet buckets; the last bucket is open-ended
+BUDGET_BUCKETS = [Decimal('500'), Decimal('2000'), Decimal('10000'), Decimal('50000')]
+
+
+def _int_list(params, name):
+    raw = params.get(name)
+    if not raw:
+        return []
+    try:
+        return [int(value) for value in raw.split(',') if value.strip()]
+    except ValueError:
+        raise ValidationError({name: 'Expected a comma separated list of ids'})
+
+
+def _decimal(params, name):
+    raw = params.get(name)
+    if raw in (None, ''):
+        return None
+    try:
+        return Decimal(raw)
+    except InvalidOperation:
+        raise ValidationError({name: 'Expected a number'})
+
+
+def _date(params, name):
+    raw = params.get(name)
+    if not raw:
+        return None
+    try:
+        return date.fromisoformat(raw)
+    except ValueError:
+        raise ValidationError({name: 'Expected a date in YYYY-MM-DD format'})
+
+
+class ProjectBrowseService:
+    """Open-project marketplace listing: filters, facets and relevance ranking"""
+
+    @staticmethod
+    def parse_filters(params):
+        filters = {
+            'domain': _int_list(params, 'domain'),
+            'skills': _int_list(params, 'skills'),
+            'budget_min': _decimal(params, 'budget_min'),
+            'budget_max': _decimal(params, 'budget_max'),
+            'deadline_after': _date(params, 'deadline_after'),
+            'deadline_before': _date(params, 'deadline_before'),
+            'complexity_level': [
+                level for level in params.get('complexity_level', '').split(',') if level
+            ],
+            'is_collaborative': None,
+        }
+        for level in filters['complexity_level']:
+            if level not in COMPLEXITY_LEVELS:
+                raise ValidationError({'complexity_level': f'Unknown complexity level: {level}'})
+        if params.get('deadline_within_days'):
+            try:
+                days = int(params['deadline_within_days'])
+            except ValueError:
+                raise ValidationError({'deadline_within_days': 'Expected a number of days'})
+            filters['deadline_before'] = timezone.now().date() + timedelta(days=days)
+        collaborative = params.get('is_collaborative')
+        if collaborative is not None:
+            filters['is_collaborative'] = collaborative.lower() in ('1', 'true', 'yes')
+        return filters
+
+    @staticmethod
+    def base_queryset():
+        """Projects still open for bids"""
+        return Project.objects.filter(status='pending', deadline__gte=timezone.now().date())
+
+    @staticmethod
+    def filter_conditions(filters):
+        """One Q per filter, keyed by name, so facets can leave their own filter out"""
+        conditions = {}
+        if filters['domain']:
+            conditions['domain'] = Q(domain_id__in=filters['domain'])
+        if filters['skills']:
+            # A skill matches when the project or any of its tasks requires it
+            project_skill = Project.skills_required.through.objects.filter(
+                project_id=OuterRef('pk'), skill_id__in=filters['skills']
+            )
+            task_skill = Task.skills_required_for_task.through.objects.filter(
+                task__project_id=OuterRef('pk'), skill_id__in=filters['skills']
+            )
+            conditions['skills'] = Q(Exists(project_skill)) | Q(Exists(task_skill))
+        budget = Q()
+        if filters['budget_min'] is not None:
+            budget &= Q(budget__gte=filters['budget_min'])
+        if filters['budget_max'] is not None:
+            budget &= Q(budget__lte=filters['budget_max'])
+        if budget:
+            conditions['budget'] = budget
+        deadline = Q()
+        if filters['deadline_after']:
+            deadline &= Q(deadline__gte=filters['deadline_after'])
+        if filters['deadline_before']:
+            deadline &= Q(deadline__lte=filters['deadline_before'])
+        if deadline:
+            conditions['deadline'] = deadline
+        if filters['complexity_level']:
+            conditions['complexity_level'] = Q(complexity_level__in=filters['complexity_level'])
+        if filters['is_collaborative'] is not None:
+            conditions['is_collaborative'] = Q(is_collaborative=filters['is_collaborative'])
+        return conditions
+
+    @staticmethod
+    def relevance_skills(user, filters):
+        """Skills to rank by: the requested ones, else the freelancer's own"""
+        if filters['skills']:
+            return filters['skills']
+        profile = getattr(user, 'freelancer_profile', None) if user.is_authenticated else None
+        if profile is None:
+            return []
+        return list(profile.skills.values_list('id', flat=True))
+
+    @staticmethod
+    def annotate_relevance(queryset, skill_ids):
+        """Number of distinct ranking skills required by the project or its tasks"""
+        if not skill_ids:
+            return queryset.annotate(relevance=Value(0, output_field=IntegerField()))
+        relevance = Value(0, output_field=IntegerField())
+        for skill_id in skill_ids[:MAX_RANKING_SKILLS]:
+            # Each skill counts once whether the project or one of its tasks needs it
+            needed = Q(Exists(Project.skills_required.through.objects.filter(
+                project_id=OuterRef('pk'), skill_id=skill_id
+            ))) | Q(Exists(Task.skills_required_for_task.through.objects.filter(
+                task__project_id=OuterRef('pk'), skill_id=skill_id
+            )))
+            relevance = relevance + Case(When(needed, then=1), default=0, output_field=IntegerField())
+        return queryset.annotate(relevance=relevance)
+
+    @staticmethod
+    def browse(user, params):
+        """Return (queryset, filters, ranked) with every filter applied and relevance annotated"""
+        filters = ProjectBrowseService.parse_filters(params)
+        queryset = ProjectBrowseService.base_queryset()
+        for condition in ProjectBrowseService.filter_conditions(filters).values():
+            queryset = queryset.filter(condition)
+        skill_ids = ProjectBrowseService.relevance_skills(user, filters)
+        return ProjectBrowseService.annotate_relevance(queryset, skill_ids), filters, bool(skill_ids)
+
+    @staticmethod
+    def facets(filters):
+        """Facet counts, each computed with every filter except its own"""
+        conditions = ProjectBrowseService.filter_conditions(filters)
+
+        def narrowed(excluded):
+            queryset = ProjectBrowseService.base_queryset()
+            for name, condition in conditions.items():
+                if name != excluded:
+                    queryset = queryset.filter(condition)
+            return queryset
+
+        domain_counts = dict(
+            narrowed('domain').order_by().values_list('domain_id').annotate(count=Count('id'))
+        )
+        domain_names = dict(Category.objects.filter(id__in=domain_counts).values_list('id', 'name'))
+
+        # Distinct projects needing the skill themselves or through a task, as the skill filter matches
+        needs_skill = Q(Exists(Project.skills_required.through.objects.filter(
+            project_id=OuterRef('pk'), skill_id=OuterRef(OuterRef('pk'))
+        ))) | Q(Exists(Task.skills_required_for_task.through.objects.filter(
+            task__project_id=OuterRef('pk'), skill_id=OuterRef(OuterRef('pk'))
+        )))
+        projects_per_skill = (
+            narrowed('skills').filter(needs_skill).order_by()
+            .values(grouped=Value(1)).annotate(count=Count('id')).values('count')
+        )
+        skill_counts = (
+            Skill.objects.annotate(count=Coalesce(Subquery(projects_per_skill), 0))
+            .filter(count__gt=0)
+            .order_by('-count', 'name')
+            .values('id', 'name', 'count')[:20]
+        )
+
+        complexity_counts = dict(
+            narrowed('complexity_level').order_by().values_list('complexity_level').annotate(count=Count('id'))
+        )
+        collaborative_counts = dict(
+            narrowed('is_collaborative').order_by().values_list('is_collaborative').annotate(count=Count('id'))
+        )
+
+        bucket_filters = {}
+        lower = None
+        for upper in BUDGET_BUCKETS + [None]:
+            label = f"{lower or 0}-{upper}" if upper is not None else f"{lower}+"
+            condition = Q()
+            if lower is not None:
+                condition &= Q(budget__gte=lower)
+            if upper is not None:
+                condition &= Q(budget__lt=upper)
+            bucket_filters[label] = Count('id', filter=condition)
+            lower = upper
+        budget_counts = narrowed('budget').aggregate(**bucket_filters)
+
+        return {
+            'domain': sorted(
+                [{'id': pk, 'name': domain_names.get(pk), 'count': count} for pk, count in domain_counts.items()],
+                key=lambda facet: (-facet['count'], facet['name'] or ''),
+            ),
+            'skills': [
+                {'id': row['id'], 'name': row['name'], 'count': row['count']} for row in skill_counts
+            ],
+            'complexity_level': [
+                {'value': level, 'count': complexity_counts.get(level, 0)} for level in COMPLEXITY_LEVELS
+            ],
+            'is_collaborative': [
+                {'value': value, 'count': collaborative_counts.get(value, 0)} for value in (True, False)
+            ],
+            'budget': [{'range': label, 'count': count} for label, count in budget_counts.items()],
+        }
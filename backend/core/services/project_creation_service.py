@@ -0,0 +1,246 @@
+"""
+Project posting in one transaction with a fixed number of statements.
+
+The whole payload is validated before anything is written.  The project
+row is saved normally (so search indexing and dashboard refreshes still
+run), while its tasks, milestones, skill links, deadline events and
+activities are each inserted with a single ``bulk_create``: none of the
+per-row ``Task.save`` bookkeeping applies to rows that are being created,
+and the payment strategy is worked out from the payload instead.  Skill
+matching is queued to Celery only once the transaction commits.
+"""
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from dateutil import parser
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+
+from client.models import Activity, Event
+from financeapp.models import Wallet
+from ..models import Category, Milestone, Project, Skill, Task
+
+MAX_TASKS = {'free': 2, 'gold': 3, 'platinum': 5}
+MILESTONE_TYPES = [milestone_type for milestone_type, _ in Milestone.MILESTONE_TYPE_CHOICES]
+PAYMENT_MILESTONE_TYPES = {'payment', 'hybrid'}
+
+
+def _decimal(value, message):
+    try:
+        return Decimal(str(value if value not in (None, '') else 0))
+    except InvalidOperation:
+        raise ValidationError(message)
+
+
+def _flag(value):
+    """Booleans from JSON, or the strings form and multipart posts send"""
+    return str(value).lower() in ('1', 'true', 'yes')
+
+
+def _deadline(value, message):
+    try:
+        deadline = parse_date(value) if isinstance(value, str) else None
+    except ValueError:
+        deadline = None
+    if not deadline:
+        raise ValidationError(message)
+    return deadline
+
+
+def _skill_ids(skills):
+    try:
+        return [int(skill['value'] if isinstance(skill, dict) else skill) for skill in skills or []]
+    except (KeyError, TypeError, ValueError):
+        raise ValidationError("Invalid skill")
+
+
+def _milestones(milestones_data):
+    milestones = []
+    for milestone_data in milestones_data or []:
+        try:
+            due_date = parser.parse(milestone_data['due_date']).date()
+        except (KeyError, ValueError, TypeError, OverflowError):
+            # Missing or unreadable due dates default to a week from now
+            due_date = timezone.localdate() + timedelta(weeks=1)
+        milestone_type = milestone_data.get('milestone_type', 'hybrid')
+        if milestone_type not in MILESTONE_TYPES:
+            raise ValidationError(f"Invalid milestone type '{milestone_type}'")
+        milestones.append({
+            'title': milestone_data.get('title', ''),
+            'amount': _decimal(milestone_data.get('amount', 0), "Invalid milestone amount"),
+            'due_date': due_date,
+            'milestone_type': milestone_type,
+            'is_automated': _flag(milestone_data.get('is_automated', True)),
+        })
+    return milestones
+
+
+class ProjectCreationService:
+    @staticmethod
+    def validate(client, data):
+        """The posting as plain values, or ValidationError before anything is written"""
+        tasks_data = data.get('tasks') or []
+        max_tasks = MAX_TASKS.get(client.membership, 0)
+        if len(tasks_data) > max_tasks:
+            raise ValidationError(f"Task limit exceeded. Max {max_tasks} tasks allowed.")
+
+        for field in ('title', 'description', 'budget', 'domain'):
+            if data.get(field) in (None, ''):
+                raise ValidationError(f"{field.capitalize()} is required")
+        deadline = _deadline(data.get('deadline'), "Invalid deadline format")
+        try:
+            domain = Category.objects.filter(id=int(data['domain'])).first()
+        except (TypeError, ValueError):
+            domain = None
+        if domain is None:
+            raise ValidationError("Invalid domain")
+
+        is_collaborative = _flag(data.get('is_collaborative', False))
+        tasks = []
+        if is_collaborative:
+            for task_data in tasks_data:
+                if not str(task_data.get('title') or '').strip():
+                    raise ValidationError("Task title cannot be empty for collaborative projects")
+                tasks.append({
+                    'title': task_data['title'],
+                    'description': task_data.get('description', ''),
+                    'deadline': (
+                        _deadline(task_data['deadline'], f"Invalid deadline for task '{task_data['title']}'")
+                        if task_data.get('deadline') else deadline
+                    ),
+                    'budget': _decimal(task_data.get('budget', 0), f"Invalid budget for task '{task_data['title']}'"),
+                    'is_automated_payment': _flag(task_data.get('automated_payment', False)),
+                    'milestones': _milestones(task_data.get('milestones')),
+                    'skill_ids': _skill_ids(task_data.get('skills_required_for_task')),
+                })
+
+        project_skill_ids = _skill_ids(data.get('skills_required'))
+        requested = {*project_skill_ids, *(skill_id for task in tasks for skill_id in task['skill_ids'])}
+        # Unknown skill ids are dropped, as skills_required.set() on a filtered queryset did
+        known = set(Skill.objects.filter(id__in=requested).values_list('id', flat=True)) if requested else set()
+
+        return {
+            'title': data['title'],
+            'description': data['description'],
+            'budget': _decimal(data['budget'], "Invalid budget"),
+            'deadline': deadline,
+            'domain': domain,
+            'is_collaborative': is_collaborative,
+            'milestones': _milestones(data.get('milestones')),
+            'skill_ids': [skill_id for skill_id in dict.fromkeys(project_skill_ids) if skill_id in known],
+            'tasks': [
+                {**task, 'skill_ids': [skill_id for skill_id in dict.fromkeys(task['skill_ids']) if skill_id in known]}
+                for task in tasks
+            ],
+            'total_auto_payment': _decimal(data.get('total_auto_payment', 0), "Invalid auto payment total"),
+        }
+
+    @staticmethod
+    def payment_strategy(posting):
+        if not posting['milestones'] and not posting['tasks']:
+            return 'automatic'
+        if any(m['milestone_type'] in PAYMENT_MILESTONE_TYPES for t in posting['tasks'] for m in t['milestones']):
+            return 'task_milestones'
+        if any(m['milestone_type'] in PAYMENT_MILESTONE_TYPES for m in posting['milestones']):
+            return 'project_milestones'
+        return 'lump_sum'
+
+    @staticmethod
+    def create(client, data):
+        """Validate and write the posting; returns the project"""
+        posting = ProjectCreationService.validate(client, data)
+
+        with transaction.atomic():
+            if posting['total_auto_payment'] > 0:
+                # hold() is one conditional UPDATE, so the wallet row is not locked up front
+                wallet = Wallet.objects.filter(user=client).first()
+                try:
+                    if wallet is None:
+                        raise ValueError("Insufficient funds")
+                    wallet.hold(posting['total_auto_payment'], f"Automated payments for {posting['title']}")
+                except ValueError:
+                    raise ValidationError("Insufficient wallet balance.")
+
+            project = Project.objects.create(
+                title=posting['title'],
+                description=posting['description'],
+                budget=posting['budget'],
+                deadline=posting['deadline'],
+                is_collaborative=posting['is_collaborative'],
+                domain=posting['domain'],
+                client=client,
+                status='pending',
+                payment_strategy=ProjectCreationService.payment_strategy(posting),
+            )
+            tasks = Task.objects.bulk_create([
+                Task(
+                    project=project, title=task['title'], description=task['description'],
+                    deadline=task['deadline'], budget=task['budget'],
+                    is_automated_payment=task['is_automated_payment'],
+                )
+                for task in posting['tasks']
+            ])
+
+            Milestone.objects.bulk_create([
+                *(Milestone(project=project, **milestone) for milestone in posting['milestones']),
+                *(
+                    Milestone(task=task, **milestone)
+                    for task, task_data in zip(tasks, posting['tasks']) for milestone in task_data['milestones']
+                ),
+            ])
+            Project.skills_required.through.objects.bulk_create([
+                Project.skills_required.through(project=project, skill_id=skill_id)
+                for skill_id in posting['skill_ids']
+            ])
+            Task.skills_required_for_task.through.objects.bulk_create([
+                Task.skills_required_for_task.through(task=task, skill_id=skill_id)
+                for task, task_data in zip(tasks, posting['tasks']) for skill_id in task_data['skill_ids']
+            ])
+
+            events = [
+                Event(user=client, title=f"{project.title} - Deadline", type='Deadline', start=project.deadline),
+                *(Event(user=client, title=f"{task.title} - Deadline", start=task.deadline) for task in tasks),
+            ]
+            for event in events:
+                # bulk_create skips Event.save
+                event.notify_at = event.compute_notify_at()
+            Event.objects.bulk_create(events)
+            Activity.objects.bulk_create([
+                Activity(
+                    user=client, activity_type='task_created', description=f'Created Task: {task.title}',
+                    related_model='task', related_object_id=task.id,
+                )
+                for task in tasks
+            ])
+
+            ProjectCreationService.schedule_skill_matches(project, posting, tasks)
+        return project
+
+    @staticmethod
+    def schedule_skill_matches(project, posting, tasks):
+        """Queue what the skills m2m_changed receivers would have; bulk inserts do not send them"""
+        from ..signals import enqueue_skill_match
+
+        # Projects with tasks are announced per task
+        if posting['skill_ids'] and not tasks:
+            enqueue_skill_match(project.id)
+        for task, task_data in zip(tasks, posting['tasks']):
+            if task_data['skill_ids']:
+                enqueue_skill_match(project.id, task.id)
+
+    @staticmethod
+    def for_response(project):
+        """The project with everything ProjectResponseSerializer and TaskResponseSerializer read prefetched"""
+        return (
+            Project.objects.select_related('domain', 'client')
+            .prefetch_related(
+                'skills_required', 'milestones',
+                Prefetch('tasks', queryset=Task.objects.prefetch_related(
+                    'skills_required_for_task', 'assigned_to', 'milestones'
+                )),
+            )
+            .get(pk=project.pk)
+        )
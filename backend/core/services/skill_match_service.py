@@ -0,0 +1,133 @@
+"""
+Skill matching between posted work and freelancers.
+
+Each worker keeps an inverted index from skill id to a sorted NumPy array
+of the freelancers who list that skill.  Matching a project concatenates
+the postings of its required skills and counts occurrences per freelancer
+in one vectorized pass, so the cost grows with the number of matching
+postings rather than with the number of freelancers.  The index is rebuilt
+lazily whenever the shared version key changes, and at least every
+INDEX_MAX_AGE seconds for caches that are not shared between processes.
+"""
+import threading
+import time
+
+import numpy as np
+from django.core.cache import cache
+
+VERSION_KEY = 'skillmatch:version'
+INDEX_MAX_AGE = 300
+
+
+def bump_index_version():
+    """Mark every worker's postings index as stale"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
+
+
+class SkillMatchIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = None
+        self._version = None
+        self._built_at = 0.0
+
+    def _build(self):
+        from Profile.models import FreelancerProfile
+
+        rows = np.array(
+            list(
+                FreelancerProfile.skills.through.objects
+                .filter(freelancerprofile__user__role='freelancer')
+                .values_list('skill_id', 'freelancerprofile__user_id')
+                .iterator(chunk_size=5000)
+            ),
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        if not len(rows):
+            return {}
+        rows = rows[np.lexsort((rows[:, 1], rows[:, 0]))]
+        skills, starts = np.unique(rows[:, 0], return_index=True)
+        ends = np.append(starts[1:], len(rows))
+        users = rows[:, 1]
+        return {int(skill): users[start:end] for skill, start, end in zip(skills, starts, ends)}
+
+    def _stale(self, version):
+        return (
+            self._postings is None
+            or version != self._version
+            or time.monotonic() - self._built_at > INDEX_MAX_AGE
+        )
+
+    def postings(self):
+        version = cache.get(VERSION_KEY)
+        if self._stale(version):
+            with self._lock:
+                if self._stale(version):
+                    self._postings = self._build()
+                    self._version = version
+                    self._built_at = time.monotonic()
+        return self._postings
+
+    def match(self, skill_ids):
+        """
+        Return (user_ids, percentages) for every freelancer sharing at least
+        one of ``skill_ids``; percentage is the share of the skills they have.
+        """
+        skill_ids = set(skill_ids)
+        empty = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        if not skill_ids:
+            return empty
+        postings = self.postings()
+        arrays = [postings[skill_id] for skill_id in skill_ids if skill_id in postings]
+        if not arrays:
+            return empty
+        user_ids, counts = np.unique(np.concatenate(arrays), return_counts=True)
+        return user_ids, counts * 100.0 / len(skill_ids)
+
+
+_index = SkillMatchIndex()
+
+
+class SkillMatchService:
+    @staticmethod
+    def match(skill_ids):
+        return _index.match(skill_ids)
+
+    @staticmethod
+    def build_notifications(project, task, skill_ids):
+        """Unsaved Notification objects for every matching freelancer not yet told about this work"""
+        from ..models import Notification
+
+        user_ids, percentages = SkillMatchService.match(skill_ids)
+        if not len(user_ids):
+            return []
+
+        if task:
+            title_part = f"A task titled <strong>{task.title}</strong>"
+        else:
+            title_part = f"The project titled <strong>{project.title}</strong>"
+        type = 'Tasks' if task else 'Projects'
+        related_model_id = task.id if task else project.id
+
+        # Retried tasks must not notify the same freelancer twice
+        already_notified = set(
+            Notification.objects.filter(type=type, related_model_id=related_model_id)
+            .values_list('user_id', flat=True)
+        )
+        return [
+            Notification(
+                user_id=int(user_id),
+                type=type,
+                related_model_id=related_model_id,
+                notification_text=(
+                    f"Exciting opportunity! {title_part} "
+                    f"is looking for skills you possess! "
+                    f"Your skill alignment with this {'task' if task else 'project'} is <strong>{percentage:.2f}%</strong>."
+                ),
+            )
+            for user_id, percentage in zip(user_ids.tolist(), percentages.tolist())
+            if user_id not in already_notified
+        ]
@@ -1,11 +1,14 @@
 # signals.py
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from .models import Connection, Notification,User,Project,Task,Payment
 from Profile.models import FreelancerProfile
 from django.utils.translation import gettext_lazy as _
 from django.db.models import Count
 from .serializers import UserSerializer
+from .services.notification_service import NotificationService
+from .services.skill_match_service import bump_index_version
+from django.db import transaction
 
 from django.urls import reverse
 
@@ -38,70 +41,46 @@ def create_connection_notification(sender, instance, created, **kwargs):
 
 
 from django.db.models.signals import m2m_changed
+import logging
+logger = logging.getLogger(__name__)
+
+
+def enqueue_skill_match(project_id, task_id=None):
+    """Match freelancers in a Celery worker once the posting commits; the request only enqueues"""
+    from .tasks import notify_skill_matches
+
+    def enqueue():
+        try:
+            notify_skill_matches.delay(project_id, task_id)
+        except Exception:
+            logger.exception("Could not enqueue skill matching for project %s task %s", project_id, task_id)
+
+    transaction.on_commit(enqueue)
+
+
 @receiver(m2m_changed, sender=Project.skills_required.through)
-def create_project_notification(sender, instance, action, **kwargs):
-    if action == "post_add":  # This triggers after skills are added
-        # Fetch all skills required for the project
-        project_skills = set(instance.skills_required.all())
-
-        if project_skills:
-            # Check if there are any tasks associated with this project
-            tasks = Task.objects.filter(project=instance)
-
-            # If there are tasks, send notifications based on task skills
-            if tasks.exists():
-                for task in tasks:
-                    task_skills = set(task.skills_required_for_task.all())
-                    send_skill_based_notifications(instance, task_skills, task)
-
-            # If there are no tasks, send notifications based on project skills
-            else:
-                send_skill_based_notifications(instance, project_skills, None)
-                
-def send_skill_based_notifications(project_instance, required_skills, task_instance):
-    # For each freelancer, check if their skills align with the project or task
-    freelancers = User.objects.filter(role='freelancer')
-
-    for freelancer in freelancers:
-        # Get or create freelancer profile
-        freelancer_profile, created = FreelancerProfile.objects.get_or_create(user=freelancer)
-
-        # Get the freelancer's skills
-        freelancer_skills = set(freelancer_profile.skills.all())
-
-        # Calculate the skill match percentage
-        skill_match = len(freelancer_skills.intersection(required_skills)) / len(required_skills) * 100 if required_skills else 0
-
-        # Prepare notification text - Convert gettext_lazy to string immediately
-        if skill_match > 0:
-            # Create the notification text parts separately and convert to string
-            if task_instance:
-                title_part = f"A task titled <strong>{task_instance.title}</strong>"
-            else:
-                title_part = f"The project titled <strong>{project_instance.title}</strong>"
-
-            notification_text = (
-                f"Exciting opportunity! {title_part} "
-                f"is looking for skills you possess! "
-                f"Your skill alignment with this {'task' if task_instance else 'project'} is <strong>{skill_match:.2f}%</strong>."
-            )
-
-            # Create the notification with the plain string
-            Notification.objects.create(
-                user=freelancer,
-                type='Projects' if not task_instance else 'Tasks',
-                related_model_id=project_instance.id if not task_instance else task_instance.id,
-                notification_text=notification_text
-            )
+def create_project_notification(sender, instance, action, reverse, **kwargs):
+    if action == "post_add" and not reverse:  # This triggers after skills are added
+        # Projects with tasks are announced per task when the task skills are set
+        if not instance.tasks.exists():
+            enqueue_skill_match(instance.id)
+
 
 @receiver(m2m_changed, sender=Task.skills_required_for_task.through)
-def create_task_notification(sender, instance, action, **kwargs):
-    if action == "post_add":
-        # For each freelancer, check if their skills align with the task
-        task_skills = set(instance.skills_required_for_task.all())
-        
-        # Send notifications based on task skills
-        send_skill_based_notifications(instance.project, task_skills, instance)
+def create_task_notification(sender, instance, action, reverse, **kwargs):
+    if action == "post_add" and not reverse:
+        enqueue_skill_match(instance.project_id, instance.id)
+
+
+@receiver(m2m_changed, sender=FreelancerProfile.skills.through)
+def refresh_skill_match_index(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(bump_index_version)
+
+
+@receiver(post_delete, sender=FreelancerProfile)
+def drop_from_skill_match_index(sender, instance, **kwargs):
+    transaction.on_commit(bump_index_version)
 
 
 @receiver(post_save, sender=Payment)
@@ -248,3 +227,78 @@ def create_payment_notification(sender, instance, created, **kwargs):
                 notification_text=notification_text
             )
 
+
+
+# Search index maintenance
+from django.db import transaction
+from django.db.models.signals import post_delete
+from .models import Category, Skill
+from . import search
+from .search.typeahead import record_change
+from .search.cache import bump_version
+
+SEARCHABLE_USER_FIELDS = {'username', 'role'}
+
+
+def bump_search_versions(*kinds):
+    # Bump after commit so a concurrent search cannot cache pre-commit rows under the new version
+    transaction.on_commit(lambda: bump_version(*kinds))
+
+
+@receiver(post_save, sender=User)
+def index_user(sender, instance, update_fields=None, **kwargs):
+    # Logins save only last_login; skip writes that cannot change the document
+    if update_fields is not None and not SEARCHABLE_USER_FIELDS.intersection(update_fields):
+        return
+    search.index_objects(search.USER, User.objects.filter(pk=instance.pk))
+    record_change(search.USER, instance.pk)
+    bump_search_versions(search.USER)
+
+
+@receiver(post_save, sender=Project)
+def index_project(sender, instance, **kwargs):
+    search.index_objects(search.PROJECT, Project.objects.filter(pk=instance.pk))
+    record_change(search.PROJECT, instance.pk)
+    bump_search_versions(search.PROJECT)
+
+
+@receiver(m2m_changed, sender=Project.assigned_to.through)
+def track_project_assignees(sender, instance, action, reverse, pk_set, **kwargs):
+    # Typeahead scopes projects by assignee, so membership changes are feed events
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        record_change(search.PROJECT, instance.pk)
+    else:
+        for project_id in pk_set or ():
+            record_change(search.PROJECT, project_id)
+
+
+@receiver(post_save, sender=Category)
+def index_category(sender, instance, created, **kwargs):
+    search.index_objects(search.CATEGORY, Category.objects.filter(pk=instance.pk))
+    record_change(search.CATEGORY, instance.pk)
+    if created:
+        bump_search_versions(search.CATEGORY)
+    else:
+        bump_search_versions(search.CATEGORY, search.PROJECT, search.SKILL)
+        # Project and skill documents embed the category name
+        search.index_objects(search.PROJECT, Project.objects.filter(domain=instance))
+        search.index_objects(search.SKILL, Skill.objects.filter(category=instance))
+
+
+@receiver(post_save, sender=Skill)
+def index_skill(sender, instance, **kwargs):
+    search.index_objects(search.SKILL, Skill.objects.filter(pk=instance.pk))
+    bump_search_versions(search.SKILL)
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Skill)
+def remove_from_search_index(sender, instance, **kwargs):
+    kind = {User: search.USER, Project: search.PROJECT, Category: search.CATEGORY, Skill: search.SKILL}[sender]
+    search.remove_objects(kind, [instance.pk])
+    record_change(kind, instance.pk, op='delete')
+    bump_search_versions(kind)
@@ -0,0 +1,44 @@
+from celery import shared_task
+from datetime import timedelta
+from django.utils import timezone
+from .models import SearchIndexChange, Project, Task
+from .services.notification_counter_service import NotificationCounterService
+from .services.notification_service import NotificationService
+from .services.skill_match_service import SkillMatchService
+
+
+@shared_task
+def prune_search_index_changes(days=1):
+    """
+    Delete typeahead change-feed rows every worker has long since replayed.
+    """
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = SearchIndexChange.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
+
+
+@shared_task
+def reconcile_notification_counters():
+    """
+    Repair unread counters that drifted from the notifications table,
+    e.g. after bulk updates that bypass model signals.
+    """
+    return NotificationCounterService.reconcile()
+
+
+@shared_task
+def notify_skill_matches(project_id, task_id=None):
+    """
+    Notify every freelancer whose skills overlap the project's (or task's)
+    required skills, in one bulk insert and one channel-layer fan-out.
+    """
+    task = Task.objects.select_related('project').filter(id=task_id).first() if task_id else None
+    project = task.project if task else Project.objects.filter(id=project_id).first()
+    if project is None or (task_id and task is None):
+        return 0
+
+    required = task.skills_required_for_task if task else project.skills_required
+    skill_ids = list(required.values_list('id', flat=True))
+    notifications = SkillMatchService.build_notifications(project, task, skill_ids)
+    NotificationService.bulk_send(notifications)
+    return len(notifications)
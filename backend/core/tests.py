@@ -1,3 +1,513 @@
-from django.test import TestCase
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from io import StringIO
+
+import fakeredis
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from client.models import Activity, Event
+from financeapp.models import Wallet
+from Profile.models import FreelancerProfile
+from .models import (
+    CacheVersion, Category, Milestone, Notification, NotificationCounter, Project, SearchIndexChange, Skill, Task, User,
+)
+from . import search
+from .search import cache as search_cache
+from .search.backends import InMemorySearchBackend, SQLiteFTS5Backend
+from .search import typeahead
+from .search.typeahead import TypeaheadIndex
+from .services import notification_counter_service, notification_service
+from .services.notification_counter_service import NotificationCounterService
+from .services.notification_service import NotificationService
+from .services.skill_match_service import SkillMatchService, bump_index_version
+from .tasks import notify_skill_matches, prune_search_index_changes
+
+
+# In-memory channel layer and no Redis mirror for the unread counters, so the
+# tests never touch whatever Redis happens to listen on localhost
+hermetic_settings = override_settings(
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    NOTIFICATION_COUNTER_REDIS_URL=None,
+)
+
+
+@hermetic_settings
+class CreateProjectViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user(username='client', password='pass', role='client', membership='gold')
+        cls.domain = Category.objects.create(name='Web')
+        cls.skills = [Skill.objects.create(name=name, category=cls.domain).id for name in ('Django', 'React')]
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.client_user)
+        self.url = reverse('post_project')
+
+    def payload(self, **overrides):
+        deadline = (timezone.localdate() + timezone.timedelta(days=30)).isoformat()
+        return {
+            'title': 'Shop', 'description': '-', 'budget': 1000, 'domain': self.domain.id, 'deadline': deadline,
+            'is_collaborative': True, 'skills_required': self.skills,
+            'milestones': [{'title': 'Kickoff', 'milestone_type': 'progress', 'amount': 0}],
+            'tasks': [
+                {
+                    'title': f'Task {index}', 'description': '-', 'budget': 400,
+                    'skills_required_for_task': [{'value': self.skills[index]}],
+                    'milestones': [{'title': 'Done', 'milestone_type': 'payment', 'amount': 400, 'due_date': deadline}],
+                }
+                for index in range(2)
+            ],
+            **overrides,
+        }
+
+    def post(self, payload):
+        with mock.patch('core.tasks.notify_skill_matches.delay') as delay, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.api.post(self.url, payload, format='json')
+        return response, delay
+
+    def test_creates_the_whole_posting(self):
+        response, delay = self.post(self.payload())
+
+        self.assertEqual(response.status_code, 201)
+        project = Project.objects.get()
+        self.assertEqual(project.payment_strategy, 'task_milestones')
+        self.assertEqual(Task.objects.filter(project=project).count(), 2)
+        self.assertEqual(Milestone.objects.count(), 3)
+        self.assertEqual(set(project.skills_required.values_list('id', flat=True)), set(self.skills))
+        self.assertEqual(Event.objects.filter(user=self.client_user).exclude(notify_at=None).count(), 3)
+        self.assertEqual(Activity.objects.filter(activity_type='task_created').count(), 2)
+        self.assertEqual(len(response.data['tasks']), 2)
+        # One skill match per task; the project itself is announced through its tasks
+        self.assertEqual(sorted(call.args[1] for call in delay.call_args_list), sorted(t['id'] for t in response.data['tasks']))
+
+    def test_form_style_false_is_not_collaborative(self):
+        response, delay = self.post(self.payload(is_collaborative='false'))
+
+        self.assertEqual(response.status_code, 201)
+        project = Project.objects.get()
+        self.assertFalse(project.is_collaborative)
+        self.assertFalse(Task.objects.filter(project=project).exists())
+        delay.assert_called_once_with(project.id, None)
+
+    def test_invalid_task_writes_nothing(self):
+        wallet = Wallet.objects.create(user=self.client_user)
+        wallet.deposit(500)
+        payload = self.payload(total_auto_payment=300)
+        payload['tasks'][1]['deadline'] = 'next week'
+
+        response, delay = self.post(payload)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Project.objects.exists())
+        wallet.refresh_from_db()
+        self.assertEqual((wallet.balance, wallet.hold_balance), (Decimal('500'), Decimal('0')))
+        delay.assert_not_called()
+
+    def test_insufficient_balance_is_rejected(self):
+        Wallet.objects.create(user=self.client_user).deposit(100)
+        response, _ = self.post(self.payload(total_auto_payment=300))
+        self.assertEqual(response.data['message'], 'Insufficient wallet balance.')
+        self.assertFalse(Project.objects.exists())
+
+
+@hermetic_settings
+class SearchResultCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.domain = Category.objects.create(name='Web')
+        Skill.objects.create(name='Django', category=cls.domain)
+
+    def setUp(self):
+        cache.clear()
+        search_cache.reset_metrics()
+        self.api = APIClient()
+
+    def skill_names(self):
+        return [skill['name'] for skill in self.api.get(reverse('search'), {'query': 'django'}).data['skills']['results']]
+
+    def test_repeated_search_is_a_hit_until_an_entity_changes(self):
+        self.assertEqual(self.skill_names(), ['Django'])
+        with mock.patch('core.views._search_results') as compute:
+            self.assertEqual(self.skill_names(), ['Django'])
+        compute.assert_not_called()
+        self.assertEqual((search_cache.get_metrics()['hits'], search_cache.get_metrics()['misses']), (1, 1))
+
+        with mock.patch('core.tasks.notify_skill_matches.delay'), self.captureOnCommitCallbacks(execute=True):
+            Skill.objects.create(name='Django REST', category=self.domain)
+        self.assertEqual(sorted(self.skill_names()), ['Django', 'Django REST'])
+
+    def test_versions_are_shared_through_the_database(self):
+        key = search_cache.result_key('django', 'anonymous', 1, 10)
+        self.assertEqual(search_cache.result_key('django', 'anonymous', 1, 10), key)
+        # Another process bumping the version only touches the row, never this process's cache
+        CacheVersion.objects.filter(scope='search:skill').update(version=F('version') + 1)
+        self.assertNotEqual(search_cache.result_key('django', 'anonymous', 1, 10), key)
+
+
+@hermetic_settings
+class ProjectBrowseTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user(username='client', password='pass', role='client')
+        cls.domain = Category.objects.create(name='Web')
+        cls.django = Skill.objects.create(name='Django', category=cls.domain)
+        cls.react = Skill.objects.create(name='React', category=cls.domain)
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.client_user)
+        self.url = reverse('project_browse')
+
+    def add_project(self, title, project_skills=(), task_skills=()):
+        with mock.patch('core.tasks.notify_skill_matches.delay'):
+            project = Project.objects.create(
+                title=title, description='-', budget=1000, client=self.client_user, domain=self.domain,
+                status='pending', deadline=timezone.localdate() + timezone.timedelta(days=30),
+            )
+            project.skills_required.add(*project_skills)
+            for skill in task_skills:
+                task = Task.objects.create(
+                    project=project, title=f'{title} task', description='-', budget=100,
+                    deadline=timezone.localdate() + timezone.timedelta(days=10),
+                )
+                task.skills_required_for_task.add(skill)
+        return project
+
+    def test_skill_facet_counts_what_the_skill_filter_returns(self):
+        self.add_project('Project skill', project_skills=[self.django])
+        self.add_project('Task skill', task_skills=[self.django])
+        self.add_project('Both', project_skills=[self.django, self.react], task_skills=[self.django, self.django])
+
+        facets = {facet['name']: facet['count'] for facet in self.api.get(self.url).data['facets']['skills']}
+        self.assertEqual(facets, {'Django': 3, 'React': 1})
+        for skill, count in ((self.django, 3), (self.react, 1)):
+            self.assertEqual(len(self.api.get(self.url, {'skills': skill.id}).data['results']), count)
+
+    def test_cursor_keeps_microseconds_across_page_boundaries(self):
+        base = timezone.now().replace(microsecond=123000)
+        for index in range(5):
+            project = self.add_project(f'Project {index}')
+            # All inside one millisecond, which a millisecond cursor would collapse
+            Project.objects.filter(pk=project.pk).update(created_at=base + timezone.timedelta(microseconds=index))
+
+        seen, url = [], self.url + '?page_size=2'
+        while url:
+            response = self.api.get(url)
+            seen += [project['title'] for project in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(seen, [f'Project {index}' for index in range(4, -1, -1)])
+
+
+@hermetic_settings
+class SearchIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user(username='client', password='pass', role='client')
+        cls.domain = Category.objects.create(name='Web')
+        with mock.patch('core.tasks.notify_skill_matches.delay'):
+            cls.in_body = cls.add_project('Online store', 'Built with Django and React')
+            cls.in_title = cls.add_project('Django shop', 'Payments and carts')
+            cls.other = cls.add_project('Mobile app', 'Flutter')
+
+    @classmethod
+    def add_project(cls, title, description):
+        return Project.objects.create(
+            title=title, description=description, budget=1000, client=cls.client_user, domain=cls.domain,
+            deadline=timezone.localdate() + timezone.timedelta(days=30),
+        )
+
+    def test_saved_objects_are_found_through_fts5(self):
+        self.assertIsInstance(search.get_search_backend(), SQLiteFTS5Backend)
+        # Prefix match, with title hits ranked above body hits
+        self.assertEqual(search.search_ids('djan', search.PROJECT), [self.in_title.id, self.in_body.id])
+        self.assertEqual(search.count('django', search.PROJECT), 2)
+        self.assertEqual(search.search_ids('django', search.PROJECT, within=[self.in_body.id]), [self.in_body.id])
+        self.assertEqual(search.search_ids('web', search.CATEGORY), [self.domain.id])
+
+        with mock.patch('core.tasks.notify_skill_matches.delay'):
+            self.other.title = 'Django mobile app'
+            self.other.save()
+        self.assertEqual(search.count('django', search.PROJECT), 3)
+
+    def test_rebuild_command_restores_the_index(self):
+        search.get_search_backend().clear()
+        self.assertEqual(search.search_ids('django', search.PROJECT), [])
+
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('SQLiteFTS5Backend', out.getvalue())
+        self.assertEqual(search.search_ids('django', search.PROJECT), [self.in_title.id, self.in_body.id])
+
+    def test_in_memory_fallback_ranks_like_fts5(self):
+        backend = InMemorySearchBackend()
+        backend.rebuild()
+        self.assertEqual(backend.search('djan', search.PROJECT), [self.in_title.id, self.in_body.id])
+        self.assertEqual(backend.count('flutter', search.PROJECT), 1)
+
+
+@hermetic_settings
+class TypeaheadIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user(username='dana', password='pass', role='client')
+        cls.other_client = User.objects.create_user(username='dave', password='pass', role='client')
+        cls.domain = Category.objects.create(name='Data science')
+        with mock.patch('core.tasks.notify_skill_matches.delay'):
+            cls.project = Project.objects.create(
+                title='Dashboard redesign', description='-', budget=1000, client=cls.client_user, domain=cls.domain,
+                deadline=timezone.localdate() + timezone.timedelta(days=30),
+            )
+
+    def labels(self, results):
+        return {kind: [entry.label for entry in entries] for kind, entries in results.items()}
+
+    def test_prefix_lookup_is_served_from_memory(self):
+        index = TypeaheadIndex()
+        index.sync()
+        with self.assertNumQueries(0):
+            results = index.lookup('da', self.client_user)
+        self.assertEqual(self.labels(results), {
+            'user': ['dana', 'dave'], 'project': ['Dashboard redesign'], 'category': ['Data science'],
+        })
+        # Projects are scoped like the full search: other clients do not see them
+        self.assertEqual(index.lookup('dash', self.other_client)['project'], [])
+        self.assertEqual(self.labels(index.lookup('data sci', self.client_user))['category'], ['Data science'])
+
+    def test_change_feed_replays_renames_and_deletes(self):
+        index = TypeaheadIndex()
+        index.sync()
+        self.domain.name = 'Machine learning'
+        self.domain.save()
+        User.objects.filter(pk=self.other_client.pk).delete()
+
+        index.sync(force=True)
+        results = index.lookup('da', self.client_user)
+        self.assertEqual(self.labels(results)['category'], [])
+        self.assertEqual(self.labels(results)['user'], ['dana'])
+        self.assertEqual(self.labels(index.lookup('mach', self.client_user))['category'], ['Machine learning'])
+
+    def test_failed_background_sync_is_logged(self):
+        index = mock.Mock(sync=mock.Mock(side_effect=RuntimeError('database is locked')))
+        with mock.patch.object(typeahead.time, 'sleep', side_effect=KeyboardInterrupt), \
+                self.assertLogs('core.search.typeahead', 'ERROR') as logs, \
+                self.assertRaises(KeyboardInterrupt):
+            typeahead._poll_forever(index)
+        self.assertIn('database is locked', logs.output[0])
+
+    def test_prune_drops_only_old_changes(self):
+        self.domain.save()
+        old = SearchIndexChange.objects.update(created_at=timezone.now() - timezone.timedelta(days=2))
+        Category.objects.create(name='Design')
+        self.assertEqual(prune_search_index_changes(), old)
+        self.assertEqual(list(SearchIndexChange.objects.values_list('kind', flat=True)), ['category'])
+
+
+@hermetic_settings
+class NotificationCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(username=f'user{i}', password='pass', role='client') for i in range(3)]
+        Notification.objects.all().delete()
+        NotificationCounter.objects.all().delete()
+
+    def notify(self, user, type='System', **kwargs):
+        return Notification.objects.create(
+            user=user, type=type, related_model_id=1, notification_text='-', **kwargs
+        )
+
+    def counts(self):
+        return NotificationCounterService.get_counts_many([user.id for user in self.users])
+
+    def test_saves_and_deletes_move_counters_by_their_delta(self):
+        user = self.users[0]
+        first, second = self.notify(user), self.notify(user, type='Payments')
+        self.notify(user, is_read=True)
+        self.assertEqual(NotificationCounterService.get_counts(user.id), {'System': 1, 'Payments': 1})
+
+        first.is_read = True
+        first.save()
+        # Saving again without a change must not count the read twice
+        first.save()
+        second.type = 'System'
+        second.save()
+        self.assertEqual(NotificationCounterService.get_counts(user.id), {'System': 1})
+
+        second.delete()
+        self.assertEqual(NotificationCounterService.get_total(user.id), 0)
+
+    def test_grouped_deltas_update_every_user(self):
+        NotificationCounterService.apply_deltas({
+            (self.users[0].id, 'System'): 2, (self.users[1].id, 'System'): 2, (self.users[2].id, 'Events'): 1,
+        })
+        NotificationCounterService.apply_deltas({(self.users[0].id, 'System'): -1, (self.users[1].id, 'System'): -5})
+        self.assertEqual(self.counts(), {
+            self.users[0].id: {'System': 1}, self.users[1].id: {}, self.users[2].id: {'Events': 1},
+        })
+
+    def test_reconcile_repairs_writes_that_bypass_the_model(self):
+        for user in self.users[:2]:
+            self.notify(user)
+            self.notify(user, type='Events')
+        Notification.objects.filter(user=self.users[0], type='System').update(is_read=True)
+        Notification.objects.filter(user=self.users[1], type='Events').update(type='Payments')
+        NotificationCounter.objects.filter(user=self.users[2]).delete()
+        self.notify(self.users[2])
+        NotificationCounter.objects.filter(user=self.users[2]).delete()
+
+        self.assertEqual(NotificationCounterService.reconcile(), 4)
+        self.assertEqual(self.counts(), {
+            self.users[0].id: {'Events': 1},
+            self.users[1].id: {'System': 1, 'Payments': 1},
+            self.users[2].id: {'System': 1},
+        })
+        self.assertEqual(NotificationCounterService.reconcile(), 0)
+
+
+@override_settings(
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    NOTIFICATION_COUNTER_REDIS_URL='redis://mirror',
+)
+class NotificationCounterMirrorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='user', password='pass', role='client')
+
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis(decode_responses=True)
+        for name, value in (('_redis_client', self.redis), ('_redis_down_until', 0.0)):
+            patcher = mock.patch.object(notification_counter_service, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def notify(self, type='System'):
+        with self.captureOnCommitCallbacks(execute=True):
+            Notification.objects.create(user=self.user, type=type, related_model_id=1, notification_text='-')
+
+    def test_reads_come_from_the_hash_refreshed_after_commit(self):
+        self.notify()
+        self.notify('Events')
+        with self.assertNumQueries(0):
+            self.assertEqual(NotificationCounterService.get_counts(self.user.id), {'System': 1, 'Events': 1})
+
+    def test_older_snapshots_never_replace_newer_ones(self):
+        self.notify()
+        stale = NotificationCounterService._load_snapshots([self.user.id])
+        self.notify()
+        NotificationCounterService._store_snapshots(self.redis, stale)
+        self.assertEqual(NotificationCounterService.get_counts(self.user.id), {'System': 2})
+
+    def test_deleted_counter_rows_do_not_pin_the_old_hash(self):
+        self.notify()
+        self.notify()
+        NotificationCounter.objects.filter(user=self.user).delete()
+        self.notify()
+        # The rows restart from one; the hash follows them rather than keeping two
+        self.assertEqual(NotificationCounterService.get_counts(self.user.id), {'System': 1})
+        NotificationCounterService.reconcile()
+        self.assertEqual(NotificationCounterService.get_counts(self.user.id), {'System': 3})
+
+
+@hermetic_settings
+class BulkSendTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(username=f'user{i}', password='pass', role='client') for i in range(2)]
+        Notification.objects.all().delete()
+        NotificationCounter.objects.all().delete()
+
+    def test_bulk_send_counts_then_pushes_each_message_once_after_commit(self):
+        notifications = [
+            Notification(user=user, type=type, related_model_id=i, notification_text=f'{user.username} {i}')
+            for i, (user, type) in enumerate([
+                (self.users[0], 'System'), (self.users[0], 'System'), (self.users[0], 'Events'),
+                (self.users[1], 'System'), (self.users[1], 'Events'),
+            ])
+        ]
+        layer = mock.Mock(group_send=mock.AsyncMock())
+        with mock.patch.object(notification_service, 'get_channel_layer', return_value=layer), \
+                mock.patch('client.signals.get_channel_layer') as per_row_layer:
+            with self.captureOnCommitCallbacks() as callbacks:
+                created = NotificationService.bulk_send(notifications, chunk_size=2, fanout_batch_size=3)
+            # Nothing leaves the process before the rows commit
+            layer.group_send.assert_not_called()
+            for callback in callbacks:
+                callback()
+
+        self.assertEqual(len(created), 5)
+        self.assertTrue(all(notification.pk for notification in created))
+        self.assertEqual(NotificationCounterService.get_counts(self.users[0].id), {'System': 2, 'Events': 1})
+        self.assertEqual(NotificationCounterService.get_counts(self.users[1].id), {'System': 1, 'Events': 1})
+        per_row_layer.assert_not_called()
+
+        sent = [call.args for call in layer.group_send.await_args_list]
+        pushed = [message['notification']['id'] for group, message in sent if message['type'] == 'send_notification']
+        self.assertEqual(sorted(pushed), sorted(notification.pk for notification in created))
+        badges = {
+            group: message['notifications_count']
+            for group, message in sent if message['type'] == 'send_notification_count'
+        }
+        self.assertEqual(badges, {f'user_{self.users[0].id}': 3, f'user_{self.users[1].id}': 2})
+
+
+@hermetic_settings
+class SkillMatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user(username='client', password='pass', role='client')
+        domain = Category.objects.create(name='Web')
+        cls.django, cls.react, cls.go = (
+            Skill.objects.create(name=name, category=domain) for name in ('Django', 'React', 'Go')
+        )
+        cls.both, cls.one, cls.none = (
+            User.objects.create_user(username=name, password='pass', role='freelancer')
+            for name in ('both', 'one', 'none')
+        )
+        FreelancerProfile.objects.create(user=cls.both).skills.set([cls.django, cls.react])
+        FreelancerProfile.objects.create(user=cls.one).skills.set([cls.react, cls.go])
+        FreelancerProfile.objects.create(user=cls.none).skills.set([cls.go])
+        with mock.patch('core.tasks.notify_skill_matches.delay'):
+            cls.project = Project.objects.create(
+                title='Shop', description='-', budget=1000, client=cls.client_user, domain=domain,
+                deadline=timezone.localdate() + timezone.timedelta(days=30),
+            )
+            cls.project.skills_required.set([cls.django, cls.react])
+
+    def setUp(self):
+        bump_index_version()
+
+    def test_match_scores_the_share_of_required_skills(self):
+        user_ids, percentages = SkillMatchService.match([self.django.id, self.react.id])
+        self.assertEqual(dict(zip(user_ids.tolist(), percentages.tolist())), {self.both.id: 100.0, self.one.id: 50.0})
+        with self.assertNumQueries(0):
+            SkillMatchService.match([self.go.id])
+
+    def test_skill_changes_rebuild_the_index_after_commit(self):
+        SkillMatchService.match([self.django.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.none.freelancer_profile.skills.add(self.django)
+        user_ids, _ = SkillMatchService.match([self.django.id])
+        self.assertEqual(sorted(user_ids.tolist()), sorted([self.both.id, self.none.id]))
+
+    def test_posting_enqueues_and_rerun_notifies_nobody_twice(self):
+        with mock.patch('core.tasks.notify_skill_matches.delay') as delay, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.project.skills_required.add(self.go)
+        delay.assert_called_once_with(self.project.id, None)
+
+        with mock.patch.object(NotificationService, 'fan_out'):
+            self.assertEqual(notify_skill_matches(self.project.id), 3)
+            self.assertEqual(notify_skill_matches(self.project.id), 0)
+        notified = Notification.objects.filter(type='Projects', related_model_id=self.project.id)
+        self.assertEqual(
+            sorted(notified.values_list('user_id', flat=True)), sorted([self.both.id, self.one.id, self.none.id])
+        )
+        self.assertIn('66.67%', notified.get(user=self.both).notification_text)
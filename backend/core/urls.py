@@ -16,11 +16,13 @@ urlpatterns = [
 
     # Projects
     path('post_project/', CreateProjectView.as_view(), name='post_project'),
+    path('projects/browse/', ProjectBrowseView.as_view(), name='project_browse'),
     path('categories/', CategoryListView.as_view(), name='categories-list'),
     path('skills/<int:category_id>/', SkillsByCategoryView.as_view(), name='skills-by-category'),
 
     #Connections 
     path('search/', search_partial, name='search'),
+    path('search/cache-stats/', search_cache_stats, name='search_cache_stats'),
 
 
     # Notifications
@@ -7,7 +7,7 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
 from rest_framework import status, views, permissions
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser
 from .models import *
 from django.middleware.csrf import get_token
 from datetime import timedelta
@@ -39,6 +39,14 @@ from rest_framework import serializers
 from .serializers import ProjectResponseSerializer, TaskResponseSerializer
 import traceback
 from django.utils.dateparse import parse_date
+from rest_framework.utils.urls import replace_query_param
+from . import search
+from .search import cache as search_cache
+from Profile.services.user_card_service import UserCardService
+from .pagination import KeysetPaginator
+from .services.project_browse_service import ProjectBrowseService
+from .services.notification_service import NotificationService
+from .services.project_creation_service import ProjectCreationService
 
 # Create your views here.
 class CustomTokenObtainPairView(TokenObtainPairView):
@@ -239,198 +247,22 @@ class LogoutView(APIView):
         return Response({"message": "Logout successful!"}, status=status.HTTP_200_OK)
 
 
-from financeapp.models import Wallet
-
 class CreateProjectView(APIView):
     permission_classes = [IsAuthenticated]
-    
-    def post(self, request):
-        print("CreateProjectView.post() called")
-        client = request.user
-        
-        tasks_data = request.data.get('tasks', [])
-        project_milestones_data = request.data.get('milestones', [])
-        total_auto_payment = request.data.get('total_auto_payment', 0)
-        print(total_auto_payment)
-        if total_auto_payment > 0:
-            wallet_balance = Wallet.objects.get(user=client).balance
-            if wallet_balance < total_auto_payment:
-                return Response({"message": "Insufficient wallet balance."}, 
-                              status=status.HTTP_400_BAD_REQUEST)
-            else:
-                wallet = Wallet.objects.get(user=client)
-                
-                wallet.hold_balance += total_auto_payment
-                wallet.save()
-        
-        # Validate membership limits
-        max_tasks = {'free': 2, 'gold': 3, 'platinum': 5}.get(client.membership, 0)
-        if len(tasks_data) > max_tasks:
-            return Response({"message": f"Task limit exceeded. Max {max_tasks} tasks allowed."}, 
-                          status=status.HTTP_400_BAD_REQUEST)
 
-        # Create Project with error handling
+    def post(self, request):
         try:
-            # Parse the deadline string to a proper date object
-            deadline_str = request.data.get('deadline')
-            deadline = parse_date(deadline_str)
-            if not deadline:
-                return Response({"message": "Invalid deadline format"}, status=status.HTTP_400_BAD_REQUEST)
-            
-            is_collaborative = request.data.get('is_collaborative', False)
-            
-            # Validate task titles if collaborative
-            if is_collaborative:
-                for task_data in tasks_data:
-                    if not task_data.get('title', '').strip():
-                        return Response({"message": "Task title cannot be empty for collaborative projects"}, 
-                                      status=status.HTTP_400_BAD_REQUEST)
-            
-            # Create the project with proper date object
-            project = Project.objects.create(
-                title=request.data['title'],
-                description=request.data['description'],
-                budget=request.data['budget'],
-                
-                deadline=deadline,
-                is_collaborative=is_collaborative,
-                domain=Category.objects.get(id=request.data['domain']),
-                client=client,
-                status='pending'
-            )
-            
-            # Handle Project Milestones
-            if project_milestones_data:
-                self.create_milestones(project, None, project_milestones_data)
-                project.update_payment_strategy()
-
-            # Handle Tasks only if collaborative
-            task_instances = []
-            if is_collaborative:
-                for task_data in tasks_data:
-                    # Parse task deadline
-                    task_deadline_str = task_data.get('deadline')
-                    task_deadline = parse_date(task_deadline_str) if task_deadline_str else deadline
-                    print(task_data.get('automated_payment', False))
-                    task = Task.objects.create(
-                        title=task_data.get('title', ''),
-                        description=task_data.get('description', ''),
-                        deadline=task_deadline,
-                        is_automated_payment=task_data.get('automated_payment', False),
-                        project=project,
-                        budget=task_data.get('budget', 0)
-                    )
-                    
-                    # Handle Task Milestones
-                    task_milestones_data = task_data.get('milestones', [])
-                    if task_milestones_data:
-                        self.create_milestones(None, task, task_milestones_data)
-                    
-                    task_instances.append(task)
-
-            # Set skills and create events
-            self.handle_skills_and_events(project, tasks_data, task_instances, client)
-            
-            # Use the dedicated response serializers
-            try:
-                print("Serializing project response...")
-                print(f"Project data before serialization: {project.__dict__}")
-                project_data = ProjectResponseSerializer(project).data
-                print("Project serialization successful!")
-                
-                # Refresh all task instances before serialization
-                task_instances = Task.objects.filter(project=project)
-                print(f"Found {task_instances.count()} tasks for serialization")
-                print(f"First task data: {task_instances.first().__dict__ if task_instances.exists() else None}")
-                
-                tasks_data = TaskResponseSerializer(task_instances, many=True).data
-                print("Task serialization successful!")
-                
-                return Response({
-                    "message": "Project created successfully",
-                    "project": project_data,
-                    "tasks": tasks_data
-                }, status=status.HTTP_201_CREATED)
-                
-            except Exception as serialize_error:
-                print(f"Serialization error: {str(serialize_error)}")
-                print(traceback.format_exc())
-                # Fall back to basic response if serialization fails
-                return Response({
-                    "message": "Project created successfully, but error in response formatting",
-                    "project_id": project.id,
-                    "project_title": project.title
-                }, status=status.HTTP_201_CREATED)
+            project = ProjectCreationService.create(request.user, request.data)
+        except serializers.ValidationError as e:
+            return Response({"message": str(e.detail[0])}, status=status.HTTP_400_BAD_REQUEST)
 
-        except Exception as e:
-            print(f"Project creation error: {str(e)}")
-            print(traceback.format_exc())
-            return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
-
-    def create_milestones(self, project, task, milestones_data):
-        for milestone_data in milestones_data:
-            # Handle empty due_date
-            due_date = milestone_data.get('due_date')
-            if not due_date:
-                # Set default to 1 week from now
-                due_date = timezone.now() + timezone.timedelta(weeks=1)
-            else:
-                try:
-                    # Parse string date if provided
-                    due_date = parser.parse(due_date).date()
-                except (ValueError, TypeError):
-                    due_date = timezone.now() + timezone.timedelta(weeks=1)
-
-            Milestone.objects.create(
-                title=milestone_data.get('title', ''),
-                project=project,
-                task=task,
-                amount=milestone_data.get('amount', 0),
-                due_date=due_date,
-                milestone_type=milestone_data.get('milestone_type', 'hybrid'),
-                is_automated=milestone_data.get('is_automated', True)
-            )
-
-    def handle_skills_and_events(self, project, tasks_data, task_instances, client):
-        # Handle project skills
-        if skills_data := self.request.data.get('skills_required'):
-            # Ensure we have a list of skill IDs
-            skill_ids = [skill['value'] if isinstance(skill, dict) else skill 
-                        for skill in skills_data]
-            project.skills_required.set(Skill.objects.filter(id__in=skill_ids))
-
-        # Create project deadline event
-        Event.objects.create(
-            user=client,
-            title=f"{project.title} - Deadline",
-            type='Deadline',
-            start=project.deadline
-        )
-
-        # Handle tasks
-        for task, task_data in zip(task_instances, tasks_data):
-            # Task skills
-            if task_skills := task_data.get('skills_required_for_task'):
-                # Ensure we have a list of skill IDs
-                skill_ids = [skill['value'] if isinstance(skill, dict) else skill 
-                            for skill in task_skills]
-                task.skills_required_for_task.set(Skill.objects.filter(id__in=skill_ids))
-            
-            # Task event
-            Event.objects.create(
-                user=client,
-                title=f"{task.title} - Deadline",
-                start=task.deadline
-            )
-            
-            # Activity logging
-            Activity.objects.create(
-                user=client,
-                activity_type='task_created',
-                description=f'Created Task: {task.title}',
-                related_model='task',
-                related_object_id=task.id
-            )
+        project = ProjectCreationService.for_response(project)
+        project_data = ProjectResponseSerializer(project).data
+        return Response({
+            "message": "Project created successfully",
+            "project": project_data,
+            "tasks": project_data['tasks'],
+        }, status=status.HTTP_201_CREATED)
 
 
 
@@ -466,6 +298,45 @@ class CustomPagination(PageNumberPagination):
     page_size_query_param = 'page_size'
     max_page_size = 100
 
+def _search_page_params(request):
+    """Read page and page_size the same way CustomPagination does"""
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    try:
+        page_size = int(request.GET.get(CustomPagination.page_size_query_param, CustomPagination.page_size))
+    except ValueError:
+        page_size = CustomPagination.page_size
+    return page, min(max(page_size, 1), CustomPagination.max_page_size)
+
+
+def _search_section(request, kind, queryset, query, page, page_size, serialize):
+    """Run one paginated index lookup and serialize the matched objects in rank order"""
+    total = search.count(query, kind)
+    ids = search.search_ids(query, kind, limit=page_size, offset=(page - 1) * page_size)
+    url = request.build_absolute_uri()
+    if queryset is None:
+        # The serializer resolves the ids itself
+        results = serialize(ids)
+    else:
+        objects = queryset.in_bulk(ids)
+        results = serialize([objects[pk] for pk in ids if pk in objects])
+    return {
+        "count": total,
+        "next": replace_query_param(url, 'page', page + 1) if page * page_size < total else None,
+        "previous": replace_query_param(url, 'page', page - 1) if page > 1 else None,
+        "results": results,
+    }
+
+
+def _serialize_search_users(user_ids):
+    return [
+        {key: card[key] for key in ('id', 'username', 'role', 'profile_picture')}
+        for card in UserCardService.get_ordered_cards(user_ids)
+    ]
+
+
 @api_view(['GET'])
 @permission_classes([])  # Open API, modify as needed
 def search_partial(request):
@@ -473,122 +344,79 @@ def search_partial(request):
     if not query:
         return Response({"error": "Search query is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-    # Check cache first
-    cached_results = cache.get(query)
-    if cached_results:
-        return Response(cached_results)
-
-    paginator = CustomPagination()
-    # Search Users (by username & role)
-    users = User.objects.filter(
-        Q(username__icontains=query) | Q(role__icontains=query)
-    ).order_by('id')
-
-    # Paginate Users
-    paginated_users = paginator.paginate_queryset(users, request)
-
-    # Manually serialize the users with a Python dict
-    serialized_users = []
-    projects = []
-    seen_project_ids = set()  # To track unique project IDs
-
-    for user in paginated_users:
-        user_data = {
-            'id': user.id,
-            'username': user.username,
-            'role': user.role,
-            'profile_picture': None,  # Default value for profile_picture
-        }
+    page, page_size = _search_page_params(request)
+    scope = request.user.role if request.user.is_authenticated else 'anonymous'
 
-        # Add the profile_picture based on the role
-        if user.role == 'client':
-            try:
-                client_profile = ClientProfile.objects.get(user=user)
-                user_data['profile_picture'] = client_profile.profile_picture.url if client_profile.profile_picture else None
-                # Query for projects assigned to this client
-                client_projects = Project.objects.filter(
-                    Q(client=user) |  # Projects assigned to this client
-                    Q(title__icontains=query) | 
-                    Q(description__icontains=query) | 
-                    Q(domain__name__icontains=query)
-                ).distinct().order_by('id')
-
-                # Add only unique projects by ID
-                for project in client_projects:
-                    if project.id not in seen_project_ids:
-                        seen_project_ids.add(project.id)
-                        projects.append(project)
-
-            except ClientProfile.DoesNotExist:
-                user_data['profile_picture'] = None
-        elif user.role == 'freelancer':
-            try:
-                freelancer_profile = FreelancerProfile.objects.get(user=user)
-                # Query for projects assigned to this freelancer
-                freelancer_projects = Project.objects.filter(
-                    Q(assigned_to=user) |  # Correct for ManyToManyField lookup
-                    Q(title__icontains=query) | 
-                    Q(description__icontains=query) | 
-                    Q(domain__name__icontains=query)
-                ).distinct().order_by('id')
-
-                # Add only unique projects by ID
-                for project in freelancer_projects:
-                    if project.id not in seen_project_ids:
-                        seen_project_ids.add(project.id)
-                        projects.append(project)
-
-                user_data['profile_picture'] = freelancer_profile.profile_picture.url if freelancer_profile.profile_picture else None
-            except FreelancerProfile.DoesNotExist:
-                user_data['profile_picture'] = None
-
-        serialized_users.append(user_data)
-
-    # Paginate Projects
-    if projects:
-        paginated_projects = paginator.paginate_queryset(projects, request)
-        serialized_projects = ProjectSerializer(paginated_projects, many=True)
-        project_count = len(projects)  # Count the total number of projects
-    else:
-        project_count = 0
+    # Cached per query, role scope and page; entity version bumps invalidate it
+    key = search_cache.result_key(query, scope, page, page_size)
+    return Response(search_cache.get_or_compute(
+        key, lambda: _search_results(request, query, page, page_size)
+    ))
 
-    # Search Categories (by name)
-    categories = Category.objects.filter(
-        Q(name__icontains=query)
-    ).order_by('id')
 
-    # Paginate Categories
-    paginated_categories = paginator.paginate_queryset(categories, request)
-    serialized_categories = CategorySerializer(paginated_categories, many=True)
+def _search_results(request, query, page, page_size):
+    projects = Project.objects.select_related('domain').prefetch_related(
+        'skills_required', 'milestones', 'tasks__skills_required_for_task', 'tasks__assigned_to'
+    )
 
-    # Prepare the final response data, including pagination info
+    # Every section is answered from the search index; the ORM is only
+    # used to load the matched rows by primary key.
     response_data = {
-        "users": {
-            "count": users.count(),
-            "next": paginator.get_next_link(),
-            "previous": paginator.get_previous_link(),
-            "results": serialized_users
-        },
-        "projects": {
-            "count": project_count,
-            "next": paginator.get_next_link(),
-            "previous": paginator.get_previous_link(),
-            "results": serialized_projects.data if projects else []
-        },
-        "categories": {
-            "count": categories.count(),
-            "next": paginator.get_next_link(),
-            "previous": paginator.get_previous_link(),
-            "results": serialized_categories.data
-        }
+        "users": _search_section(
+            request, search.USER, None, query, page, page_size, _serialize_search_users
+        ),
+        "projects": _search_section(
+            request, search.PROJECT, projects, query, page, page_size,
+            lambda rows: ProjectSerializer(rows, many=True).data
+        ),
+        "categories": _search_section(
+            request, search.CATEGORY, Category.objects.all(), query, page, page_size,
+            lambda rows: CategorySerializer(rows, many=True).data
+        ),
+        "skills": _search_section(
+            request, search.SKILL, Skill.objects.all(), query, page, page_size,
+            lambda rows: SimpleSkillSerializer(rows, many=True).data
+        ),
     }
-    print(response_data)
+    return response_data
 
-    # Cache the results for 15 minutes
-    cache.set(query, response_data, timeout=60*15)
 
-    # Return the paginated response
-    return Response(response_data)
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def search_cache_stats(request):
+    """Hit/miss counters of the search result cache"""
+    return Response(search_cache.get_metrics())
+
+
+class ProjectBrowseView(APIView):
+    """
+    Marketplace listing of open projects for freelancers.
+
+    Filters: domain, skills (ids, comma separated), budget_min, budget_max,
+    deadline_after, deadline_before, deadline_within_days, complexity_level
+    and is_collaborative.  Results are ranked by how many of the requested
+    (or the freelancer's own) skills the project needs, then by freshness,
+    and paged with an opaque keyset cursor.  Facet counts are returned with
+    the first page, or on any page with facets=1.
+    """
+    permission_classes = [IsAuthenticated]
+    ranked_paginator = KeysetPaginator(ordering=('-relevance', '-created_at', '-id'), page_size=20, max_page_size=100)
+    # Without any skills to rank by the listing is pure freshness and walks project_browse_recent_idx
+    recent_paginator = KeysetPaginator(ordering=('-created_at', '-id'), page_size=20, max_page_size=100)
+
+    def get(self, request):
+        queryset, filters, ranked = ProjectBrowseService.browse(request.user, request.query_params)
+        queryset = queryset.select_related('domain').prefetch_related('skills_required')
+        paginator = self.ranked_paginator if ranked else self.recent_paginator
+        projects, next_cursor = paginator.paginate(request, queryset)
+
+        response_data = {
+            "next": replace_query_param(request.build_absolute_uri(), 'cursor', next_cursor) if next_cursor else None,
+            "results": ProjectBrowseSerializer(projects, many=True).data,
+        }
+        if 'cursor' not in request.query_params or request.query_params.get('facets') == '1':
+            response_data["facets"] = ProjectBrowseService.facets(filters)
+        return Response(response_data)
 
 
 
@@ -698,30 +526,31 @@ class NotifyFreelancerView(View):
                     "message": "Invalid task or project ID."
                 }, status=400)
 
-            # Check if user has already been notified within the last 24 hours
-            
-            for user in users_to_notify:
-                recent_notification = Notification.objects.filter(
-                    user=user,
-                    related_model_id=task.id if task else project.id,
-                    created_at__gte=timezone.now() - timezone.timedelta(hours=24)
-                ).first()
-
-                print("recent_notification",recent_notification)
+            # Check if any user has already been notified within the last 24 hours
+            related_model_id = task.id if task else project.id
+            users_to_notify = list(users_to_notify)
+            recent_notification = Notification.objects.filter(
+                user__in=users_to_notify,
+                related_model_id=related_model_id,
+                created_at__gte=timezone.now() - timezone.timedelta(hours=24)
+            ).exists()
 
-                if recent_notification:
-                    return JsonResponse({
-                        "status": "error",
-                        "message": "User already notified. Please try again in 24 hours."
-                    }, status=400)
+            if recent_notification:
+                return JsonResponse({
+                    "status": "error",
+                    "message": "User already notified. Please try again in 24 hours."
+                }, status=400)
 
-                # Send new notification
-                Notification.objects.create(
+            # Send new notifications in one batch
+            NotificationService.bulk_send(
+                Notification(
                     user=user,
                     type='Projects & Tasks' if task else 'Projects',
-                    related_model_id=task.id if task else project.id,
-                    notification_text=notification_text
+                    related_model_id=related_model_id,
+                    notification_text=str(notification_text)
                 )
+                for user in users_to_notify
+            )
 
             return JsonResponse({"status": "success", "message": "Notifications sent successfully."})
 
@@ -8,7 +8,12 @@ from financeapp.models import (
     CommissionTier,
     Commission,
     PaymentMethod,
-    PaymentGatewayLog
+    PaymentGatewayLog,
+    LedgerAccount,
+    JournalEntry,
+    Posting,
+    AccountSnapshot,
+    PayoutRetry
 )
 
 # Register your models here
@@ -20,4 +25,9 @@ admin.site.register(Transaction)
 admin.site.register(CommissionTier)
 admin.site.register(Commission)
 admin.site.register(PaymentMethod)
-admin.site.register(PaymentGatewayLog)
\ No newline at end of file
+admin.site.register(PaymentGatewayLog)
+admin.site.register(LedgerAccount)
+admin.site.register(JournalEntry)
+admin.site.register(Posting)
+admin.site.register(AccountSnapshot)
+admin.site.register(PayoutRetry)
\ No newline at end of file
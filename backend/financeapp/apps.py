@@ -3,4 +3,7 @@ from django.apps import AppConfig
 class FinanceappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'financeapp'  # Update this line
-    verbose_name = 'Finance App Management'
\ No newline at end of file
+    verbose_name = 'Finance App Management'
+
+    def ready(self):
+        import financeapp.signals  # Import the signals
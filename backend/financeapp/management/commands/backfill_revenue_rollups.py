@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from financeapp.services.revenue_service import RevenueService
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily revenue rollups from the transactions and commissions tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        written = RevenueService.backfill(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {written} revenue buckets in {time.monotonic() - started:.2f}s"
+        ))
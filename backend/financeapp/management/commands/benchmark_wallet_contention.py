@@ -0,0 +1,114 @@
+import random
+import threading
+import time
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connection
+from django.db.models import Sum
+
+from core.models import User
+from financeapp.models import Posting, Wallet, WalletTransaction
+
+AMOUNT = Decimal('10.00')
+
+# (balance change, hold change) of each operation when it succeeds
+OPERATIONS = {
+    'deposit': (AMOUNT, Decimal('0')),
+    'withdraw': (-AMOUNT, Decimal('0')),
+    'hold': (-AMOUNT, AMOUNT),
+    'release_hold': (AMOUNT, -AMOUNT),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammer one wallet from many threads and check that no update is lost. "
+        "A throwaway user and wallet are created and deleted afterwards"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=50)
+        parser.add_argument('--operations', type=int, default=20, help="Operations per writer")
+        parser.add_argument('--initial-balance', type=Decimal, default=Decimal('1000.00'))
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        user = User.objects.create_user(username=f'wallet-benchmark-{uuid.uuid4().hex[:8]}', password=None)
+        try:
+            wallet = Wallet.objects.create(user=user)
+            wallet.deposit(options['initial_balance'], "Benchmark funds")
+            self.run(wallet, options)
+        finally:
+            user.delete()
+
+    def run(self, wallet, options):
+        writers, per_writer = options['writers'], options['operations']
+        rng = random.Random(options['seed'])
+        plans = [[rng.choice(list(OPERATIONS)) for _ in range(per_writer)] for _ in range(writers)]
+        results = [None] * writers
+        start = threading.Barrier(writers + 1)
+
+        def writer(index):
+            balance, hold, rejected, retries = Decimal('0'), Decimal('0'), 0, 0
+            handle = Wallet.objects.get(pk=wallet.pk)
+            start.wait()
+            try:
+                for operation in plans[index]:
+                    while True:
+                        try:
+                            getattr(handle, operation)(AMOUNT)
+                        except ValueError:
+                            rejected += 1
+                        except OperationalError:
+                            # SQLite gives up on its write lock after its timeout; try again
+                            retries += 1
+                            time.sleep(0.001)
+                            continue
+                        else:
+                            balance += OPERATIONS[operation][0]
+                            hold += OPERATIONS[operation][1]
+                        break
+            finally:
+                results[index] = (balance, hold, rejected, retries)
+                connection.close()
+
+        threads = [threading.Thread(target=writer, args=(index,)) for index in range(writers)]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        close_old_connections()
+
+        expected_balance = wallet.balance + sum(result[0] for result in results)
+        expected_hold = wallet.hold_balance + sum(result[1] for result in results)
+        rejected = sum(result[2] for result in results)
+        retries = sum(result[3] for result in results)
+        wallet.refresh_from_db()
+
+        total = writers * per_writer
+        self.stdout.write(
+            f"ledger: {total} operations from {writers} writers "
+            f"in {elapsed:.2f}s ({total / elapsed:.0f} ops/s), {rejected} rejected for funds, {retries} lock retries"
+        )
+        self.stdout.write(f"balance {wallet.balance} (expected {expected_balance}), "
+                          f"hold {wallet.hold_balance} (expected {expected_hold})")
+
+        # Every successful operation left exactly one transaction record and one balanced entry
+        recorded = WalletTransaction.objects.filter(wallet=wallet).count() - 1
+        unbalanced = Posting.objects.filter(account__wallet=wallet).values('entry').annotate(
+            total=Sum('entry__postings__amount')).exclude(total=0).count()
+        self.stdout.write(f"{recorded} transaction records for {total - rejected} successful operations, "
+                          f"{unbalanced} unbalanced journal entries")
+
+        if (wallet.balance, wallet.hold_balance) == (expected_balance, expected_hold):
+            self.stdout.write(self.style.SUCCESS("No lost updates"))
+        else:
+            self.stdout.write(self.style.ERROR(
+                f"Lost updates: balance off by {wallet.balance - expected_balance}, "
+                f"hold off by {wallet.hold_balance - expected_hold}"
+            ))
@@ -0,0 +1,157 @@
+# Generated by Django 5.1.6 on 2026-10-18 15:56
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+import uuid
+
+
+def open_wallet_ledgers(apps, schema_editor):
+    """Move each wallet's stored balances into the ledger as one opening entry"""
+    Wallet = apps.get_model('financeapp', 'Wallet')
+    LedgerAccount = apps.get_model('financeapp', 'LedgerAccount')
+    JournalEntry = apps.get_model('financeapp', 'JournalEntry')
+    Posting = apps.get_model('financeapp', 'Posting')
+
+    wallets = list(Wallet.objects.only('id', 'currency', 'balance', 'hold_balance'))
+    if not wallets:
+        return
+    LedgerAccount.objects.bulk_create([
+        LedgerAccount(wallet_id=wallet.id, kind=kind, currency=wallet.currency)
+        for wallet in wallets for kind in ('available', 'held')
+    ])
+    accounts = {(account.wallet_id, account.kind): account for account in LedgerAccount.objects.filter(wallet__isnull=False)}
+
+    funded = [wallet for wallet in wallets if wallet.balance or wallet.hold_balance]
+    external = {}
+    for currency in {wallet.currency for wallet in funded}:
+        external[currency] = LedgerAccount.objects.create(kind='external', currency=currency)
+    entries = JournalEntry.objects.bulk_create([
+        JournalEntry(
+            entry_type='opening', reference_id=f"WAL-{uuid.uuid4().hex[:12].upper()}",
+            description="Opening balance", metadata={}
+        )
+        for _ in funded
+    ])
+    postings = []
+    for entry, wallet in zip(entries, funded):
+        for account, amount in (
+            (external[wallet.currency], -(wallet.balance + wallet.hold_balance)),
+            (accounts[(wallet.id, 'available')], wallet.balance),
+            (accounts[(wallet.id, 'held')], wallet.hold_balance),
+        ):
+            if amount:
+                postings.append(Posting(entry=entry, account=account, amount=amount, created_at=entry.created_at))
+    Posting.objects.bulk_create(postings, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financeapp', '0002_transaction_commission_tier_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('balance', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('last_posting_id', models.PositiveBigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='JournalEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_type', models.CharField(choices=[('opening', 'Opening Balance'), ('deposit', 'Deposit'), ('withdrawal', 'Withdrawal'), ('transfer', 'Transfer'), ('payment', 'Payment'), ('refund', 'Refund'), ('hold', 'Hold'), ('release', 'Release'), ('commission', 'Commission'), ('subscription', 'Subscription Fee')], max_length=20)),
+                ('reference_id', models.CharField(max_length=100, unique=True)),
+                ('description', models.TextField(blank=True)),
+                ('metadata', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Journal Entries',
+            },
+        ),
+        migrations.CreateModel(
+            name='LedgerAccount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('available', 'Wallet Available'), ('held', 'Wallet Held'), ('external', 'External Funds'), ('platform', 'Platform Revenue')], max_length=20)),
+                ('currency', models.CharField(default='INR', max_length=3)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Posting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('created_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='wallettransaction',
+            name='journal_entry',
+            field=models.ForeignKey(blank=True, help_text='Ledger entry that moved the funds for this statement line', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='wallet_transactions', to='financeapp.journalentry'),
+        ),
+        migrations.AddField(
+            model_name='ledgeraccount',
+            name='wallet',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ledger_accounts', to='financeapp.wallet'),
+        ),
+        migrations.AddField(
+            model_name='accountsnapshot',
+            name='account',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='financeapp.ledgeraccount'),
+        ),
+        migrations.AddField(
+            model_name='posting',
+            name='account',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='financeapp.ledgeraccount'),
+        ),
+        migrations.AddField(
+            model_name='posting',
+            name='entry',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='financeapp.journalentry'),
+        ),
+        migrations.AddConstraint(
+            model_name='ledgeraccount',
+            constraint=models.UniqueConstraint(fields=('wallet', 'kind'), name='ledger_wallet_account_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='ledgeraccount',
+            constraint=models.UniqueConstraint(condition=models.Q(('wallet__isnull', True)), fields=('kind', 'currency'), name='ledger_system_account_unique'),
+        ),
+        migrations.AddIndex(
+            model_name='accountsnapshot',
+            index=models.Index(fields=['account', '-last_posting_id'], name='ledger_snapshot_latest_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='accountsnapshot',
+            constraint=models.UniqueConstraint(fields=('account', 'last_posting_id'), name='ledger_snapshot_unique'),
+        ),
+        migrations.AddIndex(
+            model_name='posting',
+            index=models.Index(fields=['account', 'id'], name='posting_account_tail_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='posting',
+            index=models.Index(fields=['account', 'created_at'], name='posting_account_time_idx'),
+        ),
+        migrations.RunPython(open_wallet_ledgers, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='wallet',
+            name='financeapp__balance_c265ff_idx',
+        ),
+        migrations.RemoveField(
+            model_name='wallet',
+            name='balance',
+        ),
+        migrations.RemoveField(
+            model_name='wallet',
+            name='hold_balance',
+        ),
+    ]
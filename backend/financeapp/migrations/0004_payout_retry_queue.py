@@ -0,0 +1,32 @@
+# Generated by Django 5.1.6 on 2026-10-18 16:05
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financeapp', '0003_wallet_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayoutRetry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reference', models.CharField(max_length=100, unique=True)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('attempts', models.PositiveIntegerField(default=1)),
+                ('last_error', models.TextField(blank=True)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('from_wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='outgoing_payout_retries', to='financeapp.wallet')),
+                ('to_wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='incoming_payout_retries', to='financeapp.wallet')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['attempts', 'next_attempt_at'], name='payout_retry_due_idx')],
+            },
+        ),
+    ]
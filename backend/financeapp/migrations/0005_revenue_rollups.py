@@ -0,0 +1,90 @@
+# Generated by Django 5.1.6 on 2026-10-18 16:11
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_platform_fees(apps, schema_editor):
+    """Copy platform fees recorded only in metadata into the platform_fee_amount column"""
+    Transaction = apps.get_model('financeapp', 'Transaction')
+    transactions = []
+    pending = Transaction.objects.filter(metadata__has_key='platform_fee', platform_fee_amount=0).only(
+        'id', 'metadata', 'amount', 'tax_amount'
+    )
+    for txn in pending.iterator(chunk_size=1000):
+        txn.platform_fee_amount = Decimal(str(txn.metadata.get('platform_fee') or 0))
+        txn.net_amount = txn.amount - txn.platform_fee_amount - txn.tax_amount
+        transactions.append(txn)
+    Transaction.objects.bulk_update(transactions, ['platform_fee_amount', 'net_amount'], batch_size=1000)
+
+
+def backfill_rollups(apps, schema_editor):
+    Transaction = apps.get_model('financeapp', 'Transaction')
+    Commission = apps.get_model('financeapp', 'Commission')
+    DailyRevenueRollup = apps.get_model('financeapp', 'DailyRevenueRollup')
+    buckets = defaultdict(dict)
+    transactions = (
+        Transaction.objects.filter(status='completed')
+        .annotate(day=TruncDate('created_at'))
+        .order_by()
+        .values_list('day', 'currency', 'payment_type')
+        .annotate(count=Count('id'), gross=Sum('amount'), fee=Sum('platform_fee_amount'))
+    )
+    for day, currency, payment_type, count, gross, fee in transactions:
+        buckets[(day, currency, payment_type)].update(transaction_count=count, gross_amount=gross, platform_fee=fee)
+    commissions = (
+        Commission.objects.annotate(day=TruncDate('created_at'))
+        .order_by()
+        .values_list('day', 'transaction__currency', 'transaction__payment_type')
+        .annotate(count=Count('id'), total=Sum('amount'))
+    )
+    for day, currency, payment_type, count, total in commissions:
+        buckets[(day, currency, payment_type)].update(commission_count=count, commission_amount=total)
+    DailyRevenueRollup.objects.bulk_create(
+        [
+            DailyRevenueRollup(day=day, currency=currency, payment_type=payment_type, **values)
+            for (day, currency, payment_type), values in buckets.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_notification_dedup_key'),
+        ('financeapp', '0004_payout_retry_queue'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRevenueRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('currency', models.CharField(default='INR', max_length=3)),
+                ('payment_type', models.CharField(max_length=20)),
+                ('transaction_count', models.IntegerField(default=0)),
+                ('gross_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('platform_fee', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('commission_count', models.IntegerField(default=0)),
+                ('commission_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['status', 'created_at', 'currency', 'payment_type', 'platform_fee_amount', 'amount'], name='transaction_revenue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dailyrevenuerollup',
+            index=models.Index(fields=['day', 'currency', 'payment_type'], name='revenue_rollup_day_idx'),
+        ),
+        migrations.RunPython(backfill_platform_fees, migrations.RunPython.noop),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.6 on 2026-10-18 16:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financeapp', '0005_revenue_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='wallettransaction',
+            index=models.Index(fields=['wallet', '-timestamp', '-id'], name='wallet_txn_history_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.6 on 2026-10-18 18:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financeapp', '0006_wallet_history_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='specialcommissionrate',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
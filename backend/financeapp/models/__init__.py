@@ -1,5 +1,8 @@
 from .subscription import SubscriptionPlan, SubscriptionPlanManager, UserSubscription, UserSubscriptionManager
 from .wallet import Wallet, WalletTransaction, WalletManager, WalletTransactionManager
+from .ledger import LedgerAccount, JournalEntry, Posting, AccountSnapshot
+from .payout import PayoutRetry
+from .revenue import DailyRevenueRollup
 from .transaction import Transaction, TransactionManager
 from .commission import CommissionTier, Commission
 from .payment import PaymentMethod, PaymentGatewayLog
@@ -14,6 +17,12 @@ __all__ = [
     'WalletTransaction',
     'WalletManager',
     'WalletTransactionManager',
+    'LedgerAccount',
+    'JournalEntry',
+    'Posting',
+    'AccountSnapshot',
+    'PayoutRetry',
+    'DailyRevenueRollup',
     'Transaction',
     'TransactionManager',
     'CommissionTier',
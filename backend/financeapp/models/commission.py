@@ -6,12 +6,9 @@ import uuid
 
 class CommissionTierManager(models.Manager):
     def get_for_amount(self, amount):
-        """Get appropriate tier for a given amount"""
-        return self.filter(
-            min_amount__lte=amount,
-            max_amount__gte=amount,
-            is_active=True
-        ).first()
+        """Get appropriate tier for a given amount, from the in-process rate table"""
+        from ..services.commission_rate_service import CommissionRateService
+        return CommissionRateService.get_tier(amount)
     
     def active_tiers(self):
         """Get all active commission tiers"""
@@ -156,6 +153,7 @@ class SpecialCommissionRate(models.Model):
     start_date = models.DateTimeField(auto_now_add=True)
     end_date = models.DateTimeField(null=True, blank=True)
     is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name = "Special Commission Rate"
@@ -234,6 +232,15 @@ class Commission(models.Model):
     def __str__(self):
         return f"Commission of {self.amount} ({self.percentage}%) for {self.transaction}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what the revenue rollups counted, so updates can move it
+        instance._loaded_revenue = tuple(
+            instance.__dict__.get(field) for field in ('transaction_id', 'created_at', 'amount')
+        )
+        return instance
+    
     @property
     def discount_amount(self):
         """Calculate discount amount if applicable"""
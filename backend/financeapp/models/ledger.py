@@ -0,0 +1,110 @@
+from django.db import models
+from decimal import Decimal
+
+
+class LedgerAccount(models.Model):
+    """
+    An account of the double-entry wallet ledger.
+
+    Every wallet has an ``available`` and a ``held`` account.  Money entering
+    or leaving the platform is posted against the per-currency ``external``
+    account, and commissions are credited to ``platform``.
+    """
+    KIND_CHOICES = [
+        ('available', 'Wallet Available'),
+        ('held', 'Wallet Held'),
+        ('external', 'External Funds'),
+        ('platform', 'Platform Revenue'),
+    ]
+    WALLET_KINDS = ('available', 'held')
+
+    wallet = models.ForeignKey(
+        'financeapp.Wallet',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='ledger_accounts'
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    currency = models.CharField(max_length=3, default='INR')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['wallet', 'kind'], name='ledger_wallet_account_unique'),
+            models.UniqueConstraint(
+                fields=['kind', 'currency'],
+                condition=models.Q(wallet__isnull=True),
+                name='ledger_system_account_unique'
+            ),
+        ]
+
+    def __str__(self):
+        owner = self.wallet.user.username if self.wallet_id else 'platform'
+        return f"{owner} {self.kind} ({self.currency})"
+
+
+class JournalEntry(models.Model):
+    """One balanced money movement; its postings always sum to zero"""
+    ENTRY_TYPES = [
+        ('opening', 'Opening Balance'),
+        ('deposit', 'Deposit'),
+        ('withdrawal', 'Withdrawal'),
+        ('transfer', 'Transfer'),
+        ('payment', 'Payment'),
+        ('refund', 'Refund'),
+        ('hold', 'Hold'),
+        ('release', 'Release'),
+        ('commission', 'Commission'),
+        ('subscription', 'Subscription Fee'),
+    ]
+
+    entry_type = models.CharField(max_length=20, choices=ENTRY_TYPES)
+    reference_id = models.CharField(max_length=100, unique=True)
+    description = models.TextField(blank=True)
+    metadata = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name_plural = "Journal Entries"
+
+    def __str__(self):
+        return f"{self.get_entry_type_display()} {self.reference_id}"
+
+
+class Posting(models.Model):
+    """A signed amount on one account; rows are only ever inserted"""
+    entry = models.ForeignKey(JournalEntry, on_delete=models.CASCADE, related_name='postings')
+    account = models.ForeignKey(LedgerAccount, on_delete=models.CASCADE, related_name='postings')
+    amount = models.DecimalField(max_digits=14, decimal_places=2)
+    # Copied from the entry so account history is a range scan on one index
+    created_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            # Balance tails: an account's postings after its latest snapshot
+            models.Index(fields=['account', 'id'], name='posting_account_tail_idx'),
+            models.Index(fields=['account', 'created_at'], name='posting_account_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.amount} on {self.account_id} ({self.entry_id})"
+
+
+class AccountSnapshot(models.Model):
+    """Balance of an account over every posting with id <= last_posting_id"""
+    account = models.ForeignKey(LedgerAccount, on_delete=models.CASCADE, related_name='snapshots')
+    balance = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    last_posting_id = models.PositiveBigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['account', 'last_posting_id'], name='ledger_snapshot_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['account', '-last_posting_id'], name='ledger_snapshot_latest_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.account_id}: {self.balance} up to posting {self.last_posting_id}"
@@ -0,0 +1,22 @@
+from django.db import models
+from django.utils import timezone
+
+
+class PayoutRetry(models.Model):
+    """A bulk payout item that could not be paid yet, waiting to be retried"""
+    reference = models.CharField(max_length=100, unique=True)
+    from_wallet = models.ForeignKey('financeapp.Wallet', on_delete=models.CASCADE, related_name='outgoing_payout_retries')
+    to_wallet = models.ForeignKey('financeapp.Wallet', on_delete=models.CASCADE, related_name='incoming_payout_retries')
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    attempts = models.PositiveIntegerField(default=1)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['attempts', 'next_attempt_at'], name='payout_retry_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.reference}: {self.amount} (attempt {self.attempts})"
@@ -0,0 +1,28 @@
+from django.db import models
+from decimal import Decimal
+
+
+class DailyRevenueRollup(models.Model):
+    """
+    Completed transactions and commissions summed per local day, currency
+    and payment type.  Adjusted on every Transaction and Commission write,
+    so revenue reports add up a few buckets instead of scanning either
+    table.  A (day, currency, payment type) key may span several rows;
+    readers always sum them.
+    """
+    day = models.DateField()
+    currency = models.CharField(max_length=3, default='INR')
+    payment_type = models.CharField(max_length=20)
+    transaction_count = models.IntegerField(default=0)
+    gross_amount = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    platform_fee = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    commission_count = models.IntegerField(default=0)
+    commission_amount = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['day', 'currency', 'payment_type'], name='revenue_rollup_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.currency} {self.payment_type}: {self.platform_fee}"
@@ -49,24 +49,11 @@ class TransactionManager(models.Manager):
     def by_user(self, user):
         return self.get_queryset().by_user(user)
     
-    def calculate_revenue(self, start_date=None, end_date=None):
-        """Calculate total platform revenue from transactions"""
-        queryset = self.get_queryset().filter(
-            status='completed',
-            metadata__has_key='platform_fee'
-        )
-        
-        if start_date:
-            queryset = queryset.filter(created_at__gte=start_date)
-        if end_date:
-            queryset = queryset.filter(created_at__lte=end_date)
-        
-        total = Decimal('0.00')
-        for transaction in queryset:
-            fee = transaction.metadata.get('platform_fee', 0)
-            total += Decimal(str(fee))
-        
-        return total
+    def calculate_revenue(self, start_date=None, end_date=None, currency=None):
+        """Calculate total platform revenue from completed transactions, read from the daily rollups"""
+        from ..services.revenue_service import RevenueService
+        report = RevenueService.report(start_date, end_date, currency=currency)
+        return sum((row['platform_fee'] for row in report), Decimal('0.00'))
 
     def create_milestone_payment(self, milestone, **kwargs):
         """Create a payment transaction for a milestone"""
@@ -272,6 +259,11 @@ class Transaction(models.Model):
             models.Index(fields=['from_user', 'to_user']),
             models.Index(fields=['status', 'payment_type']),
             models.Index(fields=['created_at']),
+            # Partial-day revenue: a range scan that never visits the table
+            models.Index(
+                fields=['status', 'created_at', 'currency', 'payment_type', 'platform_fee_amount', 'amount'],
+                name='transaction_revenue_idx'
+            ),
             models.Index(fields=['transaction_id']),
             models.Index(fields=['project']),
             models.Index(fields=['task']),
@@ -290,6 +282,16 @@ class Transaction(models.Model):
         import time
         return f"TXN-{int(time.time())}-{uuid.uuid4().hex[:8].upper()}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what the revenue rollups counted, so updates can move it
+        instance._loaded_revenue = tuple(
+            instance.__dict__.get(field)
+            for field in ('status', 'created_at', 'currency', 'payment_type', 'amount', 'platform_fee_amount')
+        )
+        return instance
+    
     def save(self, *args, **kwargs):
         # Set transaction ID if not already set
         if not self.transaction_id:
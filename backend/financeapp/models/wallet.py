@@ -34,19 +34,6 @@ class Wallet(models.Model):
         on_delete=models.CASCADE, 
         related_name='wallet'
     )
-    balance = models.DecimalField(
-        max_digits=12, 
-        decimal_places=2, 
-        default=Decimal('0.00'),
-        validators=[MinValueValidator(Decimal('0.00'))]
-    )
-    hold_balance = models.DecimalField(
-        max_digits=12,
-        decimal_places=2,
-        default=Decimal('0.00'),
-        validators=[MinValueValidator(Decimal('0.00'))],
-        help_text="Amount temporarily held for pending transactions"
-    )
     currency = models.CharField(max_length=3, default='INR')
     last_updated = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
@@ -59,118 +46,59 @@ class Wallet(models.Model):
         verbose_name_plural = "Wallets"
         indexes = [
             models.Index(fields=['user', 'is_active']),
-            models.Index(fields=['balance']),
         ]
     
     def __str__(self):
         return f"{self.user.username}'s Wallet ({self.currency} {self.balance})"
     
+    # Balances live in the double-entry ledger (financeapp.services.ledger_service)
+    @property
+    def balance(self):
+        return self.get_balances()['available']
+
+    @property
+    def hold_balance(self):
+        return self.get_balances()['held']
+
+    def get_balances(self):
+        """{'available': ..., 'held': ...} from the ledger, cached until the next operation or refresh"""
+        if getattr(self, '_balances', None) is None:
+            from ..services.ledger_service import LedgerService
+            self._balances = LedgerService.wallet_balances(self)
+        return self._balances
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._balances = None
+
     def deposit(self, amount, description="Deposit"):
-        """Add funds to wallet"""
-        if amount <= 0:
-            raise ValueError("Amount must be positive")
-        
-        self.balance += Decimal(str(amount))
-        self.save()
-        
-        # Create transaction record
-        WalletTransaction.objects.create(
-            wallet=self,
-            amount=amount,
-            transaction_type='deposit',
-            reference_id=WalletTransaction.generate_reference_id(),
-            description=description,
-            status='completed'
-        )
-        return True
+        """Add funds to wallet; returns the new balance"""
+        from ..services.ledger_service import LedgerService
+        LedgerService.deposit(self, amount, description)
+        return self.balance
     
     def withdraw(self, amount, description="Withdrawal"):
-        """Remove funds from wallet"""
-        amount = Decimal(str(amount))
-        if amount <= 0:
-            raise ValueError("Amount must be positive")
-        
-        if self.balance < amount:
-            raise ValueError("Insufficient funds")
-        
-        self.balance -= amount
-        self.save()
-        
-        # Create transaction record
-        WalletTransaction.objects.create(
-            wallet=self,
-            amount=amount,
-            transaction_type='withdrawal',
-            reference_id=WalletTransaction.generate_reference_id(),
-            description=description,
-            status='completed'
-        )
-        return True
+        """Remove funds from wallet; returns the new balance"""
+        from ..services.ledger_service import LedgerService
+        LedgerService.withdraw(self, amount, description)
+        return self.balance
     
     def hold(self, amount, description="Payment hold"):
-        """Place a hold on funds for pending transactions"""
-        amount = Decimal(str(amount))
-        if amount <= 0:
-            raise ValueError("Amount must be positive")
-        
-        if self.balance < amount:
-            raise ValueError("Insufficient funds")
-        
-        self.balance -= amount
-        self.hold_balance += amount
-        self.save()
-        
-        # Create transaction record
-        WalletTransaction.objects.create(
-            wallet=self,
-            amount=amount,
-            transaction_type='hold',
-            reference_id=WalletTransaction.generate_reference_id(),
-            description=description,
-            status='pending'
-        )
-        return True
+        """Place a hold on funds for pending transactions; returns the new balance"""
+        from ..services.ledger_service import LedgerService
+        LedgerService.hold(self, amount, description)
+        return self.balance
     
     def release_hold(self, amount, description="Hold released"):
-        """Release held funds back to available balance"""
-        amount = Decimal(str(amount))
-        if amount <= 0:
-            raise ValueError("Amount must be positive")
-        
-        if self.hold_balance < amount:
-            raise ValueError("Hold amount exceeds held balance")
-        
-        self.hold_balance -= amount
-        self.balance += amount
-        self.save()
-        
-        # Create transaction record
-        WalletTransaction.objects.create(
-            wallet=self,
-            amount=amount,
-            transaction_type='release',
-            reference_id=WalletTransaction.generate_reference_id(),
-            description=description,
-            status='completed'
-        )
-        return True
+        """Release held funds back to available balance; returns the new balance"""
+        from ..services.ledger_service import LedgerService
+        LedgerService.release_hold(self, amount, description)
+        return self.balance
     
     def transfer(self, to_wallet, amount, description="Wallet transfer"):
         """Transfer funds to another wallet"""
-        from django.db import transaction
-        
-        amount = Decimal(str(amount))
-        if amount <= 0:
-            raise ValueError("Amount must be positive")
-        
-        if self.balance < amount:
-            raise ValueError("Insufficient funds")
-        
-        # Ensure atomic transaction
-        with transaction.atomic():
-            self.withdraw(amount, f"Transfer to {to_wallet.user.username}")
-            to_wallet.deposit(amount, f"Transfer from {self.user.username}")
-        
+        from ..services.ledger_service import LedgerService
+        LedgerService.transfer(self, to_wallet, amount, description)
         return True
     
     @property
@@ -185,7 +113,7 @@ class Wallet(models.Model):
     
     def get_transaction_history(self, limit=None):
         """Return wallet transaction history"""
-        transactions = WalletTransaction.objects.filter(wallet=self).order_by('-timestamp')
+        transactions = WalletTransaction.objects.filter(wallet=self).order_by('-timestamp', '-id')
         if limit:
             transactions = transactions[:limit]
         return transactions
@@ -244,6 +172,14 @@ class WalletTransaction(models.Model):
     reference_id = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True)
     metadata = models.JSONField(default=dict)
+    journal_entry = models.ForeignKey(
+        'financeapp.JournalEntry',
+        null=True,
+        blank=True,
+        on_delete=models.PROTECT,
+        related_name='wallet_transactions',
+        help_text="Ledger entry that moved the funds for this statement line"
+    )
     related_transaction = models.ForeignKey(
         'self',
         null=True,
@@ -260,6 +196,8 @@ class WalletTransaction(models.Model):
         ordering = ['-timestamp']
         indexes = [
             models.Index(fields=['wallet', 'transaction_type']),
+            # Statement pages and exports: one wallet's lines, newest first, seeked by (timestamp, id)
+            models.Index(fields=['wallet', '-timestamp', '-id'], name='wallet_txn_history_idx'),
             models.Index(fields=['status', 'timestamp']),
             models.Index(fields=['reference_id']),
         ]
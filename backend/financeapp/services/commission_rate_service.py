@@ -0,0 +1,212 @@
+"""
+Process-local commission rates.
+
+Active tiers are flattened into sorted, non-overlapping amount segments,
+so resolving an amount is a bisect instead of a range query, and active
+per-user ``SpecialCommissionRate`` rows are overlaid by user id.
+
+Freshness does not depend on any cache: the table's version is the row
+count and latest ``updated_at`` of both rate tables, read from the
+database at most every ``CHECK_INTERVAL`` seconds, so an edit made by any
+process (web worker, admin, shell, Celery) is picked up everywhere within
+that interval.  Saves in this process drop the table right after commit,
+and no table is served longer than ``MAX_AGE`` whatever its version says.
+Tables are immutable once built, so a reload never exposes a half-built
+table to another thread.
+"""
+import bisect
+import threading
+from decimal import ROUND_HALF_EVEN, Decimal
+from time import monotonic
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from ..models import CommissionTier
+from ..models.commission import SpecialCommissionRate
+
+CHECK_INTERVAL = 5
+MAX_AGE = 300
+CENT = Decimal('0.01')
+# Batch pricing runs in integer cents and basis points; beyond this many
+# cents the intermediate products could overflow int64
+MAX_VECTOR_CENTS = 9 * 10 ** 10
+
+_local = {'table': None, 'checked_at': None}
+_local_lock = threading.Lock()
+
+
+def _cents(value):
+    return int((Decimal(str(value)) * 100).to_integral_value(ROUND_HALF_EVEN))
+
+
+def _basis_points(percentage):
+    return int((Decimal(str(percentage)) * 100).to_integral_value(ROUND_HALF_EVEN))
+
+
+class RateTable:
+    """Everything one version of the rates resolves against; never mutated after construction"""
+
+    def __init__(self, version, tiers, specials, expires_at):
+        self.version = version
+        self.expires_at = expires_at
+        self.loaded_at = monotonic()
+        self.specials = specials
+
+        # Tiers cover [min_amount, max_amount] in whole cents.  Every segment
+        # between consecutive boundaries takes the covering tier with the
+        # lowest min_amount, which is what the old ``.first()`` range query
+        # returned when tiers overlapped.
+        bounds = sorted({_cents(t.min_amount) for t in tiers} | {_cents(t.max_amount) + 1 for t in tiers})
+        self.starts, self.tiers = [], []
+        for start in bounds:
+            covering = [t for t in tiers if _cents(t.min_amount) <= start <= _cents(t.max_amount)]
+            winner = min(covering, key=lambda t: t.min_amount) if covering else None
+            if self.tiers and self.tiers[-1] is winner:
+                continue
+            self.starts.append(start)
+            self.tiers.append(winner)
+
+        self._starts = np.array(self.starts, dtype=np.int64)
+        self._rates = {
+            user_type: np.array(
+                [
+                    [_basis_points(t.percentage), _cents(t.flat_fee), _basis_points(discount(t))]
+                    if t is not None else [0, 0, 0]
+                    for t in self.tiers
+                ],
+                dtype=np.int64,
+            ).reshape(-1, 3)
+            for user_type, discount in (
+                (None, lambda t: 0),
+                ('freelancer', lambda t: t.freelancer_discount),
+                ('client', lambda t: t.client_discount),
+            )
+        }
+        self._covered = np.array([t is not None for t in self.tiers], dtype=bool)
+
+    def tier_for(self, amount):
+        index = bisect.bisect_right(self.starts, _cents(amount)) - 1
+        return self.tiers[index] if index >= 0 else None
+
+
+class CommissionRateService:
+    @staticmethod
+    def version():
+        """(count, last change) of the tier and special rate tables; moves on every insert, edit and delete"""
+        return tuple(
+            value
+            for model in (CommissionTier, SpecialCommissionRate)
+            for value in model.objects.aggregate(count=Count('id'), changed=Max('updated_at')).values()
+        )
+
+    @staticmethod
+    def load(version):
+        now = timezone.now()
+        tiers = list(CommissionTier.objects.filter(is_active=True).order_by('min_amount'))
+        specials = {}
+        expires_at = None
+        rates = SpecialCommissionRate.objects.filter(
+            Q(end_date__isnull=True) | Q(end_date__gt=now),
+            is_active=True, user__isnull=False, start_date__lte=now,
+        ).order_by('start_date')
+        for rate in rates:
+            # The most recently granted rate wins
+            specials[rate.user_id] = rate
+            if rate.end_date and (expires_at is None or rate.end_date < expires_at):
+                expires_at = rate.end_date
+        return RateTable(version, tiers, specials, expires_at)
+
+    @staticmethod
+    def _usable(table, now):
+        return (
+            table is not None
+            and now - table.loaded_at < MAX_AGE
+            and (table.expires_at is None or timezone.now() < table.expires_at)
+        )
+
+    @staticmethod
+    def table():
+        """The current rate table, reloaded when the database version moved, a special rate expired or it got too old"""
+        table, checked_at, now = _local['table'], _local['checked_at'], monotonic()
+        if CommissionRateService._usable(table, now) and now - checked_at < CHECK_INTERVAL:
+            return table
+        with _local_lock:
+            table, checked_at, now = _local['table'], _local['checked_at'], monotonic()
+            if not CommissionRateService._usable(table, now) or now - checked_at >= CHECK_INTERVAL:
+                version = CommissionRateService.version()
+                if not CommissionRateService._usable(table, now) or table.version != version:
+                    table = _local['table'] = CommissionRateService.load(version)
+                _local['checked_at'] = now
+        return table
+
+    @staticmethod
+    def invalidate():
+        """Drop this process's table once the current transaction commits; other processes see the new version"""
+        def drop():
+            _local['table'] = None
+        transaction.on_commit(drop)
+
+    @staticmethod
+    def get_tier(amount):
+        """The active tier covering ``amount``, or None"""
+        return CommissionRateService.table().tier_for(amount)
+
+    @staticmethod
+    def get_rate(amount, user=None):
+        """(tier, special rate) that prices ``amount`` for ``user``; a special rate overrides the tier"""
+        table = CommissionRateService.table()
+        user_id = getattr(user, 'pk', user)
+        special = table.specials.get(user_id) if user_id is not None else None
+        return table.tier_for(amount), special
+
+    @staticmethod
+    def calculate_commissions(amounts, users=None, user_type=None):
+        """
+        Commissions for many amounts in one vectorized pass, using the same
+        formulas as ``CommissionTier.calculate_commission`` and
+        ``SpecialCommissionRate.calculate_commission`` rounded to cents.
+        ``users`` (ids or instances, aligned with ``amounts``) selects special
+        rates and ``user_type`` the tier discount.  Amounts no tier covers
+        come back as None.
+        """
+        table = CommissionRateService.table()
+        cents = np.array([_cents(amount) for amount in amounts], dtype=np.int64)
+        if not len(cents):
+            return []
+        if np.abs(cents).max() > MAX_VECTOR_CENTS:
+            raise ValueError("Amount too large for batch pricing")
+
+        index = np.searchsorted(table._starts, cents, side='right') - 1
+        covered = index >= 0
+        index = np.clip(index, 0, None)
+        if len(table.tiers):
+            covered &= table._covered[index]
+            rates = table._rates.get(user_type, table._rates[None])[index]
+        else:
+            rates = np.zeros((len(cents), 3), dtype=np.int64)
+
+        if users is not None:
+            specials = [table.specials.get(getattr(user, 'pk', user)) for user in users]
+            overridden = np.array([special is not None for special in specials], dtype=bool)
+            if overridden.any():
+                rates = rates.copy()
+                rates[overridden] = [
+                    [_basis_points(special.percentage), _cents(special.flat_fee), 0]
+                    for special in specials if special is not None
+                ]
+                covered |= overridden
+
+        percentage, flat_fee, discount = rates.T
+        # commission = (amount * pct / 100 + flat) * (1 - discount / 100), in 1e-8 cents
+        scaled = (cents * percentage + flat_fee * 10000) * (10000 - discount)
+        quotient, remainder = np.divmod(scaled, 10 ** 8)
+        # Round half to even, as Decimal.quantize does
+        round_up = (remainder * 2 > 10 ** 8) | ((remainder * 2 == 10 ** 8) & (quotient % 2 == 1))
+        result = quotient + round_up
+        return [
+            (Decimal(int(value)) * CENT).quantize(CENT) if is_covered else None
+            for value, is_covered in zip(result, covered)
+        ]
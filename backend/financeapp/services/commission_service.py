@@ -2,24 +2,17 @@ from decimal import Decimal
 from django.db import transaction
 from ..models import CommissionTier, Commission, Transaction
 from django.core.exceptions import ValidationError
+from .commission_rate_service import CommissionRateService
+from .revenue_service import RevenueService
 
 class CommissionService:
     @staticmethod
     def get_applicable_tier(amount):
         """Get the appropriate commission tier for a given amount"""
-        try:
-            tier = CommissionTier.objects.filter(
-                min_amount__lte=amount,
-                max_amount__gte=amount,
-                is_active=True
-            ).first()
-            
-            if not tier:
-                raise ValidationError("No applicable commission tier found")
-                
-            return tier
-        except Exception as e:
-            raise ValidationError(f"Error determining commission tier: {str(e)}")
+        tier = CommissionRateService.get_tier(amount)
+        if not tier:
+            raise ValidationError("No applicable commission tier found")
+        return tier
 
     @staticmethod
     @transaction.atomic
@@ -43,22 +36,21 @@ class CommissionService:
 
     @staticmethod
     def get_commission_summary(start_date=None, end_date=None):
-        """Get commission summary for a date range"""
-        commissions = Commission.objects.all()
-        
-        if start_date:
-            commissions = commissions.filter(created_at__gte=start_date)
-        if end_date:
-            commissions = commissions.filter(created_at__lte=end_date)
-            
-        total_commission = commissions.aggregate(
-            total=models.Sum('amount')
-        )['total'] or Decimal('0.0')
+        """Get commission summary for a date range, from the daily revenue rollups"""
+        report = RevenueService.report(start_date, end_date)
         
         return {
-            'total_commission': total_commission,
-            'commission_count': commissions.count(),
-            'commissions': commissions
+            'total_commission': sum((row['commission_amount'] for row in report), Decimal('0.00')),
+            'commission_count': sum(row['commission_count'] for row in report),
+            'by_currency': [
+                {
+                    'currency': row['currency'],
+                    'payment_type': row['payment_type'],
+                    'total': row['commission_amount'],
+                    'count': row['commission_count'],
+                }
+                for row in report if row['commission_count']
+            ],
         }
 
     @staticmethod
@@ -0,0 +1,306 @@
+"""
+Append-only double-entry ledger behind every wallet operation.
+
+Each operation inserts one ``JournalEntry``, postings that sum to zero and
+the wallet statement lines (``WalletTransaction``); no existing row is
+ever rewritten.  A balance is the account's latest ``AccountSnapshot``
+plus the postings after it, and ``snapshot`` (run periodically) keeps
+that tail short.  A snapshot only covers postings below a committed
+watermark: an id no transaction still in flight can commit under, so a
+slow transaction can never land a posting behind a snapshot.  Debits lock
+the debited account row, in id order, for the length of the transaction
+so two debits cannot both spend the same funds; credits take no lock at
+all.  SQLite has no row locks, so there ledger transactions claim the
+database write lock with their first statement instead.
+"""
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import DecimalField, F, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from ..models import AccountSnapshot, JournalEntry, LedgerAccount, Posting, WalletTransaction
+
+ZERO = Decimal('0.00')
+CENT = Decimal('0.01')
+
+# Backends without a committed watermark only snapshot postings this old;
+# there every ledger transaction must finish well within it
+SNAPSHOT_LAG = timedelta(minutes=5)
+
+
+def _money(expression):
+    return Coalesce(expression, Value(ZERO), output_field=DecimalField(max_digits=14, decimal_places=2))
+
+
+def _amount(amount):
+    amount = Decimal(str(amount))
+    if amount <= 0:
+        raise ValueError("Amount must be positive")
+    return amount
+
+
+class LedgerService:
+    @staticmethod
+    def wallet_accounts(wallets, create=True):
+        """{wallet_id: {'available': account, 'held': account}}, creating missing accounts unless ``create`` is False"""
+        wallets = {wallet.pk: wallet for wallet in wallets}
+        accounts = {wallet_id: {} for wallet_id in wallets}
+
+        def load():
+            for account in LedgerAccount.objects.filter(wallet_id__in=wallets):
+                accounts[account.wallet_id][account.kind] = account
+
+        load()
+        missing = [
+            LedgerAccount(wallet_id=wallet_id, kind=kind, currency=wallets[wallet_id].currency)
+            for wallet_id, kinds in accounts.items() for kind in LedgerAccount.WALLET_KINDS if kind not in kinds
+        ]
+        if missing and create:
+            LedgerAccount.objects.bulk_create(missing, ignore_conflicts=True)
+            load()
+        return accounts
+
+    @staticmethod
+    def accounts_of(wallet):
+        cached = getattr(wallet, '_ledger_accounts', None)
+        if cached is None:
+            cached = LedgerService.wallet_accounts([wallet], create=False)[wallet.pk]
+            if len(cached) < len(LedgerAccount.WALLET_KINDS):
+                # Accounts created now may still be rolled back with the operation, so they are not cached
+                return LedgerService.wallet_accounts([wallet])[wallet.pk]
+            wallet._ledger_accounts = cached
+        return cached
+
+    @staticmethod
+    def system_account(kind, currency='INR'):
+        account = LedgerAccount.objects.filter(wallet=None, kind=kind, currency=currency).first()
+        if account is None:
+            LedgerAccount.objects.bulk_create([LedgerAccount(kind=kind, currency=currency)], ignore_conflicts=True)
+            account = LedgerAccount.objects.get(wallet=None, kind=kind, currency=currency)
+        return account
+
+    @staticmethod
+    def balances(account_ids):
+        """{account_id: balance}: the latest snapshot plus the postings after it, in one query"""
+        latest = AccountSnapshot.objects.filter(account=OuterRef('pk')).order_by('-last_posting_id')
+        tail = (
+            Posting.objects.filter(
+                account=OuterRef('pk'),
+                id__gt=Coalesce(Subquery(
+                    AccountSnapshot.objects.filter(account=OuterRef('account'))
+                    .order_by('-last_posting_id').values('last_posting_id')[:1]
+                ), Value(0)),
+            )
+            .order_by().values('account').annotate(total=Sum('amount')).values('total')
+        )
+        rows = LedgerAccount.objects.filter(pk__in=account_ids).annotate(
+            snapshot=_money(Subquery(latest.values('balance')[:1])),
+            tail=_money(Subquery(tail)),
+        ).values_list('pk', 'snapshot', 'tail')
+        balances = {account_id: ZERO for account_id in account_ids}
+        balances.update({account_id: (snapshot + tail).quantize(CENT) for account_id, snapshot, tail in rows})
+        return balances
+
+    @staticmethod
+    def wallet_balances(wallet):
+        """{'available': ..., 'held': ...}; a wallet that never moved money has no accounts yet"""
+        accounts = getattr(wallet, '_ledger_accounts', None) or LedgerService.wallet_accounts([wallet], create=False)[wallet.pk]
+        balances = LedgerService.balances([account.pk for account in accounts.values()])
+        return {kind: balances[accounts[kind].pk] if kind in accounts else ZERO for kind in LedgerAccount.WALLET_KINDS}
+
+    @staticmethod
+    @contextmanager
+    def atomic():
+        """
+        ``transaction.atomic()`` for ledger writes.  On SQLite an outermost
+        block takes the write lock up front with a no-op UPDATE: a transaction
+        that reads balances first and upgrades later fails with "database is
+        locked" under contention instead of waiting its turn.
+        """
+        with transaction.atomic():
+            if connection.vendor == 'sqlite':
+                with connection.cursor() as cursor:
+                    table = connection.ops.quote_name(LedgerAccount._meta.db_table)
+                    cursor.execute(f'UPDATE {table} SET id = id WHERE 0')
+            yield
+
+    @staticmethod
+    def lock(account_ids):
+        """Lock the accounts until commit, always in id order so concurrent debits cannot deadlock"""
+        list(LedgerAccount.objects.select_for_update().filter(pk__in=account_ids).order_by('pk').values_list('pk'))
+
+    @staticmethod
+    def post_many(entries):
+        """
+        Insert journal entries with one bulk INSERT per table.  Each entry is a
+        dict with ``entry_type``, ``postings`` [(account, amount)] and optional
+        ``reference_id``, ``description``, ``metadata`` and ``lines``: the statement lines,
+        [(wallet, transaction_type, amount, status, description)].
+        Returns the JournalEntry rows with ``wallet_transactions_created`` set.
+        """
+        for entry in entries:
+            if sum(amount for _, amount in entry['postings']) != 0:
+                raise ValueError("Journal entry postings must sum to zero")
+
+        journal = JournalEntry.objects.bulk_create([
+            JournalEntry(
+                entry_type=entry['entry_type'],
+                reference_id=entry.get('reference_id') or WalletTransaction.generate_reference_id(),
+                description=entry.get('description', ''),
+                metadata=entry.get('metadata') or {},
+            )
+            for entry in entries
+        ])
+        Posting.objects.bulk_create([
+            Posting(entry=row, account=account, amount=amount, created_at=row.created_at)
+            for row, entry in zip(journal, entries) for account, amount in entry['postings'] if amount
+        ])
+        lines = []
+        for row, entry in zip(journal, entries):
+            row.wallet_transactions_created = [
+                WalletTransaction(
+                    wallet=wallet, amount=amount, transaction_type=transaction_type, status=status,
+                    reference_id=WalletTransaction.generate_reference_id(), description=description,
+                    metadata=entry.get('metadata') or {}, journal_entry=row,
+                )
+                for wallet, transaction_type, amount, status, description in entry.get('lines', ())
+            ]
+            lines.extend(row.wallet_transactions_created)
+        WalletTransaction.objects.bulk_create(lines)
+        return journal
+
+    @staticmethod
+    def _post(entry_type, postings, lines, description, metadata):
+        entry = LedgerService.post_many([{
+            'entry_type': entry_type, 'postings': postings, 'lines': lines,
+            'description': description, 'metadata': metadata,
+        }])[0]
+        for wallet, *_ in lines:
+            wallet._balances = None
+        return entry.wallet_transactions_created
+
+    @staticmethod
+    def _debit(account, amount, message):
+        LedgerService.lock([account.pk])
+        if LedgerService.balances([account.pk])[account.pk] < amount:
+            raise ValueError(message)
+
+    @staticmethod
+    def deposit(wallet, amount, description="Deposit", metadata=None):
+        """Credit the wallet from outside the platform; returns its statement line"""
+        amount = _amount(amount)
+        with LedgerService.atomic():
+            available = LedgerService.accounts_of(wallet)['available']
+            external = LedgerService.system_account('external', wallet.currency)
+            return LedgerService._post(
+                'deposit', [(external, -amount), (available, amount)],
+                [(wallet, 'deposit', amount, 'completed', description)], description, metadata,
+            )[0]
+
+    @staticmethod
+    def withdraw(wallet, amount, description="Withdrawal", metadata=None):
+        amount = _amount(amount)
+        with LedgerService.atomic():
+            available = LedgerService.accounts_of(wallet)['available']
+            LedgerService._debit(available, amount, "Insufficient funds")
+            external = LedgerService.system_account('external', wallet.currency)
+            return LedgerService._post(
+                'withdrawal', [(available, -amount), (external, amount)],
+                [(wallet, 'withdrawal', amount, 'completed', description)], description, metadata,
+            )[0]
+
+    @staticmethod
+    def hold(wallet, amount, description="Payment hold", metadata=None):
+        amount = _amount(amount)
+        with LedgerService.atomic():
+            accounts = LedgerService.accounts_of(wallet)
+            LedgerService._debit(accounts['available'], amount, "Insufficient funds")
+            return LedgerService._post(
+                'hold', [(accounts['available'], -amount), (accounts['held'], amount)],
+                [(wallet, 'hold', amount, 'pending', description)], description, metadata,
+            )[0]
+
+    @staticmethod
+    def release_hold(wallet, amount, description="Hold released", metadata=None):
+        amount = _amount(amount)
+        with LedgerService.atomic():
+            accounts = LedgerService.accounts_of(wallet)
+            LedgerService._debit(accounts['held'], amount, "Hold amount exceeds held balance")
+            return LedgerService._post(
+                'release', [(accounts['held'], -amount), (accounts['available'], amount)],
+                [(wallet, 'release', amount, 'completed', description)], description, metadata,
+            )[0]
+
+    @staticmethod
+    def transfer(from_wallet, to_wallet, amount, description="Wallet transfer", metadata=None):
+        """Move funds between wallets as one entry; returns the (sender, receiver) statement lines"""
+        amount = _amount(amount)
+        with LedgerService.atomic():
+            accounts = LedgerService.wallet_accounts([from_wallet, to_wallet])
+            source, target = accounts[from_wallet.pk]['available'], accounts[to_wallet.pk]['available']
+            # Only the debited account is locked; the credit is a plain insert
+            LedgerService._debit(source, amount, "Insufficient funds")
+            return tuple(LedgerService._post(
+                'transfer', [(source, -amount), (target, amount)],
+                [
+                    (from_wallet, 'withdrawal', amount, 'completed', f"Transfer to {to_wallet.user.username}"),
+                    (to_wallet, 'deposit', amount, 'completed', f"Transfer from {from_wallet.user.username}"),
+                ],
+                description, metadata,
+            ))
+
+    @staticmethod
+    def committed_watermark(lag=SNAPSHOT_LAG):
+        """
+        The highest posting id at or below which every posting is committed.
+        PostgreSQL allocates ids at insert, so an open transaction may still
+        commit a lower id than one already visible: SHARE mode waits for
+        every transaction that wrote postings to end, and holds off new
+        ones only while Max(id) is read.  SQLite runs one writer at a time,
+        so its committed Max(id) already is the watermark.  Other backends
+        fall back to the postings older than ``lag``.
+        """
+        postings = Posting.objects.all()
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute(f'LOCK TABLE {connection.ops.quote_name(Posting._meta.db_table)} IN SHARE MODE')
+            elif connection.vendor != 'sqlite':
+                postings = postings.filter(created_at__lte=timezone.now() - lag)
+            return postings.aggregate(last=Max('id'))['last']
+
+    @staticmethod
+    def snapshot(lag=SNAPSHOT_LAG):
+        """Checkpoint every account with postings since its last snapshot; returns the number written"""
+        horizon = LedgerService.committed_watermark(lag)
+        if horizon is None:
+            return 0
+        since = Coalesce(Subquery(
+            AccountSnapshot.objects.filter(account=OuterRef('account'))
+            .order_by('-last_posting_id').values('last_posting_id')[:1]
+        ), Value(0))
+        tails = list(
+            Posting.objects.filter(id__lte=horizon).annotate(since=since).filter(id__gt=F('since'))
+            .order_by().values('account').annotate(total=Sum('amount'), last=Max('id'))
+        )
+        if not tails:
+            return 0
+
+        latest = AccountSnapshot.objects.filter(account=OuterRef('pk')).order_by('-last_posting_id')
+        previous = dict(
+            LedgerAccount.objects.filter(pk__in=[tail['account'] for tail in tails])
+            .annotate(snapshot=_money(Subquery(latest.values('balance')[:1])))
+            .values_list('pk', 'snapshot')
+        )
+        AccountSnapshot.objects.bulk_create([
+            AccountSnapshot(
+                account_id=tail['account'], balance=(previous[tail['account']] + tail['total']).quantize(CENT),
+                last_posting_id=tail['last'],
+            )
+            for tail in tails
+        ], ignore_conflicts=True)
+        return len(tails)
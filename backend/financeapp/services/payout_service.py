@@ -0,0 +1,174 @@
+"""
+Bulk payouts: many (from wallet, to wallet, amount, reference) items paid
+with a handful of queries per chunk instead of one transfer each.
+
+Within a chunk every debited account is locked up front in id order, so two
+batches touching the same wallets can never deadlock; balances are read
+once and netted in memory as items are applied, and all journal entries,
+postings and statement lines go in with one bulk INSERT per table.  Items
+that cannot be paid yet land in ``PayoutRetry`` and are retried with
+backoff by ``financeapp.tasks.retry_payouts``.
+"""
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.db import DatabaseError
+from django.utils import timezone
+
+from ..models import JournalEntry, PayoutRetry, Wallet
+from .ledger_service import LedgerService
+
+CHUNK_SIZE = 200
+MAX_ATTEMPTS = 5
+RETRY_BACKOFF = timedelta(minutes=5)
+
+
+def _entry_reference(reference):
+    return f"PAYOUT-{reference}"
+
+
+class PayoutService:
+    @staticmethod
+    def normalize(items):
+        """
+        Split raw (from, to, amount, reference) items into payable ones and
+        {reference: reason} for those that can never be paid.
+        """
+        payable, rejected, seen = [], {}, set()
+        for from_id, to_id, amount, reference in items:
+            reference = str(reference)
+            try:
+                from_id, to_id = uuid.UUID(str(from_id)), uuid.UUID(str(to_id))
+                amount = Decimal(str(amount))
+            except (ValueError, InvalidOperation):
+                rejected[reference] = "Malformed payout"
+                continue
+            if reference in seen:
+                rejected[reference] = "Duplicate reference in batch"
+            elif len(_entry_reference(reference)) > 100:
+                rejected[reference] = "Reference too long"
+            elif amount <= 0 or amount != amount.quantize(Decimal('0.01')):
+                rejected[reference] = "Amount must be positive with at most two decimals"
+            elif from_id == to_id:
+                rejected[reference] = "Cannot pay a wallet into itself"
+            else:
+                payable.append((from_id, to_id, amount, reference))
+            seen.add(reference)
+        return payable, rejected
+
+    @staticmethod
+    def pay(items, chunk_size=CHUNK_SIZE):
+        """
+        Pay ``items`` in chunked transactions.  Returns the references that
+        were ``paid``, ``skipped`` (paid before) and {reference: reason} for
+        those ``rejected`` outright or ``queued`` for retry.
+        """
+        payable, rejected = PayoutService.normalize(items)
+        result = {'paid': [], 'skipped': [], 'rejected': rejected, 'queued': {}}
+
+        done = set(
+            JournalEntry.objects.filter(reference_id__in=[_entry_reference(item[3]) for item in payable])
+            .values_list('reference_id', flat=True)
+        )
+        wallets = Wallet.objects.select_related('user').in_bulk(
+            {wallet_id for item in payable for wallet_id in item[:2]}
+        )
+        pending = []
+        for item in payable:
+            from_id, to_id, _, reference = item
+            if _entry_reference(reference) in done:
+                result['skipped'].append(reference)
+            elif not (from_id in wallets and to_id in wallets):
+                rejected[reference] = "Unknown wallet"
+            elif not (wallets[from_id].is_active and wallets[to_id].is_active):
+                rejected[reference] = "Inactive wallet"
+            else:
+                pending.append(item)
+        PayoutRetry.objects.filter(reference__in=result['skipped'] + list(rejected)).delete()
+
+        for start in range(0, len(pending), chunk_size):
+            chunk = pending[start:start + chunk_size]
+            try:
+                with LedgerService.atomic():
+                    paid, short = PayoutService._pay_chunk(chunk, wallets)
+                    PayoutService._queue(short, "Insufficient funds")
+                    PayoutRetry.objects.filter(reference__in=[item[3] for item in paid]).delete()
+            except DatabaseError as e:
+                # The whole chunk rolled back; every item in it is tried again later
+                paid, short = [], []
+                PayoutService._queue(chunk, f"Database error: {e}")
+                result['queued'].update((item[3], f"Database error: {e}") for item in chunk)
+            result['paid'].extend(item[3] for item in paid)
+            result['queued'].update((item[3], "Insufficient funds") for item in short)
+        return result
+
+    @staticmethod
+    def _pay_chunk(chunk, wallets):
+        """Apply one chunk in the caller's transaction; returns (paid items, items short of funds)"""
+        accounts = LedgerService.wallet_accounts({wallets[wallet_id] for item in chunk for wallet_id in item[:2]})
+        available = {wallet_id: kinds['available'] for wallet_id, kinds in accounts.items()}
+        sources = {available[item[0]].pk for item in chunk}
+        LedgerService.lock(sources)
+        balances = LedgerService.balances(sources)
+        # Net effect of the items applied so far on every account touched
+        deltas = defaultdict(Decimal)
+
+        paid, short, entries = [], [], []
+        for item in chunk:
+            from_id, to_id, amount, reference = item
+            source, target = available[from_id], available[to_id]
+            if balances[source.pk] + deltas[source.pk] < amount:
+                short.append(item)
+                continue
+            deltas[source.pk] -= amount
+            deltas[target.pk] += amount
+            sender, receiver = wallets[from_id], wallets[to_id]
+            metadata = {'payout_reference': reference}
+            entries.append({
+                'entry_type': 'payment',
+                'reference_id': _entry_reference(reference),
+                'description': f"Payout {reference}",
+                'metadata': metadata,
+                'postings': [(source, -amount), (target, amount)],
+                'lines': [
+                    (sender, 'payment', amount, 'completed', f"Payout to {receiver.user.username}"),
+                    (receiver, 'deposit', amount, 'completed', f"Payout from {sender.user.username}"),
+                ],
+            })
+            paid.append(item)
+        if entries:
+            LedgerService.post_many(entries)
+        return paid, short
+
+    @staticmethod
+    def _queue(items, error):
+        """Add failed items to the retry queue, or push back the ones already in it"""
+        if not items:
+            return
+        now = timezone.now()
+        queued = PayoutRetry.objects.in_bulk([item[3] for item in items], field_name='reference')
+        retries = []
+        for from_id, to_id, amount, reference in items:
+            retry = queued.get(reference)
+            if retry is None:
+                retries.append(PayoutRetry(
+                    reference=reference, from_wallet_id=from_id, to_wallet_id=to_id, amount=amount,
+                    last_error=error, next_attempt_at=now + RETRY_BACKOFF,
+                ))
+            else:
+                retry.attempts += 1
+                retry.last_error = error
+                retry.next_attempt_at = now + RETRY_BACKOFF * 2 ** (retry.attempts - 1)
+        PayoutRetry.objects.bulk_create(retries)
+        PayoutRetry.objects.bulk_update(queued.values(), ['attempts', 'last_error', 'next_attempt_at'])
+
+    @staticmethod
+    def retry_due(limit=CHUNK_SIZE * 5):
+        """Pay the queued items whose backoff has passed; items out of attempts stay for manual review"""
+        due = PayoutRetry.objects.filter(attempts__lt=MAX_ATTEMPTS, next_attempt_at__lte=timezone.now()).order_by(
+            'next_attempt_at'
+        )[:limit]
+        items = [(retry.from_wallet_id, retry.to_wallet_id, retry.amount, retry.reference) for retry in due]
+        return PayoutService.pay(items) if items else None
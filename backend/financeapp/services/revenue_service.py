@@ -0,0 +1,230 @@
+"""
+Revenue and commission reports served from ``DailyRevenueRollup`` buckets.
+
+Every Transaction and Commission write moves its amounts between (day,
+currency, payment type) buckets with ``F()`` updates.  A report for any
+range reads the buckets of the whole local days inside it and sums only
+the raw rows of the partial days at its edges, both grouped by the
+database.
+"""
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from ..models import Commission, DailyRevenueRollup, Transaction
+
+ZERO = Decimal('0.00')
+FIELDS = ('transaction_count', 'gross_amount', 'platform_fee', 'commission_count', 'commission_amount')
+
+
+def _midnight(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _bounds(start, end):
+    """
+    Split [start, end] into the whole local days the rollups answer and the
+    half-open datetime ranges raw rows must cover.  Dates are whole days;
+    datetimes are exact, with ``end`` inclusive as the old filters were.
+    """
+    if isinstance(start, date) and not isinstance(start, datetime):
+        start = _midnight(start)
+    if isinstance(end, date) and not isinstance(end, datetime):
+        stop = _midnight(end + timedelta(days=1))
+    else:
+        stop = end + timedelta(microseconds=1) if end is not None else None
+
+    first_day = None
+    if start is not None:
+        first_day = timezone.localdate(start)
+        if start != _midnight(first_day):
+            first_day += timedelta(days=1)
+    last_day = timezone.localdate(stop) - timedelta(days=1) if stop is not None else None
+
+    if first_day is not None and last_day is not None and first_day > last_day:
+        return None, [(start, stop)]
+    raw = []
+    if start is not None and start < _midnight(first_day):
+        raw.append((start, _midnight(first_day)))
+    if stop is not None and _midnight(last_day + timedelta(days=1)) < stop:
+        raw.append((_midnight(last_day + timedelta(days=1)), stop))
+    return (first_day, last_day), raw
+
+
+class RevenueService:
+    @staticmethod
+    def apply_deltas(deltas):
+        """Move {(day, currency, payment_type): {field: delta}} into the buckets"""
+        for (day, currency, payment_type), changes in deltas.items():
+            changes = {field: value for field, value in changes.items() if value}
+            if not changes:
+                continue
+            buckets = DailyRevenueRollup.objects.filter(day=day, currency=currency, payment_type=payment_type)
+            # Several rows may share a key; adjusting any one of them keeps the sum right
+            bucket_id = buckets.values_list('id', flat=True).first()
+            if bucket_id is not None:
+                DailyRevenueRollup.objects.filter(id=bucket_id).update(
+                    **{field: F(field) + value for field, value in changes.items()}
+                )
+            else:
+                DailyRevenueRollup.objects.create(day=day, currency=currency, payment_type=payment_type, **changes)
+
+    @staticmethod
+    def _transaction_deltas(state, sign, deltas):
+        status, created_at, currency, payment_type, amount, platform_fee = state
+        if status != 'completed' or created_at is None:
+            return
+        bucket = deltas[(timezone.localdate(created_at), currency, payment_type)]
+        bucket['transaction_count'] += sign
+        bucket['gross_amount'] += sign * Decimal(amount)
+        bucket['platform_fee'] += sign * Decimal(platform_fee)
+
+    @staticmethod
+    def record_transaction_save(txn):
+        deltas = defaultdict(lambda: defaultdict(Decimal))
+        loaded = getattr(txn, '_loaded_revenue', None)
+        current = (txn.status, txn.created_at, txn.currency, txn.payment_type, txn.amount, txn.platform_fee_amount)
+        if loaded is not None:
+            RevenueService._transaction_deltas(loaded, -1, deltas)
+            if loaded[2:4] != current[2:4]:
+                # The transaction's commission is bucketed under its currency and payment type
+                commission = Commission.objects.filter(transaction=txn).values_list('created_at', 'amount').first()
+                if commission is not None:
+                    for sign, (currency, payment_type) in ((-1, loaded[2:4]), (1, current[2:4])):
+                        bucket = deltas[(timezone.localdate(commission[0]), currency, payment_type)]
+                        bucket['commission_count'] += sign
+                        bucket['commission_amount'] += sign * commission[1]
+        RevenueService._transaction_deltas(current, 1, deltas)
+        RevenueService.apply_deltas(deltas)
+        txn._loaded_revenue = current
+
+    @staticmethod
+    def record_transaction_delete(txn):
+        deltas = defaultdict(lambda: defaultdict(Decimal))
+        loaded = getattr(txn, '_loaded_revenue', None) or (
+            txn.status, txn.created_at, txn.currency, txn.payment_type, txn.amount, txn.platform_fee_amount
+        )
+        RevenueService._transaction_deltas(loaded, -1, deltas)
+        RevenueService.apply_deltas(deltas)
+
+    @staticmethod
+    def _commission_deltas(state, sign, deltas):
+        transaction_id, created_at, amount = state
+        key = Transaction.objects.filter(pk=transaction_id).values_list('currency', 'payment_type').first()
+        if key is None or created_at is None:
+            return
+        bucket = deltas[(timezone.localdate(created_at), *key)]
+        bucket['commission_count'] += sign
+        bucket['commission_amount'] += sign * Decimal(amount)
+
+    @staticmethod
+    def record_commission_save(commission):
+        deltas = defaultdict(lambda: defaultdict(Decimal))
+        loaded = getattr(commission, '_loaded_revenue', None)
+        current = (commission.transaction_id, commission.created_at, commission.amount)
+        if loaded is not None:
+            RevenueService._commission_deltas(loaded, -1, deltas)
+        RevenueService._commission_deltas(current, 1, deltas)
+        RevenueService.apply_deltas(deltas)
+        commission._loaded_revenue = current
+
+    @staticmethod
+    def record_commission_delete(commission):
+        deltas = defaultdict(lambda: defaultdict(Decimal))
+        loaded = getattr(commission, '_loaded_revenue', None) or (
+            commission.transaction_id, commission.created_at, commission.amount
+        )
+        RevenueService._commission_deltas(loaded, -1, deltas)
+        RevenueService.apply_deltas(deltas)
+
+    @staticmethod
+    def backfill(batch_size=1000):
+        """Rebuild every bucket from the transactions and commissions tables; returns the number written"""
+        buckets = defaultdict(lambda: dict.fromkeys(FIELDS, 0))
+        transactions = (
+            Transaction.objects.filter(status='completed')
+            .annotate(day=TruncDate('created_at'))
+            .order_by()
+            .values_list('day', 'currency', 'payment_type')
+            .annotate(count=Count('id'), gross=Sum('amount'), fee=Sum('platform_fee_amount'))
+        )
+        for day, currency, payment_type, count, gross, fee in transactions.iterator(chunk_size=batch_size):
+            buckets[(day, currency, payment_type)].update(transaction_count=count, gross_amount=gross, platform_fee=fee)
+        commissions = (
+            Commission.objects.annotate(day=TruncDate('created_at'))
+            .order_by()
+            .values_list('day', 'transaction__currency', 'transaction__payment_type')
+            .annotate(count=Count('id'), total=Sum('amount'))
+        )
+        for day, currency, payment_type, count, total in commissions.iterator(chunk_size=batch_size):
+            buckets[(day, currency, payment_type)].update(commission_count=count, commission_amount=total)
+
+        rows = [
+            DailyRevenueRollup(day=day, currency=currency, payment_type=payment_type, **values)
+            for (day, currency, payment_type), values in buckets.items()
+        ]
+        with transaction.atomic():
+            DailyRevenueRollup.objects.all().delete()
+            DailyRevenueRollup.objects.bulk_create(rows, batch_size=batch_size)
+        return len(rows)
+
+    @staticmethod
+    def report(start=None, end=None, currency=None, payment_type=None):
+        """
+        Totals per (currency, payment_type) for [start, end]: a list of dicts
+        with every rollup field, sorted by currency then payment type.
+        """
+        days, raw = _bounds(start, end)
+        totals = defaultdict(lambda: dict.fromkeys(FIELDS, 0))
+
+        def add(rows):
+            for row in rows:
+                bucket = totals[(row.pop('currency'), row.pop('payment_type'))]
+                for field, value in row.items():
+                    bucket[field] += value or 0
+
+        if days is not None:
+            rollups = DailyRevenueRollup.objects.all()
+            if days[0] is not None:
+                rollups = rollups.filter(day__gte=days[0])
+            if days[1] is not None:
+                rollups = rollups.filter(day__lte=days[1])
+            if currency:
+                rollups = rollups.filter(currency=currency)
+            if payment_type:
+                rollups = rollups.filter(payment_type=payment_type)
+            add(rollups.order_by().values('currency', 'payment_type').annotate(
+                **{field: Sum(field) for field in FIELDS}
+            ))
+
+        for lower, upper in raw:
+            transactions = Transaction.objects.filter(status='completed', created_at__gte=lower)
+            commissions = Commission.objects.filter(created_at__gte=lower)
+            if upper is not None:
+                transactions = transactions.filter(created_at__lt=upper)
+                commissions = commissions.filter(created_at__lt=upper)
+            if currency:
+                transactions = transactions.filter(currency=currency)
+                commissions = commissions.filter(transaction__currency=currency)
+            if payment_type:
+                transactions = transactions.filter(payment_type=payment_type)
+                commissions = commissions.filter(transaction__payment_type=payment_type)
+            add(transactions.order_by().values('currency', 'payment_type').annotate(
+                transaction_count=Count('id'), gross_amount=Sum('amount'), platform_fee=Sum('platform_fee_amount'),
+            ))
+            add(commissions.order_by().values(
+                currency=F('transaction__currency'), payment_type=F('transaction__payment_type'),
+            ).annotate(commission_count=Count('id'), commission_amount=Sum('amount')))
+
+        return [
+            {'currency': key[0], 'payment_type': key[1], **{
+                field: value if field.endswith('count') else Decimal(value).quantize(Decimal('0.01'))
+                for field, value in values.items()
+            }}
+            for key, values in sorted(totals.items())
+        ]
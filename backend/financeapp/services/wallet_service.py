@@ -1,7 +1,7 @@
-from decimal import Decimal
 from django.db import transaction
 from django.core.exceptions import ValidationError
 from ..models import Wallet, WalletTransaction
+from .ledger_service import LedgerService
 import uuid
 
 class WalletService:
@@ -20,59 +20,20 @@ class WalletService:
         return wallet
 
     @staticmethod
-    @transaction.atomic
     def process_deposit(wallet, amount, metadata=None):
-        """Process a deposit to the wallet"""
-        if amount <= 0:
-            raise ValidationError("Amount must be positive")
-
+        """Process a deposit to the wallet; returns its transaction record"""
         try:
-            # Create transaction record
-            transaction = WalletTransaction.objects.create(
-                wallet=wallet,
-                amount=amount,
-                transaction_type='deposit',
-                reference_id=WalletService.generate_reference_id(),
-                metadata=metadata or {}
-            )
-
-            # Update wallet balance
-            wallet.deposit(amount)
-            transaction.status = 'completed'
-            transaction.save()
-
-            return transaction
-        except Exception as e:
-            raise ValidationError(f"Deposit failed: {str(e)}")
+            return LedgerService.deposit(wallet, amount, metadata=metadata)
+        except ValueError as e:
+            raise ValidationError(str(e))
 
     @staticmethod
-    @transaction.atomic
     def process_withdrawal(wallet, amount, metadata=None):
-        """Process a withdrawal from the wallet"""
-        if amount <= 0:
-            raise ValidationError("Amount must be positive")
-
-        if wallet.balance < amount:
-            raise ValidationError("Insufficient funds")
-
+        """Process a withdrawal from the wallet; returns its transaction record"""
         try:
-            # Create transaction record
-            transaction = WalletTransaction.objects.create(
-                wallet=wallet,
-                amount=amount,
-                transaction_type='withdrawal',
-                reference_id=WalletService.generate_reference_id(),
-                metadata=metadata or {}
-            )
-
-            # Update wallet balance
-            wallet.withdraw(amount)
-            transaction.status = 'completed'
-            transaction.save()
-
-            return transaction
-        except Exception as e:
-            raise ValidationError(f"Withdrawal failed: {str(e)}")
+            return LedgerService.withdraw(wallet, amount, metadata=metadata)
+        except ValueError as e:
+            raise ValidationError(str(e))
 
     @staticmethod
     def get_balance(wallet):
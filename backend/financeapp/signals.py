@@ -0,0 +1,33 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Commission, CommissionTier, Transaction
+from .models.commission import SpecialCommissionRate
+from .services.commission_rate_service import CommissionRateService
+from .services.revenue_service import RevenueService
+
+
+@receiver([post_save, post_delete], sender=CommissionTier)
+@receiver([post_save, post_delete], sender=SpecialCommissionRate)
+def commission_rates_changed(sender, **kwargs):
+    CommissionRateService.invalidate()
+
+
+@receiver(post_save, sender=Transaction)
+def update_revenue_rollup(sender, instance, **kwargs):
+    RevenueService.record_transaction_save(instance)
+
+
+@receiver(post_delete, sender=Transaction)
+def remove_from_revenue_rollup(sender, instance, **kwargs):
+    RevenueService.record_transaction_delete(instance)
+
+
+@receiver(post_save, sender=Commission)
+def update_commission_rollup(sender, instance, **kwargs):
+    RevenueService.record_commission_save(instance)
+
+
+@receiver(post_delete, sender=Commission)
+def remove_commission_from_rollup(sender, instance, **kwargs):
+    RevenueService.record_commission_delete(instance)
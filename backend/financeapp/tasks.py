@@ -0,0 +1,26 @@
+from celery import shared_task
+from .services.ledger_service import LedgerService
+from .services.payout_service import PayoutService
+
+
+@shared_task
+def snapshot_ledger_balances():
+    """
+    Checkpoint ledger account balances so balance reads only sum the
+    postings made since the last run.
+    """
+    return LedgerService.snapshot()
+
+
+@shared_task
+def process_payouts(items):
+    """
+    Pay a batch of [from_wallet_id, to_wallet_id, amount, reference] items;
+    whatever cannot be paid now is queued for ``retry_payouts``.
+    """
+    return PayoutService.pay(items)
+
+
+@shared_task
+def retry_payouts():
+    return PayoutService.retry_due()
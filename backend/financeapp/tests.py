@@ -1,3 +1,379 @@
-from django.test import TestCase
+import json
+import random
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection
+from django.db.models import Sum
+from asgiref.sync import sync_to_async
+from django.test import AsyncClient, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from django.utils import timezone
+
+from core.models import User
+from .models import AccountSnapshot, Commission, CommissionTier, DailyRevenueRollup, Transaction, JournalEntry, PayoutRetry, Posting, Wallet, WalletTransaction
+from .models.commission import SpecialCommissionRate
+from .services import commission_rate_service as rate_service
+from .services.commission_rate_service import CommissionRateService
+from .services.commission_service import CommissionService
+from .services import ledger_service
+from .services.ledger_service import LedgerService
+from .services.payout_service import PayoutService
+from .services.revenue_service import RevenueService
+from .services.wallet_service import WalletService
+
+
+class WalletConditionalUpdateTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='client', password='pass', role='client')
+        self.wallet = Wallet.objects.create(user=self.user)
+        self.wallet.deposit(Decimal('100.00'))
+
+    def test_stale_instances_do_not_lose_updates(self):
+        other = Wallet.objects.get(pk=self.wallet.pk)
+        self.assertEqual(self.wallet.deposit(50), Decimal('150.00'))
+        # ``other`` was loaded before the deposit
+        self.assertEqual(other.withdraw(120), Decimal('30.00'))
+        self.assertEqual(other.hold(30), Decimal('0.00'))
+
+        self.wallet.refresh_from_db()
+        self.assertEqual((self.wallet.balance, self.wallet.hold_balance), (Decimal('0.00'), Decimal('30.00')))
+
+    def test_failed_condition_changes_nothing(self):
+        with self.assertRaisesMessage(ValueError, "Insufficient funds"):
+            self.wallet.withdraw(101)
+        with self.assertRaisesMessage(ValueError, "Hold amount exceeds held balance"):
+            self.wallet.release_hold(1)
+
+        self.wallet.refresh_from_db()
+        self.assertEqual((self.wallet.balance, self.wallet.hold_balance), (Decimal('100.00'), Decimal('0.00')))
+        self.assertEqual(WalletTransaction.objects.count(), 1)
+
+    def test_transfer_moves_funds_atomically(self):
+        other = Wallet.objects.create(user=User.objects.create_user(username='other', password='pass'))
+        with self.assertRaises(ValueError):
+            self.wallet.transfer(other, 500)
+        self.wallet.transfer(other, 40)
+
+        self.assertEqual(Wallet.objects.get(pk=self.wallet.pk).balance, Decimal('60.00'))
+        self.assertEqual(Wallet.objects.get(pk=other.pk).balance, Decimal('40.00'))
+
+
+class LedgerTests(TestCase):
+    def setUp(self):
+        self.wallet = Wallet.objects.create(user=User.objects.create_user(username='client', password='pass'))
+        self.other = Wallet.objects.create(user=User.objects.create_user(username='other', password='pass'))
+
+    def test_every_entry_balances(self):
+        self.wallet.deposit(200)
+        self.wallet.hold(50)
+        self.wallet.release_hold(20)
+        self.wallet.transfer(self.other, 70)
+        self.other.withdraw(10)
+
+        for entry in JournalEntry.objects.all():
+            self.assertEqual(entry.postings.aggregate(total=Sum('amount'))['total'], 0)
+        self.assertEqual(JournalEntry.objects.get(entry_type='transfer').wallet_transactions.count(), 2)
+        self.assertEqual(
+            (self.wallet.balance, self.wallet.hold_balance, self.other.balance),
+            (Decimal('100.00'), Decimal('30.00'), Decimal('60.00')),
+        )
+
+    def test_service_writes_one_transaction_record(self):
+        line = WalletService.process_deposit(self.wallet, Decimal('25.00'), metadata={'source': 'upi'})
+        self.assertEqual((line.status, line.metadata), ('completed', {'source': 'upi'}))
+        self.assertEqual(WalletTransaction.objects.filter(wallet=self.wallet).count(), 1)
+
+    def test_snapshot_plus_tail_is_the_balance(self):
+        self.wallet.deposit(100)
+        self.wallet.withdraw(30)
+        self.assertEqual(LedgerService.snapshot(), 2)
+        self.assertFalse(LedgerService.snapshot())
+
+        self.wallet.deposit(5)
+        self.wallet.refresh_from_db()
+        available = self.wallet.ledger_accounts.get(kind='available')
+        self.assertEqual(AccountSnapshot.objects.get(account=available).balance, Decimal('70.00'))
+        self.assertEqual(Posting.objects.filter(account=available).count(), 3)
+        self.assertEqual(self.wallet.balance, Decimal('75.00'))
+
+    def test_ledger_writes_take_the_sqlite_write_lock_first(self):
+        self.wallet.deposit(100)
+        for operation in (
+            lambda: self.wallet.withdraw(10),
+            lambda: self.wallet.transfer(self.other, 10),
+            lambda: PayoutService.pay([(self.wallet.pk, self.other.pk, 5, 'P-1')]),
+        ):
+            with CaptureQueriesContext(connection) as queries:
+                operation()
+            sql = [query['sql'] for query in queries]
+            begin = next(index for index, statement in enumerate(sql) if statement.startswith('SAVEPOINT'))
+            self.assertEqual(sql[begin + 1], 'UPDATE "financeapp_ledgeraccount" SET id = id WHERE 0')
+        # Everything else keeps SQLite's default deferred transactions
+        self.assertIsNone(connection.settings_dict['OPTIONS'].get('transaction_mode'))
+
+    def test_watermark_only_covers_committed_postings(self):
+        self.wallet.deposit(100)
+        # SQLite has a single writer, so everything visible is committed
+        self.assertEqual(LedgerService.committed_watermark(), Posting.objects.latest('id').id)
+        # Backends without a watermark wait out the lag instead
+        with mock.patch.object(ledger_service, 'connection', mock.Mock(vendor='oracle')):
+            self.assertIsNone(LedgerService.committed_watermark())
+            self.assertEqual(LedgerService.snapshot(), 0)
+
+
+class PayoutServiceTests(TestCase):
+    def setUp(self):
+        self.client_wallet, self.alice, self.bob = (
+            Wallet.objects.create(user=User.objects.create_user(username=name, password='pass'))
+            for name in ('client', 'alice', 'bob')
+        )
+        self.client_wallet.deposit(100)
+
+    def balances(self):
+        return [Wallet.objects.get(pk=wallet.pk).balance for wallet in (self.client_wallet, self.alice, self.bob)]
+
+    def test_pays_batch_netting_balances_in_order(self):
+        items = [
+            (self.client_wallet.pk, self.alice.pk, '80.00', 'm-1'),
+            # Only payable because alice's first payout lands earlier in the same chunk
+            (self.alice.pk, self.bob.pk, '30.00', 'm-2'),
+            (str(self.client_wallet.pk), self.bob.pk, 50, 'm-3'),
+            (self.client_wallet.pk, self.bob.pk, '-5', 'm-4'),
+        ]
+        with self.assertNumQueries(17):
+            result = PayoutService.pay(items)
+
+        self.assertEqual(result['paid'], ['m-1', 'm-2'])
+        self.assertEqual(list(result['queued']), ['m-3'])
+        self.assertEqual(list(result['rejected']), ['m-4'])
+        self.assertEqual(self.balances(), [Decimal('20.00'), Decimal('50.00'), Decimal('30.00')])
+        self.assertEqual(WalletTransaction.objects.filter(journal_entry__entry_type='payment').count(), 4)
+
+        # Paying the same batch again changes nothing
+        self.assertEqual(PayoutService.pay(items[:2])['skipped'], ['m-1', 'm-2'])
+        self.assertEqual(self.balances(), [Decimal('20.00'), Decimal('50.00'), Decimal('30.00')])
+
+    def test_queued_items_are_paid_once_funds_arrive(self):
+        PayoutService.pay([(self.client_wallet.pk, self.alice.pk, 150, 'm-1')])
+        retry = PayoutRetry.objects.get()
+        self.assertEqual((retry.reference, retry.attempts, retry.last_error), ('m-1', 1, "Insufficient funds"))
+
+        PayoutRetry.objects.update(next_attempt_at=retry.created_at)
+        PayoutService.retry_due()
+        self.assertEqual(PayoutRetry.objects.get().attempts, 2)
+        self.assertGreater(PayoutRetry.objects.get().next_attempt_at, retry.next_attempt_at)
+
+        self.client_wallet.deposit(50)
+        PayoutRetry.objects.update(next_attempt_at=retry.created_at)
+        self.assertEqual(PayoutService.retry_due()['paid'], ['m-1'])
+        self.assertFalse(PayoutRetry.objects.exists())
+        self.assertEqual(self.balances(), [Decimal('0.00'), Decimal('150.00'), Decimal('0.00')])
+
+
+class CommissionRateServiceTests(TestCase):
+    def setUp(self):
+        self.freelancer = User.objects.create_user(username='freelancer', password='pass', role='freelancer')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.small = CommissionTier.objects.create(
+                name='Small', min_amount=0, max_amount=1000, percentage=10, flat_fee=Decimal('2.50'),
+                freelancer_discount=20,
+            )
+            # Overlaps Small; the range query always preferred the tier with the lower minimum
+            self.large = CommissionTier.objects.create(name='Large', min_amount=500, max_amount=5000, percentage='7.25')
+            CommissionTier.objects.create(name='Retired', min_amount=6000, max_amount=9000, percentage=1, is_active=False)
+
+    def test_matches_the_range_query_without_queries(self):
+        CommissionRateService.table()
+        amounts = ['0', '0.01', '499.99', '500', '1000', '1000.01', '5000', '5000.01', '6500', '-1']
+        expected = [
+            CommissionTier.objects.filter(min_amount__lte=a, max_amount__gte=a, is_active=True).order_by('min_amount').first()
+            for a in amounts
+        ]
+        with self.assertNumQueries(0):
+            self.assertEqual([CommissionTier.objects.get_for_amount(Decimal(a)) for a in amounts], expected)
+
+    def test_batch_matches_per_transaction_pricing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            special = SpecialCommissionRate.objects.create(user=self.freelancer, percentage=Decimal('3.33'), flat_fee=Decimal('1.00'))
+        rng = random.Random(7)
+        amounts = [Decimal(rng.randint(0, 700000)) / 100 for _ in range(2000)]
+        users = [rng.choice([None, self.freelancer.pk]) for _ in amounts]
+
+        for user_type in (None, 'freelancer'):
+            expected = []
+            for amount, user in zip(amounts, users):
+                tier = CommissionTier.objects.get_for_amount(amount)
+                if user:
+                    expected.append(special.calculate_commission(amount).quantize(Decimal('0.01')))
+                else:
+                    expected.append(tier.calculate_commission(amount, user_type) if tier else None)
+            with self.assertNumQueries(0):
+                self.assertEqual(CommissionRateService.calculate_commissions(amounts, users, user_type), expected)
+
+    def test_saving_a_rate_reloads_the_table(self):
+        table = CommissionRateService.table()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.small.percentage = 12
+            self.small.save()
+        self.assertIsNot(CommissionRateService.table(), table)
+        self.assertEqual(CommissionRateService.calculate_commissions([100])[0], Decimal('14.50'))
+
+    def test_edits_from_other_processes_are_picked_up(self):
+        clock = [rate_service.monotonic()]
+        with mock.patch('financeapp.services.commission_rate_service.monotonic', lambda: clock[0]):
+            table = CommissionRateService.table()
+            # Another process saved the tier: no signal or on_commit ran here
+            CommissionTier.objects.filter(pk=self.small.pk).update(percentage=12, updated_at=timezone.now())
+            self.assertIs(CommissionRateService.table(), table)
+
+            clock[0] += rate_service.CHECK_INTERVAL
+            # Version check, then the reload
+            with self.assertNumQueries(4):
+                self.assertEqual(CommissionRateService.get_tier(100).percentage, 12)
+            table = CommissionRateService.table()
+
+            # Even a change the version cannot see expires with the table
+            CommissionTier.objects.filter(pk=self.small.pk).update(percentage=11)
+            clock[0] += rate_service.CHECK_INTERVAL
+            self.assertIs(CommissionRateService.table(), table)
+            clock[0] += rate_service.MAX_AGE
+            self.assertEqual(CommissionRateService.get_tier(100).percentage, 11)
+
+    def test_transaction_commission_charges_the_tier_percentage_only(self):
+        payer = User.objects.create_user(username='client', password='pass', role='client')
+        txn = Transaction.objects.create(
+            from_user=payer, to_user=self.freelancer, amount=Decimal('200.00'), payment_type='project',
+        )
+        commission = CommissionService.calculate_commission(txn)
+        self.assertEqual((commission.amount, commission.tier), (Decimal('20.00'), self.small))
+
+
+class RevenueRollupTests(TestCase):
+    def setUp(self):
+        self.payer = User.objects.create_user(username='client', password='pass')
+        self.payee = User.objects.create_user(username='freelancer', password='pass')
+        self.start = timezone.make_aware(datetime(2026, 3, 1))
+        rng = random.Random(3)
+        # Hourly transactions over five days, each with a commission
+        for hour in range(0, 120, 7):
+            with mock.patch('django.utils.timezone.now', return_value=self.start + timedelta(hours=hour)):
+                txn = Transaction.objects.create(
+                    from_user=self.payer, to_user=self.payee, amount=Decimal(rng.randint(100, 9999)),
+                    payment_type=rng.choice(['milestone', 'task']), currency=rng.choice(['INR', 'USD']),
+                    status=rng.choice(['completed', 'completed', 'pending']),
+                    platform_fee_amount=Decimal(rng.randint(1, 99)),
+                )
+                Commission.objects.create(transaction=txn, amount=Decimal('5.00'), percentage=5)
+        self.pending = Transaction.objects.filter(status='pending').first()
+
+    def expected(self, lower, upper):
+        completed = Transaction.objects.filter(status='completed', created_at__gte=lower, created_at__lte=upper)
+        commissions = Commission.objects.filter(created_at__gte=lower, created_at__lte=upper)
+        return (
+            sum((txn.platform_fee_amount for txn in completed), Decimal('0.00')),
+            sum((commission.amount for commission in commissions), Decimal('0.00')),
+        )
+
+    def test_reports_match_the_raw_rows(self):
+        ranges = [
+            (self.start + timedelta(hours=5, minutes=30), self.start + timedelta(days=3, hours=20)),
+            (self.start + timedelta(hours=1), self.start + timedelta(hours=20)),
+            (self.start, self.start + timedelta(days=5)),
+        ]
+        for lower, upper in ranges:
+            summary = CommissionService.get_commission_summary(lower, upper)
+            self.assertEqual(
+                (Transaction.objects.calculate_revenue(lower, upper), summary['total_commission']),
+                self.expected(lower, upper),
+            )
+        # Whole days come from the rollups alone
+        with self.assertNumQueries(1):
+            Transaction.objects.calculate_revenue(self.start.date(), (self.start + timedelta(days=2)).date())
+
+    def test_rollups_follow_status_changes_and_deletes(self):
+        everything = (self.start, self.start + timedelta(days=6))
+        before = self.expected(*everything)
+        self.pending.mark_completed()
+        self.assertEqual(
+            Transaction.objects.calculate_revenue(*everything), before[0] + self.pending.platform_fee_amount
+        )
+        Transaction.objects.filter(status='completed').first().delete()
+        self.assertEqual(Transaction.objects.calculate_revenue(*everything), self.expected(*everything)[0])
+
+        incremental = RevenueService.report()
+        self.assertGreater(RevenueService.backfill(), 0)
+        self.assertEqual(RevenueService.report(), incremental)
+        self.assertEqual(DailyRevenueRollup.objects.values('day').distinct().count(), 5)
+
+
+class WalletStatementTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='client', password='pass')
+        self.wallet = Wallet.objects.create(user=self.user)
+        for amount in range(1, 26):
+            self.wallet.deposit(amount)
+        self.wallet.withdraw(5)
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def test_cursor_pages_cover_the_history_once(self):
+        seen, cursor = [], None
+        while True:
+            params = {'limit': 10, **({'cursor': cursor} if cursor else {})}
+            data = self.api.get(reverse('get_transaction_history'), params).data
+            seen.extend(row['reference_id'] for row in data['transactions'])
+            cursor = data['next']
+            self.assertEqual(data['has_more'], cursor is not None)
+            if not cursor:
+                break
+
+        expected = list(self.wallet.get_transaction_history().values_list('reference_id', flat=True))
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(seen), 26)
+
+        withdrawals = self.api.get(reverse('get_transaction_history'), {'type': 'withdrawal'}).data
+        self.assertEqual([row['amount'] for row in withdrawals['transactions']], [5.0])
+
+    async def _stream(self, params=None):
+        """Fetch the statement through the ASGI handler, as Daphne serves it"""
+        token = await sync_to_async(lambda: str(RefreshToken.for_user(self.user).access_token))()
+        response = await AsyncClient().get(
+            reverse('export_statement'), params or {}, headers={'Authorization': f'Bearer {token}'}
+        )
+        self.assertTrue(response.streaming)
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        return response, body.decode().splitlines()
+
+    async def test_statement_streams_csv_and_json_lines(self):
+        response, lines = await self._stream()
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(lines[0], 'timestamp,reference_id,transaction_type,status,amount,description')
+        self.assertEqual(len(lines), 27)
+        # Oldest first
+        self.assertTrue(lines[1].endswith(',deposit,completed,1.00,Deposit'))
+        self.assertTrue(lines[-1].endswith(',withdrawal,completed,5.00,Withdrawal'))
+
+        response, lines = await self._stream({'export_format': 'jsonl', 'type': 'deposit'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual(len(rows), 25)
+        self.assertEqual(list(rows[0]), ['timestamp', 'reference_id', 'transaction_type', 'status', 'amount', 'description'])
+        self.assertEqual(rows[-1]['amount'], '25.00')
+
+        self.assertEqual(self.api.get(reverse('export_statement'), {'export_format': 'xml'}).status_code, 400)
+
+    async def test_statement_batches_do_not_skip_rows_sharing_a_timestamp(self):
+        await WalletTransaction.objects.filter(wallet=self.wallet).aupdate(timestamp=timezone.now())
+        expected = [
+            reference_id async for reference_id in WalletTransaction.objects.filter(wallet=self.wallet)
+            .order_by('id').values_list('reference_id', flat=True)
+        ]
+        with mock.patch('financeapp.views.STATEMENT_CHUNK_SIZE', 4):
+            _, lines = await self._stream()
+        self.assertEqual([line.split(',')[1] for line in lines[1:]], expected)
@@ -3,4 +3,6 @@ from . import views
 
 urlpatterns = [
     path('wallet/balance/', views.get_wallet_balance, name='get_wallet_balance'),
+    path('wallet/transactions/', views.get_transaction_history, name='get_transaction_history'),
+    path('wallet/statement/', views.export_statement, name='export_statement'),
 ]
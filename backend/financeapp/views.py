@@ -6,6 +6,20 @@ from django.db.models import Sum
 from decimal import Decimal
 from .models import Wallet, WalletTransaction
 from django.utils import timezone
+from django.http import StreamingHttpResponse
+from django.core.serializers.json import DjangoJSONEncoder
+from asgiref.sync import sync_to_async
+from core.pagination import KeysetPaginator
+import csv
+import json
+
+history_paginator = KeysetPaginator(ordering=('-timestamp', '-id'), page_size=20, max_page_size=100)
+history_paginator.page_size_query_param = 'limit'
+statement_paginator = KeysetPaginator(ordering=('timestamp', 'id'))
+
+STATEMENT_FIELDS = ('timestamp', 'reference_id', 'transaction_type', 'status', 'amount', 'description')
+STATEMENT_FORMATS = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+STATEMENT_CHUNK_SIZE = 2000
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -87,34 +101,30 @@ def withdraw_funds(request):
             'error': str(e)
         }, status=status.HTTP_400_BAD_REQUEST)
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def get_transaction_history(request):
-    """Get wallet transaction history with filters"""
-    wallet = request.user.wallet
-    
-    # Get query parameters
+def _filtered_history(request, wallet):
+    """The wallet's transactions narrowed by the ``type``, ``start_date`` and ``end_date`` query params"""
+    transactions = WalletTransaction.objects.filter(wallet=wallet)
     transaction_type = request.GET.get('type')
     start_date = request.GET.get('start_date')
     end_date = request.GET.get('end_date')
-    limit = int(request.GET.get('limit', 20))
-    offset = int(request.GET.get('offset', 0))
-    
-    # Build query
-    transactions = wallet.get_transaction_history()
-    
     if transaction_type:
         transactions = transactions.filter(transaction_type=transaction_type)
     if start_date:
         transactions = transactions.filter(timestamp__gte=start_date)
     if end_date:
         transactions = transactions.filter(timestamp__lte=end_date)
-    
-    # Get total count
-    total_count = transactions.count()
-    
-    # Apply pagination
-    transactions = transactions[offset:offset + limit]
+    return transactions
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_transaction_history(request):
+    """
+    Get wallet transaction history with filters, newest first.  Pages are
+    keyset cursors over (timestamp, id): pass ``next`` back as ``cursor``.
+    """
+    wallet = request.user.wallet
+    transactions, next_cursor = history_paginator.paginate(request, _filtered_history(request, wallet))
     
     transactions_data = [{
         'id': str(tx.id),
@@ -128,6 +138,68 @@ def get_transaction_history(request):
     
     return Response({
         'transactions': transactions_data,
-        'total_count': total_count,
-        'has_more': (offset + limit) < total_count
-    })
\ No newline at end of file
+        'next': next_cursor,
+        'has_more': next_cursor is not None
+    })
+
+
+class _Echo:
+    """File-like object whose write() hands the value back, for csv.writer in a generator"""
+    def write(self, value):
+        return value
+
+
+async def _statement_rows(transactions):
+    """
+    Yield ``STATEMENT_FIELDS`` tuples oldest first, one keyset batch over
+    (timestamp, id) per query.  Each batch is read off the event loop and
+    written out before the next is fetched, so under ASGI the response
+    never holds more than one batch.
+    """
+    transactions = transactions.order_by('timestamp', 'id').values_list(*STATEMENT_FIELDS, 'id')
+    fetch = sync_to_async(lambda queryset: list(queryset[:STATEMENT_CHUNK_SIZE]))
+    batch = await fetch(transactions)
+    while batch:
+        for row in batch:
+            yield row[:-1]
+        if len(batch) < STATEMENT_CHUNK_SIZE:
+            break
+        last = batch[-1]
+        batch = await fetch(transactions.filter(statement_paginator.seek_filter([last[0], last[-1]])))
+
+
+async def _csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(STATEMENT_FIELDS)
+    async for timestamp, reference_id, transaction_type, tx_status, amount, description in rows:
+        yield writer.writerow([timestamp.isoformat(), reference_id, transaction_type, tx_status, amount, description])
+
+
+async def _jsonl_lines(rows):
+    async for row in rows:
+        yield json.dumps(dict(zip(STATEMENT_FIELDS, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_statement(request):
+    """
+    Stream the wallet statement, oldest first, as CSV (default) or JSON Lines
+    (``?export_format=jsonl``).  The body is an async generator reading
+    keyset batches, so Daphne sends each batch as it arrives and the
+    statement length does not affect memory.
+    """
+    export_format = request.GET.get('export_format', 'csv')
+    if export_format not in STATEMENT_FORMATS:
+        return Response({
+            'error': f"export_format must be one of: {', '.join(STATEMENT_FORMATS)}"
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    wallet = request.user.wallet
+    rows = _statement_rows(_filtered_history(request, wallet))
+    lines = _csv_lines(rows) if export_format == 'csv' else _jsonl_lines(rows)
+    
+    response = StreamingHttpResponse(lines, content_type=STATEMENT_FORMATS[export_format])
+    filename = f"statement-{timezone.localdate().isoformat()}.{export_format}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -10,6 +10,10 @@ from channels.auth import AuthMiddlewareStack
 from channels.security.websocket import AllowedHostsOriginValidator
 import core.routing
 import client.routing
+from core.search.typeahead import start_background_sync
+
+# Warm the in-memory typeahead index and follow its change feed in this worker
+start_background_sync()
 
 application = ProtocolTypeRouter({
     "http": get_asgi_application(),
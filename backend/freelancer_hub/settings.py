@@ -157,8 +157,16 @@ DATABASES = {
 #     }
 # }
 
+# Full-text search backend (falls back to the in-memory index when FTS5 is unavailable)
+SEARCH_BACKEND = 'core.search.backends.SQLiteFTS5Backend'
+# How often each ASGI worker replays the typeahead change feed (seconds)
+TYPEAHEAD_POLL_INTERVAL = 1.0
+
 CELERY_BROKER_URL = 'redis://127.0.0.1:6379/0'
 
+# Unread notification counters are mirrored here; unset to keep them in the database only
+NOTIFICATION_COUNTER_REDIS_URL = 'redis://127.0.0.1:6379/2'
+
 CELERY_ACCEPT_CONTENT = ['json']  # Data format for communication
 CELERY_TASK_SERIALIZER = 'json'  # Task serialization format
 CELERY_RESULT_BACKEND = 'redis://127.0.0.1:6379/0'  # Redis as result backend
@@ -173,6 +181,26 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'client.tasks.send_event_approaching_notification',  # Make sure this path is correct
         'schedule': 30.0,  # Run every minute (adjust as needed)
     },
+    'reconcile-notification-counters': {
+        'task': 'core.tasks.reconcile_notification_counters',
+        'schedule': crontab(minute='*/15'),
+    },
+    'prune-search-index-changes-hourly': {
+        'task': 'core.tasks.prune_search_index_changes',
+        'schedule': crontab(minute=15),
+    },
+    'refresh-homepage-leaderboards': {
+        'task': 'client.tasks.refresh_homepage_leaderboards',
+        'schedule': crontab(minute='*/5'),
+    },
+    'snapshot-ledger-balances': {
+        'task': 'financeapp.tasks.snapshot_ledger_balances',
+        'schedule': crontab(minute='*/15'),
+    },
+    'retry-failed-payouts': {
+        'task': 'financeapp.tasks.retry_payouts',
+        'schedule': crontab(minute='*/5'),
+    },
 }
     
 